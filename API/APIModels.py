@@ -1,5 +1,5 @@
-from typing import List, Literal, Union
-from pydantic import BaseModel, PositiveInt, Field, PositiveFloat
+from typing import Any, Dict, List, Literal, Optional, Union
+from pydantic import BaseModel, NonNegativeInt, PositiveInt, Field, PositiveFloat, model_validator
 from fastapi import Query
 
 
@@ -7,12 +7,14 @@ class Parameter(BaseModel):
     significance_level: float = Field(5, ge=0, le=100)
     beta: float = Field(20, ge=0, le=100)
     number_of_variants: int = Field(2, ge=1, description="Number of  all variants")
+    correction: Literal["bonferroni", "sidak", "holm", "dunnett"] = Field("bonferroni", description="Multiple-comparison correction")
 
 
 class DurationParameterBase(Parameter):
-    metric_type: Literal["binomial", "continuous"] = Field("binomial", description="Type of metric")
+    metric_type: Literal["binomial", "continuous", "ratio"] = Field("binomial", description="Type of metric")
     min_detectable_effect_percentage: float = Field(20, ge=0, description="Minimum detectable effect (%)")
     daily_visitors: PositiveInt = Field(1000, description="Average Daily visitors ")
+    variance_reduction_percentage: float = Field(0, ge=0, lt=100, description="Variance removed by CUPED (%)")
     control_allocation: float = Field(50, ge=0, le=100)
     baseline_metric: PositiveFloat = Field(0, ge=0)
 
@@ -30,7 +32,163 @@ class ContinuousParameters(DurationParameterBase):
     std: float
 
 
-DurationParameter = Union[BinomialParameters, ContinuousParameters]
+class RatioParameters(DurationParameterBase):
+    # Ratio of per-unit sums (e.g. revenue / visits); baseline_metric is the ratio itself
+    metric_type: Literal["ratio"] = Field("ratio")
+    numerator_std: float = Field(ge=0, description="Std of the per-unit numerator")
+    denominator_mean: PositiveFloat = Field(description="Mean of the per-unit denominator")
+    denominator_std: float = Field(0, ge=0, description="Std of the per-unit denominator")
+    correlation: float = Field(0, ge=-1, le=1, description="Correlation of numerator and denominator")
+
+
+DurationParameter = Union[BinomialParameters, ContinuousParameters, RatioParameters]
+
+
+class TrafficProfile(BaseModel):
+    daily_traffic: Optional[List[PositiveFloat]] = Field(None, description="Forecast visitors for each day, shared by all experiments")
+    day_of_week_profile: Optional[List[PositiveFloat]] = Field(None, min_length=7, max_length=7, description="Relative traffic Monday..Sunday")
+    weekly_growth_percentage: float = Field(0, gt=-100, description="Traffic growth per week (%)")
+    start_weekday: int = Field(0, ge=0, le=6, description="Weekday of the first day, 0 = Monday")
+    horizon_days: PositiveInt = Field(730, le=36500, description="Days to forecast when no series is given")
+
+
+class ForecastRequest(BaseModel):
+    experiments: List[DurationParameter] = Field(min_length=1)
+    traffic: TrafficProfile = TrafficProfile()
+    start_days: Optional[List[NonNegativeInt]] = Field(None, description="Start day of each experiment in the traffic series")
+
+    @model_validator(mode="after")
+    def one_start_day_per_experiment(self) -> "ForecastRequest":
+        if self.start_days is not None and len(self.start_days) != len(self.experiments):
+            raise ValueError(f"start_days has {len(self.start_days)} entries for {len(self.experiments)} experiments")
+        return self
+
+
+class ForecastRow(BaseModel):
+    sample_size: int
+    duration_days: Optional[int]  # None when the sample size is not reached within the series
+
+
+class PlannedExperiment(BaseModel):
+    experiment_id: str
+    parameters: DurationParameter
+    segment_id: str = Field("all", description="Traffic segment the experiment runs on")
+    priority: PositiveFloat = Field(1, description="Weight of the experiment's completion time")
+
+
+class ScheduleRequest(BaseModel):
+    experiments: List[PlannedExperiment]
+    lanes_per_segment: PositiveInt = Field(4, description="Experiments allowed to run at once on a segment")
+    segment_traffic: Optional[Dict[str, PositiveFloat]] = Field(None, description="Daily visitors per segment (default: max daily_visitors of its experiments)")
+    objective: Literal["weighted", "total"] = Field("weighted", description="Minimize priority-weighted or plain total completion time")
+
+
+class ScheduledExperiment(BaseModel):
+    experiment_id: str
+    segment_id: str
+    lane: int
+    traffic_share: float  # % of the segment's traffic
+    sample_size: int
+    start_day: int
+    end_day: int
+
+
+class ScheduleResponse(BaseModel):
+    timeline: List[ScheduledExperiment]
+    weighted_completion_days: float
+    makespan_days: int
+
+
+class PowerCurveResponse(BaseModel):
+    # Columns are base64-encoded little-endian arrays of `length` values of type `dtype`
+    length: int
+    dtype: Literal["float32"] = "float32"
+    columns: Dict[str, str]  # day, sample_size, power (%), mde (%)
+    sample_size: int
+    duration_days: int
+
+
+class BootstrapSample(BaseModel):
+    # Per-unit values of one group of a completed test, raw or aggregated
+    values: List[float] = Field(min_length=1, description="Per-unit metric (numerator for ratio metrics)")
+    counts: Optional[List[PositiveInt]] = Field(None, description="Number of units with each value (aggregated data)")
+    denominators: Optional[List[PositiveFloat]] = Field(None, description="Per-unit denominator for ratio metrics")
+
+
+class BootstrapRequest(BaseModel):
+    control: BootstrapSample
+    variant: BootstrapSample
+    statistic: Literal["difference", "relative_difference"] = Field("relative_difference", description="variant - control, or the same in % of control")
+    method: Literal["percentile", "bca"] = Field("bca")
+    confidence_level: float = Field(95, gt=0, lt=100)
+    resamples: int = Field(10000, ge=100, le=1_000_000)
+    seed: int = Field(0, ge=0)
+
+
+class BootstrapResponse(BaseModel):
+    estimate: float
+    lower: float
+    upper: float
+    standard_error: float
+    method: str
+    resamples: int
+
+
+class BatchRequest(BaseModel):
+    experiments: List[DurationParameter] = Field(min_length=1)
+
+
+class BatchRow(BaseModel):
+    sample_size: Optional[int] = None
+    duration_days: Optional[int] = None
+    error: Optional[str] = None  # set instead of the results when there is no finite sample size
+
+
+class JobRequest(BaseModel):
+    kind: Literal["sample_sizes", "forecast", "schedule", "bootstrap"]
+    payload: Dict[str, Any] = Field(description="Request body of the matching synchronous route")
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    progress: float  # fraction in [0, 1]
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: Optional[float] = None  # results are deleted after this time
+
+
+ExperimentStatus = Literal["planned", "running", "completed", "stopped"]
+
+
+class ExperimentCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=200)
+    status: ExperimentStatus = "planned"
+    parameters: DurationParameter
+
+
+class ExperimentUpdate(BaseModel):
+    status: ExperimentStatus
+
+
+class Experiment(BaseModel):
+    id: int
+    tenant: str
+    name: str
+    status: ExperimentStatus
+    parameters: DurationParameter
+    sample_size: int
+    duration_days: int
+    created_at: float
+    updated_at: float
+
+
+class ExperimentPage(BaseModel):
+    items: List[Experiment]
+    next_cursor: Optional[str] = None  # pass as `cursor` to get the next page
 
 
 class Mde_Parameter(Parameter):
@@ -45,6 +203,13 @@ class CalculateResponseDuration(BaseModel):
     duration_days: int
 
 
+class AllocationResponse(BaseModel):
+    allocations: List[float]  # control first, then each variant (%)
+    sample_size: int
+    duration_days: int
+    equal_split_duration_days: int
+
+
 class TableRow(BaseModel):
     week: PositiveInt  # Number of weeks
     mde: float  # Min. Det.Effect (MDE) %
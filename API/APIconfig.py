@@ -1,25 +1,75 @@
-from typing import Annotated
-from fastapi import FastAPI, Form, Request, Response, Query, Depends
-from fastapi.responses import HTMLResponse
+import asyncio
+import contextlib
+from typing import Annotated, Optional
+from fastapi import FastAPI, Form, HTTPException, Request, Response, Query, Depends
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-import io  # For handling byte streams
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from src.a_btest.API.APIModels import (
+    AllocationResponse,
+    BootstrapRequest,
+    BootstrapResponse,
     DurationParameter,
     CalculateResponseDuration,
+    Experiment,
+    ExperimentCreate,
+    ExperimentPage,
+    ExperimentStatus,
+    ExperimentUpdate,
+    ForecastRequest,
+    ForecastRow,
+    JobRequest,
+    JobStatus,
+    ScheduleRequest,
+    ScheduleResponse,
     Mde_Parameter,
+    PowerCurveResponse,
     TableRow,
     VisualParameter,
 )
 import uvicorn
 from function_estimation import *
+from src.a_btest.cache import make_key
+from src.a_btest.lookup_table import lookup_sz_duration
+from src.a_btest.allocation import optimize_allocation
+from src.a_btest.forecast import forecast_durations
+from src.a_btest.scheduler import schedule_portfolio
+from src.a_btest.bootstrap import bootstrap_interval, shutdown_pool, start_pool
+from src.a_btest.power_curve import MAX_CURVE_DAYS, decode_column, power_curve
+from src.a_btest.jobs import QuotaExceeded, get_job_manager, job_status, stop_job_manager
+from src.a_btest.registry import MAX_PAGE_SIZE, experiment, get_registry, tenant_id
+from src.a_btest.executor import Overloaded, get_executor, overloaded_handler, run_compute
+from src.a_btest.singleflight import get_single_flight, run_cached
+from src.a_btest.tracing import TracingMiddleware, traced
+from src.a_btest.API.encoding import columns_response, negotiate
+from src.a_btest.response_compression import CompressionMiddleware, get_compressed_cache
+from src.a_btest.rate_limit import RateLimitMiddleware, get_rate_limiter
+from src.a_btest.warmup import readiness, warmup_lifespan_context
 
 # import subprocess
 
 # from a_btest.estimation_binomial import ABTEST
 
-app = FastAPI()
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bootstrap workers start with the app; jobs queued or leased before a restart resume at
+    # startup, not on the first /jobs request
+    await asyncio.to_thread(start_pool)
+    await asyncio.to_thread(get_job_manager)
+    async with warmup_lifespan_context(app):
+        yield
+    await asyncio.to_thread(stop_job_manager)
+    await asyncio.to_thread(shutdown_pool)
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_exception_handler(Overloaded, overloaded_handler)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(TracingMiddleware, service="a_btest-api")
 # don't declare app here and coonect it to the fasthtml server
 # templates = Jinja2Templates(directory="/Users/hedlighazwa/Desktop/a-btest/src/a_btest/templates")
 # app.mount("/static", StaticFiles(directory="/Users/hedlighazwa/Desktop/a-btest/src/a_btest/static"), name="static")
@@ -30,51 +80,217 @@ async def read_root():
     return {"message": "Hello World"}
 
 
-@app.get("/calculate_sample_size")
-async def calculate_SZ(duration_Parameter: Annotated[DurationParameter, Depends()]) -> CalculateResponseDuration:
+duration_adapter = TypeAdapter(DurationParameter)
+
+
+@traced("validate.duration_parameter")
+def duration_query(request: Request) -> DurationParameter:
+    # Depends() cannot expand a Union of models, so validate the query string explicitly
+    try:
+        return duration_adapter.validate_python(dict(request.query_params))
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
 
-    sample_size, duration_days = get_sz_duration(duration_Parameter)
+
+@app.get("/calculate_sample_size")
+async def calculate_SZ(request: Request) -> CalculateResponseDuration:
+    # On-grid requests are answered from the precomputed table, before any validation
+    result = lookup_sz_duration(request.query_params)
+    if result is None:
+        duration_Parameter = duration_query(request)
+        key = make_key("sample_size", duration_Parameter)
+        result = await run_cached("sample_size", key, lambda: get_sz_duration(duration_Parameter))
+    sample_size, duration_days = result
     return CalculateResponseDuration(sample_size=sample_size, duration_days=duration_days)
 
 
+@app.get("/optimize_allocation")
+async def optimize_allocation_route(request: Request, min_control_allocation: float = Query(0, ge=0, le=99)) -> AllocationResponse:
+    # Split of traffic (control first) that reaches power in the fewest days
+    duration_Parameter = duration_query(request)
+    return await run_compute("sample_size", optimize_allocation, duration_Parameter, min_control_allocation)
+
+
+@app.get("/power_curve", response_model=PowerCurveResponse)
+async def power_curve_route(request: Request, days: Optional[int] = Query(None, ge=1, le=MAX_CURVE_DAYS)) -> Response:
+    # Power and MDE for each day 1..days, as float32 columns for client-side plotting
+    duration_Parameter = duration_query(request)
+    key = make_key("power_curve", duration_Parameter, days)
+    try:
+        curve = await run_cached("sample_size", key, lambda: power_curve(duration_Parameter, days))
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    if negotiate(request) == "json":
+        return curve
+    # Other formats carry the day columns; the planned sample size and duration go in headers
+    columns = {name: decode_column(payload) for name, payload in curve.columns.items()}
+    return columns_response(request, columns, {"X-Sample-Size": str(curve.sample_size), "X-Duration-Days": str(curve.duration_days)})
+
+
+@app.post("/forecast_duration")
+async def forecast_duration(forecast_request: ForecastRequest) -> list[ForecastRow]:
+    # Durations against a traffic series or a day-of-week profile instead of flat traffic
+    try:
+        return await run_compute("table", forecast_durations, forecast_request.experiments, forecast_request.traffic, forecast_request.start_days)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+@app.post("/schedule")
+async def schedule(schedule_request: ScheduleRequest) -> ScheduleResponse:
+    # Start days and traffic shares for a portfolio of experiments sharing traffic
+    try:
+        return await run_compute("table", schedule_portfolio, schedule_request)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+@app.post("/bootstrap_interval")
+async def bootstrap_interval_route(bootstrap_request: BootstrapRequest) -> BootstrapResponse:
+    # Percentile / BCa interval of the control-variant difference of a completed test
+    try:
+        return await run_compute("table", bootstrap_interval, bootstrap_request)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
 # toto.kameleoon.com/visualize?number_of_variants=2&min_detectable_effect=0.1&significance_level=0.05&beta=0.2&baseline_conversion_rate=0.1&control_allocation=0.5&variant_allocations=0.3,0.2
 @app.get("/vizualize")
 async def vizualize(visualPa: Annotated[VisualParameter, Depends()]) -> Response:
     # Create an instance of Estimation with the provided form data
 
-    fig = generate_plot(visualPa)
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png")
-    buf.seek(0)
+    png = await run_cached("plot", make_key("plot_png", visualPa), lambda: plot_png(visualPa))
 
     # Return image as response
-    return Response(content=buf.getvalue(), media_type="image/png")
-
-
-@app.get("/get_table_mde")
-async def get_table(mde_Parameter: Annotated[Mde_Parameter, Depends()]) -> list[TableRow]:
-
-    weeks = mde_Parameter.number_weeks  # For example, generate data for 5 weeks
-    results = []
-    var = mde_Parameter.weekly_visitors
-    for week in range(1, weeks + 1):
-
-        mde_Parameter.weekly_visitors = var * week
-        mde = calculate_mde(mde_Parameter)
-        duration_parameter = DurationParameter(
-            significance_level=5,
-            beta=20,
-            number_of_variants=mde_Parameter.number_of_variants,
-            min_detectable_effect_percentage=mde * 100,
-            daily_visitors=1000,
-            baseline_conversion_rate=mde_Parameter.weekly_conversions / var,
-            control_allocation=50,
-            variant_allocations=[50],
-        )
-        visitors = get_sz_duration(duration_parameter)[0]
-
-        results.append(TableRow(week=week, mde=round(mde, 3), visitors=visitors))
-    return results
+    return Response(content=png, media_type="image/png")
+
+
+@app.get("/get_table_mde", response_model=list[TableRow])
+async def get_table(mde_Parameter: Annotated[Mde_Parameter, Depends()], request: Request) -> Response:
+    # Columns straight from NumPy, encoded in the negotiated format (JSON rows by default)
+    key = make_key("table_mde_columns", mde_Parameter)
+    columns = await run_cached("table", key, lambda: table_mde_columns(mde_Parameter))
+    return columns_response(request, columns)
+
+
+def client_id(request: Request) -> str:
+    # Quotas apply per X-Client-Id header, or per remote address without it
+    return request.headers.get("X-Client-Id") or (request.client.host if request.client else "anonymous")
+
+
+@app.exception_handler(QuotaExceeded)
+async def quota_exceeded_handler(request: Request, exc: QuotaExceeded) -> JSONResponse:
+    return JSONResponse({"detail": str(exc)}, status_code=429, headers={"Retry-After": "10"})
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(job_request: JobRequest, request: Request) -> JobStatus:
+    # Long computations run in the background; poll /jobs/{job_id} for progress
+    manager = get_job_manager()
+    try:
+        # The quota check is a SQLite write transaction: keep it off the event loop
+        job_id = await run_compute("jobs", manager.submit, client_id(request), job_request.kind, job_request.payload)
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+    return job_status(await run_compute("jobs", manager.store.get, job_id))
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> JobStatus:
+    row = await run_compute("jobs", get_job_manager().store.get, job_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job_status(row)
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str) -> Response:
+    row = await run_compute("jobs", get_job_manager().store.get, job_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    if row["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {row['status']}")
+    return Response(content=row["result"], media_type="application/json")
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str) -> JobStatus:
+    manager = get_job_manager()
+    if await run_compute("jobs", manager.store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    await run_compute("jobs", manager.cancel, job_id)
+    return job_status(await run_compute("jobs", manager.store.get, job_id))
+
+
+async def sz_duration(duration_parameter: DurationParameter) -> tuple[float, int]:
+    result = lookup_sz_duration(duration_parameter.model_dump())
+    if result is None:
+        key = make_key("sample_size", duration_parameter)
+        result = await run_cached("sample_size", key, lambda: get_sz_duration(duration_parameter))
+    return result
+
+
+@app.post("/experiments", status_code=201)
+async def create_experiment(experiment_create: ExperimentCreate, request: Request) -> Experiment:
+    # Experiments are scoped to the X-Tenant-Id header; the registry's SQLite calls run off the event loop
+    try:
+        sample_size, duration_days = await sz_duration(experiment_create.parameters)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    registry = get_registry()
+    tenant = tenant_id(request.headers)
+    experiment_id = await run_compute("registry", registry.create, tenant, experiment_create.name, experiment_create.parameters, sample_size, duration_days, experiment_create.status)
+    return experiment(await run_compute("registry", registry.get, tenant, experiment_id))
+
+
+@app.get("/experiments")
+async def list_experiments(
+    request: Request,
+    status: Optional[ExperimentStatus] = None,
+    since: Optional[float] = Query(None, description="Created at or after (Unix time)"),
+    until: Optional[float] = Query(None, description="Created before (Unix time)"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+) -> ExperimentPage:
+    try:
+        rows, next_cursor = await run_compute("registry", get_registry().page, tenant_id(request.headers), status, since, until, cursor, limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return ExperimentPage(items=[experiment(row) for row in rows], next_cursor=next_cursor)
+
+
+@app.get("/experiments/{experiment_id}")
+async def get_experiment(experiment_id: int, request: Request) -> Experiment:
+    row = await run_compute("registry", get_registry().get, tenant_id(request.headers), experiment_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Unknown experiment")
+    return experiment(row)
+
+
+@app.patch("/experiments/{experiment_id}")
+async def update_experiment(experiment_id: int, experiment_update: ExperimentUpdate, request: Request) -> Experiment:
+    registry = get_registry()
+    tenant = tenant_id(request.headers)
+    if not await run_compute("registry", registry.set_status, tenant, experiment_id, experiment_update.status):
+        raise HTTPException(status_code=404, detail="Unknown experiment")
+    return experiment(await run_compute("registry", registry.get, tenant, experiment_id))
+
+
+@app.get("/metrics")
+async def metrics() -> dict:
+    return {"executor": get_executor().stats(), "singleflight": get_single_flight().stats(), "compression": get_compressed_cache().stats(), "rate_limit": get_rate_limiter().stats(), "jobs": get_job_manager().stats()}
+
+
+@app.get("/health")
+async def health() -> dict:
+    # Liveness only: the process answers, whether or not it has warmed up
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    body, status_code = readiness()
+    return JSONResponse(body, status_code=status_code)
 
 
 if __name__ == "__main__":
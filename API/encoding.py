@@ -0,0 +1,123 @@
+"""
+Columnar Response Encoding
+
+Numeric endpoints compute their results as NumPy columns. Validating one pydantic model per row
+and serializing it again costs more than the computation for long horizons, so these endpoints
+encode the columns directly in the format the client asks for (`Accept` header, or `format`
+query parameter, which wins):
+1. `application/json` (`format=json`, the default): a list of row objects, as before.
+2. `application/x-ndjson` (`ndjson`): one row object per line.
+3. `application/vnd.apache.arrow.stream` (`arrow`): an Arrow IPC stream with the native dtypes,
+   readable without copies by `pyarrow.ipc.open_stream(...).read_pandas()` (needs `pyarrow`).
+4. `application/msgpack` (`msgpack`): `{"length": n, "columns": {name: bytes}, "dtypes": {name: dtype}}`
+   with little-endian float32 / int64 buffers (needs `msgpack`).
+5. `application/octet-stream` (`binary`): the same buffers back to back; the layout is in the
+   `X-Columns` header (`name:dtype,...`) and the row count in `X-Length`.
+
+An unknown `format`, or a format whose optional package is not installed, gives a 406.
+"""
+
+import io
+import json
+from typing import Optional
+
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "msgpack": "application/msgpack",
+    "binary": "application/octet-stream",
+}
+FORMATS = {media_type: name for name, media_type in MEDIA_TYPES.items()}
+FORMATS["application/x-msgpack"] = "msgpack"
+
+
+def negotiate(request: Request) -> str:
+    """Format name for the request: `format` query parameter, else the best `Accept` match."""
+    requested = request.query_params.get("format")
+    if requested:
+        if requested not in MEDIA_TYPES:
+            raise HTTPException(status_code=406, detail=f"Unknown format '{requested}', expected one of {', '.join(MEDIA_TYPES)}")
+        return requested
+    accepted = []
+    for position, part in enumerate((request.headers.get("accept") or "").split(",")):
+        media_type, *params = (item.strip() for item in part.split(";"))
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if media_type in FORMATS and quality > 0:
+            accepted.append((-quality, position, FORMATS[media_type]))
+    # */*, application/*, a missing header or only unknown types: JSON
+    return min(accepted)[2] if accepted else "json"
+
+
+def _rows(columns: dict[str, np.ndarray]) -> list[dict]:
+    names = list(columns)
+    # tolist() converts whole columns to Python scalars at once
+    return [dict(zip(names, values)) for values in zip(*(np.asarray(column).tolist() for column in columns.values()))]
+
+
+def _buffers(columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    buffers = {}
+    for name, column in columns.items():
+        column = np.asarray(column)
+        dtype = "<f4" if column.dtype.kind == "f" else "<i8" if column.dtype.kind in "iub" else None
+        if dtype is None:
+            raise HTTPException(status_code=406, detail=f"Column '{name}' has no binary encoding")
+        buffers[name] = np.ascontiguousarray(column, dtype=dtype)
+    return buffers
+
+
+def encode_columns(columns: dict[str, np.ndarray], fmt: str) -> bytes:
+    length = len(next(iter(columns.values()))) if columns else 0
+    if fmt == "json":
+        return json.dumps(_rows(columns), separators=(",", ":")).encode()
+    if fmt == "ndjson":
+        encoder = json.JSONEncoder(separators=(",", ":"))
+        return "".join(f"{encoder.encode(row)}\n" for row in _rows(columns)).encode()
+    if fmt == "arrow":
+        try:
+            import pyarrow as pa  # optional dependency, only needed for Arrow responses
+        except ImportError:
+            raise HTTPException(status_code=406, detail="Arrow responses need pyarrow")
+        batch = pa.record_batch([pa.array(np.asarray(column)) for column in columns.values()], names=list(columns))
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue()
+    if fmt == "msgpack":
+        try:
+            import msgpack  # optional dependency, only needed for MessagePack responses
+        except ImportError:
+            raise HTTPException(status_code=406, detail="MessagePack responses need msgpack")
+        buffers = _buffers(columns)
+        return msgpack.packb(
+            {
+                "length": length,
+                "columns": {name: buffer.tobytes() for name, buffer in buffers.items()},
+                "dtypes": {name: buffer.dtype.str for name, buffer in buffers.items()},
+            }
+        )
+    return b"".join(buffer.tobytes() for buffer in _buffers(columns).values())
+
+
+def columns_response(request: Request, columns: dict[str, np.ndarray], headers: Optional[dict] = None) -> Response:
+    """Encode `columns` (equal-length 1-D arrays) in the format negotiated for `request`."""
+    fmt = negotiate(request)
+    headers = {**(headers or {}), "Vary": "Accept"}
+    if fmt == "binary":
+        buffers = _buffers(columns)
+        headers["X-Columns"] = ",".join(f"{name}:{buffer.dtype.str}" for name, buffer in buffers.items())
+        headers["X-Length"] = str(len(next(iter(buffers.values()))) if buffers else 0)
+        content = b"".join(buffer.tobytes() for buffer in buffers.values())
+    else:
+        content = encode_columns(columns, fmt)
+    return Response(content=content, media_type=MEDIA_TYPES[fmt], headers=headers)
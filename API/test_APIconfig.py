@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
 from src.a_btest.API.APIconfig import app
 from src.a_btest.API.APIModels import *
+from src.a_btest.function_estimation import calculate_mde
 import matplotlib
 
 # Instead of displaying the plot , save it in a file
@@ -8,7 +9,7 @@ matplotlib.use("Agg")
 
 
 client = TestClient(app)
-duration_Parameter = DurationParameter(variant_allocations=[50])
+duration_Parameter = BinomialParameters(baseline_metric=10)
 
 payload = duration_Parameter.model_dump()
 print(payload)
@@ -21,7 +22,7 @@ def test_read_root():
 
 
 def test_calculate_SZ():
-    duration_Parameter = DurationParameter(variant_allocations=[50])
+    duration_Parameter = BinomialParameters(baseline_metric=10)
 
     payload = duration_Parameter.model_dump()
     response = client.get("/calculate_sample_size", params=payload)
@@ -59,3 +60,57 @@ def test_get_table():
     assert all(isinstance(row["mde"], float) for row in data)
     assert all(isinstance(row["visitors"], int) for row in data)
     assert len(data) == mde_Parameter.number_weeks
+
+
+def test_get_table_matches_scalar_engine():
+    mde_Parameter = Mde_Parameter(weekly_visitors=5000, weekly_conversions=400, number_weeks=3)
+    data = client.get("/get_table_mde", params=mde_Parameter.model_dump()).json()
+    for row in data:
+        weekly = Mde_Parameter(weekly_visitors=5000 * row["week"], weekly_conversions=400 * row["week"])
+        assert row["mde"] == round(calculate_mde(weekly), 3)
+    # The MDE of w weeks needs the visitors of w weeks, split between the two variants
+    assert [row["visitors"] for row in data] == [2500, 5000, 7500]
+
+
+def test_get_table_formats():
+    params = {**Mde_Parameter(number_weeks=4).model_dump(), "format": "binary"}
+    response = client.get("/get_table_mde", params=params)
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["x-columns"] == "week:<i8,mde:<f4,visitors:<i8" and response.headers["x-length"] == "4"
+    assert len(response.content) == 4 * (8 + 4 + 8)
+    rows = client.get("/get_table_mde", params=Mde_Parameter(number_weeks=4).model_dump(), headers={"Accept": "application/x-ndjson"})
+    assert rows.headers["content-type"] == "application/x-ndjson" and len(rows.text.splitlines()) == 4
+    assert client.get("/get_table_mde", params={"format": "xml"}).status_code == 406
+
+
+def test_queued_jobs_resume_at_startup(tmp_path, monkeypatch):
+    import time
+
+    from src.a_btest import jobs, warmup
+    from src.a_btest.jobs import JobStore
+
+    path = str(tmp_path / "jobs.sqlite3")
+    monkeypatch.setenv("ABTEST_JOBS_PATH", path)
+    monkeypatch.setattr(jobs, "_manager", None)
+    monkeypatch.setattr(warmup, "_warmup", warmup.Warmup(enabled=False))
+    # Queued by a previous process that stopped before running it
+    job_id = JobStore(path).insert("dave", "sample_sizes", '{"experiments": [{"baseline_metric": 10}]}', max_pending=5)
+    with TestClient(app):
+        deadline = time.time() + 10
+        while JobStore(path).get(job_id)["status"] != "succeeded" and time.time() < deadline:
+            time.sleep(0.05)
+        assert JobStore(path).get(job_id)["status"] == "succeeded"
+    assert jobs._manager is None
+
+
+def test_experiment_without_finite_sample_size_is_rejected(tmp_path, monkeypatch):
+    from src.a_btest import registry
+
+    monkeypatch.setattr(registry, "_registry", registry.ExperimentRegistry(str(tmp_path / "registry.sqlite3")))
+    parameters = {"baseline_metric": 10, "min_detectable_effect_percentage": 0}
+    response = client.post("/experiments", json={"name": "flat", "parameters": parameters})
+    assert response.status_code == 422
+    assert client.get("/experiments").json()["items"] == []
+    response = client.post("/experiments", json={"name": "checkout", "parameters": {"baseline_metric": 10}})
+    assert response.status_code == 201
+    assert client.get(f"/experiments/{response.json()['id']}").json()["name"] == "checkout"
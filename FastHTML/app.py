@@ -6,6 +6,7 @@ The dashboard provides tools for:
 1. Sample Size Calculation
 2. Traffic & Conversion Analysis
 3. Power Analysis Visualization
+4. Experiment Registry (saved experiments, paginated)
 
 The application uses FastHTML for UI rendering and interaction and includes the following features:
 - Dynamically loaded tabs with forms and visualizations.
@@ -17,25 +18,46 @@ Routes:
 - `/sample-size-calculator`: Displays the sample size calculator form.
 - `/visualization`: Displays the power analysis visualization form.
 - `/data-analysis`: Displays the traffic and conversion analysis form.
+- `/experiments`, `/experiments/rows`: Lists saved experiments, one keyset-paginated page at a time.
+- `/save-experiment`: Saves the sample size form and its result in the experiment registry.
 - `/calculate_data_analysis`: Handles the analysis logic for the data analysis tab.
 - `/generate-plot`: Handles plot generation for the power analysis tab.
 - `/calculate_sample_size`: Processes the sample size calculation form.
+- `/live/sample-size`, `/live/plot`: Debounced recalculation while the forms are edited (only changed values are sent).
+- `/power-curve`: Power and MDE by day, plotted in the browser from float32 columns.
 - `/update-allocations`: Updates dynamic fields for variant allocations.
+- `/optimize-allocations`: Fills the allocation fields with the split that minimizes test duration.
 - `/update-metric-fields`: Updates dynamic metric fields based on the selected metric type.
+- `/metrics`: Queue-time, run-time and load-shedding counters of the compute executor, collapsed duplicate computations, compression cache hits and rate-limited requests.
+- `/health`, `/ready`: Liveness, and readiness once the startup warm-up (imports, kernels, default plots) is done.
 """
 
 import pandas as pd
-from fasthtml.common import Style, Titled, Div, Button, serve, fast_app
+from fasthtml.common import Script, Style, Titled, Div, Button, JSONResponse, serve, fast_app
 from src.a_btest.API.APIModels import *
-from src.a_btest.FastHTML.forms import sample_size_calculator_form, data_analysis_tab, visualization_tab
-from src.a_btest.FastHTML.handlers import calculate_sample_size, update_allocations, update_metric_fields, post_data_analysis, generate_plot_bis
+from src.a_btest.FastHTML.forms import sample_size_calculator_form, data_analysis_tab, visualization_tab, experiments_tab
+from src.a_btest.FastHTML.handlers import calculate_sample_size, update_allocations, update_metric_fields, post_data_analysis, generate_plot_bis, optimize_allocations, power_curve_panel, live_sample_size, live_plot, save_experiment, experiment_rows
+from src.a_btest.executor import Overloaded, get_executor, overloaded_handler
+from src.a_btest.FastHTML.live import live_sessions
+from src.a_btest.singleflight import get_single_flight
+from src.a_btest.tracing import TracingMiddleware
+from src.a_btest.response_compression import CompressionMiddleware, get_compressed_cache
+from src.a_btest.rate_limit import RateLimitMiddleware, get_rate_limiter
+from src.a_btest.warmup import readiness, warmup_lifespan
 
 
 # Charger le style CSS
 with open("src/a_btest/FastHTML/style.css", "r") as file:
     css_code = file.read()
 
-app, rt = fast_app(hdrs=(Style(css_code),))
+# Client-side drawing of the power curve panel
+with open("src/a_btest/FastHTML/power_curve.js", "r") as file:
+    power_curve_js = file.read()
+
+app, rt = fast_app(hdrs=(Style(css_code), Script(power_curve_js)), exception_handlers={Overloaded: overloaded_handler}, lifespan=warmup_lifespan)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(TracingMiddleware, service="a_btest-dashboard")
 
 
 # Définition des routes principales
@@ -49,6 +71,7 @@ def get():
                 Button("Sample Size", _hx_get="/sample-size-calculator", _hx_target="#tab-content", _hx_swap="innerHTML"),
                 Button("Traffic & Conversion", _hx_get="/data-analysis", _hx_target="#tab-content", _hx_swap="innerHTML"),
                 Button("Power Analysis", _hx_get="/visualization", _hx_target="#tab-content", _hx_swap="innerHTML"),
+                Button("Experiments", _hx_get="/experiments", _hx_target="#tab-content", _hx_swap="innerHTML"),
                 cls="tab-buttons",
             ),
             Div(id="tab-content", cls="main-container"),
@@ -71,6 +94,21 @@ def get_data_analysis():
     return data_analysis_tab()
 
 
+@rt("/experiments")
+def get_experiments():
+    return experiments_tab()
+
+
+@rt("/experiments/rows")
+async def get_experiment_rows(req):
+    return await experiment_rows(req)
+
+
+@rt("/save-experiment")
+async def save_experiment_route(req):
+    return await save_experiment(req)
+
+
 @rt("/calculate_data_analysis")
 async def calculate_data_analysis(req):
     return await post_data_analysis(req)
@@ -86,6 +124,26 @@ async def calculate_sample_size_route(req):
     return await calculate_sample_size(req)
 
 
+@rt("/optimize-allocations")
+async def optimize_allocations_route(req):
+    return await optimize_allocations(req)
+
+
+@rt("/live/sample-size")
+async def live_sample_size_route(req):
+    return await live_sample_size(req)
+
+
+@rt("/live/plot")
+async def live_plot_route(req):
+    return await live_plot(req)
+
+
+@rt("/power-curve")
+async def power_curve_route(req):
+    return await power_curve_panel(req)
+
+
 @rt("/update-allocations")
 def update_allocations_route(num_variants: int):
     return update_allocations(num_variants)
@@ -96,5 +154,21 @@ def update_metric_fields_route(metric_type: str):
     return update_metric_fields(metric_type)
 
 
+@rt("/metrics")
+def get_metrics():
+    return {"executor": get_executor().stats(), "singleflight": get_single_flight().stats(), "compression": get_compressed_cache().stats(), "rate_limit": get_rate_limiter().stats(), "live": {"superseded": live_sessions.dropped}}
+
+
+@rt("/health")
+def get_health():
+    return {"status": "ok"}
+
+
+@rt("/ready")
+def get_ready():
+    body, status_code = readiness()
+    return JSONResponse(body, status_code=status_code)
+
+
 # Lancer l'application
 serve(app="app", host="0.0.0.0", port=5001)
@@ -7,6 +7,7 @@ Each form is designed for a specific feature:
 1. Sample Size Calculator
 2. Traffic and Conversion Analysis
 3. Power Analysis Visualization
+4. Experiment Registry listing
 
 Features include tooltips for user guidance, dynamic field updates, and interactive components.
 
@@ -15,10 +16,12 @@ Features include tooltips for user guidance, dynamic field updates, and interact
 
 from fasthtml.common import *
 from src.a_btest.FastHTML.handlers import calculate_sample_size
+from src.a_btest.FastHTML.live import live_recalculation
 
 
 def sample_size_calculator_form():
     form = Form(
+        live_recalculation("/live/sample-size"),  # Recalculates while the inputs are edited
         Fieldset(
             # Baseline Metric Average %
             Div(
@@ -202,6 +205,70 @@ def sample_size_calculator_form():
             ),
             # Placeholder for dynamic allocation fields
             Div(id="allocation-fields", cls="form-group"),
+            # Multiple-comparison correction
+            Div(
+                Div(
+                    Label(
+                        "Multiple-Comparison Correction",
+                        cls="label-with-tooltip",  # Align text and tooltip horizontally
+                    ),
+                    Div(
+                        Label("?", cls="tooltip-icon"),  # Tooltip icon
+                        Div(
+                            "How the significance level is shared between variants compared to the control.",  # Tooltip text
+                            cls="tooltip-content",
+                        ),
+                        cls="tooltip-container",  # Tooltip container for alignment
+                    ),
+                    cls="label-tooltip-wrapper",  # Wrapper for label and tooltip
+                ),
+                Select(
+                    Option("Bonferroni", value="bonferroni", selected=True),
+                    Option("Šidák", value="sidak"),
+                    Option("Holm", value="holm"),
+                    Option("Dunnett (many-to-one)", value="dunnett"),
+                    id="correction",
+                    name="correction",
+                    cls="form-control",
+                ),
+                cls="form-group",
+            ),
+        ),
+        Div(
+            Div(
+                Label(
+                    "Min. Control Allocation (%)",
+                    cls="label-with-tooltip",  # Align text and tooltip horizontally
+                ),
+                Div(
+                    Label("?", cls="tooltip-icon"),  # Tooltip icon
+                    Div(
+                        "Lower bound on the control share used by the allocation optimizer.",  # Tooltip text
+                        cls="tooltip-content",
+                    ),
+                    cls="tooltip-container",  # Tooltip container for alignment
+                ),
+                cls="label-tooltip-wrapper",  # Wrapper for label and tooltip
+            ),
+            Input(
+                id="min_control_allocation",
+                name="min_control_allocation",
+                type="number",
+                min="0",
+                max="99",
+                step="0.01",
+                value="0",
+                cls="form-control",
+            ),
+            Button(
+                "Optimize Allocation",
+                type="button",
+                cls="btn",
+                _hx_post="/optimize-allocations",  # Fills the allocation fields with the fastest split
+                _hx_target="#allocation-fields",
+                _hx_swap="innerHTML",
+            ),
+            cls="form-group",
         ),
         Div(
             Button(
@@ -212,6 +279,28 @@ def sample_size_calculator_form():
                 _hx_target="#result-container",
                 _hx_swap="outerHTML",
             ),
+            Button(
+                "Power Curve",
+                type="button",
+                cls="btn",
+                _hx_post="/power-curve",  # Power and MDE by day, drawn in the browser
+                _hx_target="#power-curve-panel",
+                _hx_swap="outerHTML",
+            ),
+            cls="form-group",
+        ),
+        Div(
+            Label("Experiment Name", _for="experiment_name"),
+            Input(id="experiment_name", type="text", name="experiment_name", placeholder="e.g. Checkout redesign", cls="form-control"),
+            Button(
+                "Save Experiment",
+                type="button",
+                cls="btn",
+                _hx_post="/save-experiment",  # Stores the parameters and result in the experiment registry
+                _hx_target="#save-status",
+                _hx_swap="outerHTML",
+            ),
+            Span(id="save-status"),
             cls="form-group",
         ),
     )
@@ -232,7 +321,7 @@ def sample_size_calculator_form():
     )
 
     # Retour complet : formulaire + conteneur de résultats
-    return Div(form, result_section, cls="sample-size-container")
+    return Div(form, result_section, Div(id="power-curve-panel"), cls="sample-size-container")
 
 
 def data_analysis_tab():
@@ -352,6 +441,7 @@ def visualization_tab():
     # Formulaire utilisateur pour entrer les paramètres
     form = Div(
         Form(
+            live_recalculation("/live/plot"),  # Re-renders the plot while the inputs are edited
             Fieldset(
                 # Baseline Conversion Rate
                 Div(
@@ -545,3 +635,30 @@ def visualization_tab():
 
     # Retourner le formulaire et le graphique côte à côte
     return Div(form, plot_section, cls="sample-size-container")
+
+
+def experiments_tab():
+    # Rows are loaded one page at a time (keyset pagination) by the "Load more" button
+    return Div(
+        Form(
+            Label("Status", _for="experiment-status"),
+            Select(
+                Option("All", value=""),
+                *(Option(status.capitalize(), value=status) for status in ("planned", "running", "completed", "stopped")),
+                id="experiment-status",
+                name="status",
+                cls="form-control",
+                _hx_get="/experiments/rows",
+                _hx_trigger="change",
+                _hx_target="#experiment-rows",
+                _hx_swap="innerHTML",
+            ),
+            cls="form-group",
+        ),
+        Table(
+            Thead(Tr(Th("Name"), Th("Status"), Th("Metric"), Th("Sample Size"), Th("Duration (days)"), Th("Created"))),
+            Tbody(id="experiment-rows", _hx_get="/experiments/rows", _hx_trigger="load", _hx_swap="innerHTML"),
+            cls="experiments-table",
+        ),
+        cls="experiments-container",
+    )
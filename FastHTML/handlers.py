@@ -7,6 +7,7 @@ It includes:
 2. Plot generation for power analysis
 3. Sample size calculation
 4. Dynamic field updates for metric type and allocations
+5. Traffic allocation optimization
 
 Each function is designed to handle specific aspects of the A/B testing workflow.
 """
@@ -15,20 +16,23 @@ import pandas as pd
 from fasthtml.common import *
 from src.a_btest.function_estimation import *
 from src.a_btest.API.APIModels import Mde_Parameter, BinomialParameters
-from io import BytesIO
+from src.a_btest.cache import get_cache, make_key, cached
+from src.a_btest.lookup_table import lookup_sz_duration
+from src.a_btest.executor import run_compute
+from src.a_btest.singleflight import run_cached
+from src.a_btest.tracing import span, traced
+from src.a_btest.allocation import optimize_allocation
+from src.a_btest.power_curve import power_curve
+from src.a_btest.FastHTML.live import Superseded, live_sessions, live_token, no_content
+from src.a_btest.registry import get_registry, tenant_id
+from pydantic import ValidationError
 import base64
+import time
+from urllib.parse import urlencode
 import matplotlib.pyplot as plt
 
 
-async def post_data_analysis(req):
-    # Retrieve the form data
-    form_data = await req.form()
-
-    # Extract form values from the form submission
-    weekly_traffic = int(form_data.get("weekly_traffic", 1000))
-    weekly_conversions = int(form_data.get("weekly_conversions", 50))
-    num_variants = int(form_data.get("num_variants", 2))
-
+def data_analysis_results(weekly_traffic: int, weekly_conversions: int, num_variants: int) -> list[dict]:
     # Calculate baseline conversion rate
     baseline_cr = round(weekly_conversions / weekly_traffic, 2)
     alpha = 5  # Significance level
@@ -74,6 +78,21 @@ async def post_data_analysis(req):
                 "Visitors per variant": int(visitors),
             }
         )
+    return results
+
+
+async def post_data_analysis(req):
+    # Retrieve the form data
+    form_data = await req.form()
+
+    # Extract form values from the form submission
+    weekly_traffic = int(form_data.get("weekly_traffic", 1000))
+    weekly_conversions = int(form_data.get("weekly_conversions", 50))
+    num_variants = int(form_data.get("num_variants", 2))
+
+    # Results are shared with the other workers through the on-disk cache
+    key = make_key("data_analysis", weekly_traffic, weekly_conversions, num_variants)
+    results = await run_cached("table", key, lambda: data_analysis_results(weekly_traffic, weekly_conversions, num_variants))
 
     # Create the table header with tooltip for MDE
     table_header = Tr(
@@ -121,9 +140,8 @@ async def post_data_analysis(req):
     )
 
 
-async def generate_plot_bis(req):
-    form_data = await req.form()
-
+@traced("validate.visual_parameter")
+def visual_parameter_from_form(form_data) -> VisualParameter:
     # Extract data from the form
     baseline_conversion = float(form_data.get("baseline_metric_average", 1)) / 100
     minimum_effect = float(form_data.get("minimum_effect", 1)) / 100
@@ -132,16 +150,17 @@ async def generate_plot_bis(req):
     beta = float(form_data.get("beta (%)", 80))
 
     # Placeholder: ABTEST class and plot generation logic
-    obj = VisualParameter(alpha=alpha, power=beta, hypothesis=test_type, min_detectable_effect_percentage=minimum_effect, baseline_conversion_rate_percentage=baseline_conversion)
+    return VisualParameter(alpha=alpha, power=beta, hypothesis=test_type, min_detectable_effect_percentage=minimum_effect, baseline_conversion_rate_percentage=baseline_conversion)
 
-    fig = generate_plot(obj)  # Generate plot using the calculator
 
-    # Save the plot to a PNG image
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    buf.seek(0)
-    plot_data = base64.b64encode(buf.read()).decode("utf-8")
-    buf.close()
+async def generate_plot_bis(req):
+    form_data = await req.form()
+    obj = visual_parameter_from_form(form_data)
+
+    # Render the plot (or reuse the PNG rendered by any worker for the same parameters)
+    png = await run_cached("plot", make_key("plot_png", obj), lambda: plot_png(obj))
+    with span("base64_encode", bytes=len(png)):
+        plot_data = base64.b64encode(png).decode("utf-8")
 
     # Embed the image in the response
     return Div(
@@ -151,9 +170,8 @@ async def generate_plot_bis(req):
     )
 
 
-async def calculate_sample_size(req):
-    sample_size = None
-    form_data = await req.form()
+@traced("validate.duration_parameter")
+def duration_parameter_from_form(form_data):
     metric_type = form_data.get("metric_type", "binomial")
     allocations = []
     # Iterate over form data keys to find allocations
@@ -163,9 +181,12 @@ async def calculate_sample_size(req):
             allocations.append(float(value))
     # Trouver la valeur minimale parmi toutes les allocations
     min_allocation = min(allocations) if allocations else 0
-    if metric_type == "binomial":
+    # The form labels binomial metrics as "discrete"
+    if metric_type in ("binomial", "discrete"):
         duration_parameter = BinomialParameters(
             beta=float(form_data.get("beta", 80)),
+            number_of_variants=int(form_data.get("num_variants") or len(allocations) + 1),
+            correction=form_data.get("correction", "bonferroni"),
             significance_level=float(form_data.get("significance_level", 5)),
             min_detectable_effect_percentage=float(form_data.get("mde", 20)),
             baseline_metric=float(form_data.get("baseline_metric_average", 10)),
@@ -177,6 +198,8 @@ async def calculate_sample_size(req):
     else:
         duration_parameter = ContinuousParameters(
             beta=float(form_data.get("beta", 80)),
+            number_of_variants=int(form_data.get("num_variants") or len(allocations) + 1),
+            correction=form_data.get("correction", "bonferroni"),
             significance_level=float(form_data.get("significance_level", 5)),
             min_detectable_effect_percentage=float(form_data.get("mde", 20)),
             baseline_metric=float(form_data.get("baseline_metric_average", 10)),
@@ -185,10 +208,26 @@ async def calculate_sample_size(req):
             daily_visitors=float(form_data.get("daily_visitors", 1000)),
             hypothesis="One-sided Test",
             std=float(form_data.get("std", 10)),
+            variance_reduction_percentage=float(form_data.get("variance_reduction_percentage") or 0),
         )
+    return duration_parameter
+
+
+async def sz_duration(duration_parameter) -> tuple[float, int]:
+    result = lookup_sz_duration(duration_parameter.model_dump())
+    if result is None:
+        key = make_key("sample_size", duration_parameter)
+        result = await run_cached("sample_size", key, lambda: get_sz_duration(duration_parameter))
+    return result
+
+
+async def calculate_sample_size(req):
+    sample_size = None
+    form_data = await req.form()
+    duration_parameter = duration_parameter_from_form(form_data)
 
     # Get the sample size and duration
-    sample_size, duration = get_sz_duration(duration_parameter)
+    sample_size, duration = await sz_duration(duration_parameter)
     if sample_size == None:
         return Div(
             Div(
@@ -223,18 +262,169 @@ async def calculate_sample_size(req):
         )
 
 
+async def power_curve_panel(req):
+    form_data = await req.form()
+    duration_parameter = duration_parameter_from_form(form_data)
+    key = make_key("power_curve", duration_parameter, None)
+    try:
+        curve = await run_cached("sample_size", key, lambda: power_curve(duration_parameter))
+    except ValueError as exc:
+        return Div(Span(str(exc), cls="save-error"), id="power-curve-panel")
+
+    # The browser decodes the columns and draws both charts (see power_curve.js)
+    return Div(
+        Canvas(id="power-curve-power", width="640", height="260"),
+        Canvas(id="power-curve-mde", width="640", height="260"),
+        Script(f"drawPowerCurve({curve.model_dump_json()}, {100 - duration_parameter.beta}, {duration_parameter.min_detectable_effect_percentage});"),
+        id="power-curve-panel",
+    )
+
+
+async def save_experiment(req):
+    form_data = await req.form()
+    name = (form_data.get("experiment_name") or "").strip()
+    if not name:
+        return Span("Enter a name to save the experiment", id="save-status", cls="save-error")
+    duration_parameter = duration_parameter_from_form(form_data)
+    try:
+        sample_size, duration = await sz_duration(duration_parameter)
+    except ValueError as exc:
+        return Span(str(exc), id="save-status", cls="save-error")
+    # The registry's SQLite calls run off the event loop
+    experiment_id = await run_compute("registry", get_registry().create, tenant_id(req.headers), name, duration_parameter, sample_size, duration)
+    return Span(f"Saved as experiment #{experiment_id}", id="save-status")
+
+
+async def experiment_rows(req):
+    # One page of the experiments tab, followed by a "Load more" row holding the next cursor
+    status = req.query_params.get("status") or None
+    try:
+        rows, cursor = await run_compute("registry", get_registry().page, tenant_id(req.headers), status=status, cursor=req.query_params.get("cursor") or None)
+    except ValueError:
+        rows, cursor = [], None
+    items = [
+        Tr(
+            Td(row["name"]),
+            Td(row["status"]),
+            Td(row["metric_type"]),
+            Td(f"{row['sample_size']:,}"),
+            Td(row["duration_days"]),
+            Td(time.strftime("%Y-%m-%d %H:%M", time.localtime(row["created_at"]))),
+        )
+        for row in rows
+    ]
+    if cursor is not None:
+        query = urlencode({"cursor": cursor, **({"status": status} if status else {})})
+        items.append(
+            Tr(
+                Td(
+                    Button("Load more", cls="btn", hx_get=f"/experiments/rows?{query}", hx_target="closest tr", hx_swap="outerHTML"),
+                    colspan="6",
+                ),
+                id="load-more",
+            )
+        )
+    elif not items and not req.query_params.get("cursor"):
+        items.append(Tr(Td("No experiments yet", colspan="6")))
+    return tuple(items)
+
+
+def _checked(token, fn):
+    # Runs in the compute pool: skip the work if newer input arrived while queued
+    token.check()
+    return fn()
+
+
+async def live_sample_size(req):
+    form_data = await req.form()
+    token = None
+    try:
+        token = live_token(form_data)
+        if token is None:
+            return await calculate_sample_size(req)
+        await token.debounce()
+        duration_parameter = duration_parameter_from_form(form_data)
+        result = lookup_sz_duration(duration_parameter.model_dump())
+        if result is None:
+            key = make_key("sample_size", duration_parameter)
+            # Not coalesced: a follower would inherit the leader's Superseded
+            result = await run_compute("sample_size", cached, get_cache(), key, lambda: _checked(token, lambda: get_sz_duration(duration_parameter)))
+        sample_size, duration = result
+        # Newer input may have arrived while this one was computed
+        token.check()
+    except (Superseded, ValueError, ValidationError, OverflowError):
+        # Overwritten or half-typed input: leave the current result on screen
+        return no_content()
+    changed = live_sessions.diff(token.session_id, {"sample-size-value": f"{sample_size:,.0f}", "duration-value": f"{duration:.0f}"})
+    if not changed:
+        return no_content()
+    return tuple(H3(value, id=element_id, cls="result-value", hx_swap_oob="true") for element_id, value in changed.items())
+
+
+async def live_plot(req):
+    form_data = await req.form()
+    token = None
+    try:
+        token = live_token(form_data)
+        if token is None:
+            return await generate_plot_bis(req)
+        await token.debounce()
+        obj = visual_parameter_from_form(form_data)
+        key = make_key("plot_png", obj)
+        if not live_sessions.diff(token.session_id, {"plot-container": key}):
+            return no_content()
+        try:
+            # The token is checked again right before the (expensive) render
+            png = await run_compute("plot", cached, get_cache(), key, lambda: _checked(token, lambda: plot_png(obj)))
+        except BaseException:
+            # Not rendered (superseded, shed, failed): forget the key so identical input renders it
+            live_sessions.diff(token.session_id, {"plot-container": None})
+            raise
+    except (Superseded, ValueError, ValidationError):
+        if token is not None:
+            live_sessions.diff(token.session_id, {"plot-container": None})
+        return no_content()
+    with span("base64_encode", bytes=len(png)):
+        plot_data = base64.b64encode(png).decode("utf-8")
+    return Div(
+        Img(src=f"data:image/png;base64,{plot_data}", style="width: 100%; height: 100%; display: block; object-fit: cover; margin: 0;"),
+        id="plot-container",
+        cls="plot-area",
+        hx_swap_oob="true",
+    )
+
+
+async def optimize_allocations(req):
+    form_data = await req.form()
+    duration_parameter = duration_parameter_from_form(form_data)
+    min_control = float(form_data.get("min_control_allocation") or 0)
+    result = await run_compute("sample_size", optimize_allocation, duration_parameter, min_control)
+
+    # Refill the allocation fields with the optimal split and explain the gain
+    return Div(
+        create_variant_inputs(duration_parameter.number_of_variants, result.allocations),
+        P(
+            f"Optimal split reaches power in {result.duration_days} days (equal split: {result.equal_split_duration_days} days).",
+            cls="result-label",
+        ),
+    )
+
+
 def update_allocations(num_variants: int):
     variant_inputs = create_variant_inputs(num_variants)
     return variant_inputs
 
 
 # Function to create dynamic input fields for variant allocations
-def create_variant_inputs(num_variants):
+def create_variant_inputs(num_variants, values=None):
+    # values: optional allocations to prefill, control first
+    values = values or [None] * num_variants
     fields = [
         Div(
             Label("Control Allocation (%)"),
             Input(
                 name="control_allocation",
+                value=values[0],
                 type="number",
                 min="0",
                 max="100",
@@ -251,6 +441,7 @@ def create_variant_inputs(num_variants):
                 Label(f"Variant {i} Allocation (%)"),
                 Input(
                     name=f"variant_{i}_allocation",
+                    value=values[i],
                     type="number",
                     min="0",
                     max="100",
@@ -414,7 +605,21 @@ def update_metric_fields(metric_type: str):
                 ),
                 std_field,  # Ajouter le champ Std avec tooltip
                 cls="d-flex flex-equal three-fields",  # Trois champs alignés sur trois colonnes
-            )
+            ),
+            Div(
+                Label("CUPED variance reduction (%)", _for="variance_reduction_percentage"),
+                Input(
+                    id="variance_reduction_percentage",
+                    name="variance_reduction_percentage",
+                    type="number",
+                    step="0.1",
+                    min="0",
+                    max="99",
+                    value="0",
+                    cls="form-control",
+                ),
+                cls="form-group",
+            ),
         ]
 
     return Div(*fields, id="metric-fields")
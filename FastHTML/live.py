@@ -0,0 +1,134 @@
+"""
+Live Recalculation
+
+Recomputes results while the user edits a form, without computing for inputs that have
+already been overwritten. It includes:
+1. Client side (see `live_recalculation`): HTMX posts the form on input after a short delay, and
+   `hx-sync="this:replace"` aborts the in-flight request when a newer one starts. Every request
+   carries the form's session id and an increasing sequence number.
+2. Server side debouncing: a request waits `ABTEST_LIVE_DEBOUNCE` seconds and is dropped if a
+   newer request of the same session arrived meanwhile.
+3. A `LiveToken` per request, checked again when the computation gets a worker and before the
+   expensive step (e.g. the plot render); a superseded request raises `Superseded` and answers
+   204 without doing the work.
+4. Diffs: only the result elements whose text changed since the last response of the session
+   are sent back, as out-of-band swaps; an unchanged result is a bodiless 204.
+"""
+
+import asyncio
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from fasthtml.common import Div, Input
+from starlette.responses import Response
+
+DEFAULT_DEBOUNCE = 0.15  # seconds
+MAX_SESSIONS = 10_000
+
+
+class Superseded(Exception):
+    """Raised when a newer request of the same session makes this one pointless."""
+
+
+@dataclass
+class LiveSession:
+    latest: int = -1
+    sent: Optional[dict] = None  # element id -> last value sent for each result element
+
+
+class LiveSessions:
+    """Latest sequence number and last sent values per form session (LRU-bounded)."""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, LiveSession] = OrderedDict()
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def _session(self, session_id: str) -> LiveSession:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = LiveSession()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def begin(self, session_id: str, seq: int) -> "LiveToken":
+        with self._lock:
+            session = self._session(session_id)
+            session.latest = max(session.latest, seq)
+        return LiveToken(self, session_id, seq)
+
+    def is_latest(self, session_id: str, seq: int) -> bool:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session is not None and session.latest == seq
+
+    def diff(self, session_id: str, values: dict) -> dict:
+        """Values that changed since the previous response, recorded as sent."""
+        with self._lock:
+            session = self._session(session_id)
+            previous = session.sent or {}
+            changed = {key: value for key, value in values.items() if previous.get(key) != value}
+            session.sent = {**previous, **values}
+        return changed
+
+
+@dataclass
+class LiveToken:
+    sessions: LiveSessions
+    session_id: str
+    seq: int
+
+    @property
+    def stale(self) -> bool:
+        return not self.sessions.is_latest(self.session_id, self.seq)
+
+    def check(self) -> None:
+        if self.stale:
+            self.sessions.dropped += 1
+            raise Superseded(f"{self.session_id}#{self.seq}")
+
+    async def debounce(self, delay: Optional[float] = None) -> None:
+        await asyncio.sleep(float(os.environ.get("ABTEST_LIVE_DEBOUNCE", DEFAULT_DEBOUNCE)) if delay is None else delay)
+        self.check()
+
+
+live_sessions = LiveSessions()
+
+
+def live_token(form_data) -> Optional[LiveToken]:
+    """Token for a live request, None for a regular (button) submission."""
+    session_id = form_data.get("live_session")
+    seq = form_data.get("live_seq")
+    if not session_id or seq in (None, ""):
+        return None
+    return live_sessions.begin(session_id, int(seq))
+
+
+def live_recalculation(route: str) -> Div:
+    """
+    Place inside a form: posts the whole form to `route` while it is being edited. The trigger
+    lives on its own element so none of its attributes are inherited by the form's fields.
+    """
+    return Div(
+        Input(type="hidden", name="live_session", value=uuid.uuid4().hex),
+        Div(
+            hx_post=route,
+            hx_trigger="input delay:300ms from:closest form",
+            hx_include="closest form",
+            hx_sync="this:replace",
+            hx_swap="none",
+            hx_vals="js:{live_seq: (window.liveSeq = (window.liveSeq || 0) + 1)}",
+        ),
+        style="display: none;",
+    )
+
+
+def no_content() -> Response:
+    return Response(status_code=204)
@@ -0,0 +1,57 @@
+// Draws the power curve panel from the float32 columns sent by /power-curve
+function decodeColumn(payload) {
+  const bytes = Uint8Array.from(atob(payload), (c) => c.charCodeAt(0));
+  return new Float32Array(bytes.buffer);
+}
+
+function drawLineChart(canvas, xs, ys, options) {
+  const ctx = canvas.getContext("2d");
+  const width = canvas.width, height = canvas.height, pad = 48;
+  const xMax = xs[xs.length - 1], yMax = options.yMax || Math.max(...ys);
+  const px = (x) => pad + ((x - xs[0]) / (xMax - xs[0] || 1)) * (width - 2 * pad);
+  const py = (y) => height - pad - (Math.min(y, yMax) / yMax) * (height - 2 * pad);
+  ctx.clearRect(0, 0, width, height);
+  ctx.font = "12px sans-serif";
+  ctx.strokeStyle = "#999";
+  ctx.beginPath();
+  ctx.moveTo(pad, pad / 2);
+  ctx.lineTo(pad, height - pad);
+  ctx.lineTo(width - pad / 2, height - pad);
+  ctx.stroke();
+  ctx.fillStyle = "#333";
+  ctx.fillText(options.title, pad, pad / 2 - 4);
+  ctx.fillText(options.xLabel, width / 2 - 20, height - 12);
+  for (let i = 0; i <= 4; i++) {
+    const y = (yMax * i) / 4;
+    ctx.fillText(y.toFixed(0), 8, py(y) + 4);
+    const x = xs[0] + ((xMax - xs[0]) * i) / 4;
+    ctx.fillText(x.toFixed(0), px(x) - 8, height - pad + 16);
+  }
+  if (options.target !== undefined) {
+    ctx.setLineDash([4, 4]);
+    ctx.beginPath();
+    ctx.moveTo(pad, py(options.target));
+    ctx.lineTo(width - pad / 2, py(options.target));
+    ctx.stroke();
+    ctx.setLineDash([]);
+  }
+  ctx.strokeStyle = options.color;
+  ctx.lineWidth = 2;
+  ctx.beginPath();
+  for (let i = 0; i < xs.length; i++) {
+    i === 0 ? ctx.moveTo(px(xs[i]), py(ys[i])) : ctx.lineTo(px(xs[i]), py(ys[i]));
+  }
+  ctx.stroke();
+  ctx.lineWidth = 1;
+}
+
+function drawPowerCurve(curve, power, mde) {
+  const columns = {};
+  for (const name in curve.columns) columns[name] = decodeColumn(curve.columns[name]);
+  drawLineChart(document.getElementById("power-curve-power"), columns.day, columns.power, {
+    title: "Power (%) by day", xLabel: "Day", yMax: 100, target: power, color: "#2b7bb9",
+  });
+  drawLineChart(document.getElementById("power-curve-mde"), columns.day, columns.mde, {
+    title: "Minimum detectable effect (%) by day", xLabel: "Day", yMax: Math.max(2 * mde, 1), target: mde, color: "#d9534f",
+  });
+}
@@ -36,3 +36,31 @@ def test_data_analysis_route():
     response = client.get("/data-analysis")
     assert response.status_code == 200
     assert "Weekly Traffic" in response.text
+
+
+def test_save_and_list_experiments(tmp_path, monkeypatch):
+    """Saved experiments are listed one page at a time, with a load-more row."""
+    from src.a_btest import registry
+    from src.a_btest.API.APIModels import BinomialParameters
+
+    store = registry.ExperimentRegistry(str(tmp_path / "registry.sqlite3"))
+    monkeypatch.setattr(registry, "_registry", store)
+    for i in range(registry.DEFAULT_PAGE_SIZE):
+        store.create(registry.DEFAULT_TENANT, f"older-{i}", BinomialParameters(baseline_metric=10), 1000, 7)
+    form = {"metric_type": "discrete", "baseline_metric_average": "10", "variant_1": "50", "mde": "20", "daily_visitors": "1000"}
+    response = client.post("/save-experiment", data={**form, "experiment_name": "checkout"})
+    assert "Saved as experiment" in response.text
+    response = client.get("/experiments/rows")
+    assert "checkout" in response.text and "older-0<" not in response.text
+    assert 'id="load-more"' in response.text
+    cursor = response.text.split("cursor=")[1].split('"')[0]
+    response = client.get(f"/experiments/rows?cursor={cursor}")
+    assert "older-0<" in response.text and "load-more" not in response.text
+
+
+def test_health_and_ready_routes():
+    assert client.get("/health").json() == {"status": "ok"}
+    response = client.get("/ready")
+    # Without a lifespan run (no `with TestClient`) the warm-up has not started yet
+    assert response.status_code in (200, 503)
+    assert response.json()["status"] in ("pending", "warming", "ready")
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+from src.a_btest.FastHTML.app import app
+from src.a_btest.FastHTML.live import LiveSessions, Superseded
+
+client = TestClient(app)
+FORM = {"metric_type": "discrete", "baseline_metric_average": "10", "beta": "20", "variant_1": "50", "mde": "20", "daily_visitors": "1000"}
+
+
+@pytest.fixture(autouse=True)
+def no_debounce(monkeypatch):
+    monkeypatch.setenv("ABTEST_LIVE_DEBOUNCE", "0")
+
+
+def test_newer_request_supersedes_older_one():
+    sessions = LiveSessions()
+    first = sessions.begin("s", 1)
+    second = sessions.begin("s", 2)
+    with pytest.raises(Superseded):
+        asyncio.run(first.debounce(0))
+    asyncio.run(second.debounce(0))
+    # A late arrival with an older sequence number does not take over
+    sessions.begin("s", 1)
+    assert not second.stale
+
+
+def test_live_sample_size_sends_only_changes():
+    response = client.post("/live/sample-size", data={**FORM, "live_session": "abc", "live_seq": "1"})
+    assert response.status_code == 200
+    assert 'id="sample-size-value"' in response.text and 'hx-swap-oob="true"' in response.text
+    # Same result again: nothing to send
+    assert client.post("/live/sample-size", data={**FORM, "live_session": "abc", "live_seq": "2"}).status_code == 204
+    # Only the duration changes with the traffic
+    response = client.post("/live/sample-size", data={**FORM, "daily_visitors": "2000", "live_session": "abc", "live_seq": "3"})
+    assert 'id="duration-value"' in response.text and "sample-size-value" not in response.text
+
+
+def test_stale_and_half_typed_inputs_do_no_work():
+    client.post("/live/sample-size", data={**FORM, "live_session": "def", "live_seq": "5"})
+    assert client.post("/live/sample-size", data={**FORM, "mde": "30", "live_session": "def", "live_seq": "4"}).status_code == 204
+    assert client.post("/live/sample-size", data={**FORM, "mde": "", "live_session": "def", "live_seq": "6"}).status_code == 204
+
+
+def test_input_superseded_during_compute_is_dropped(monkeypatch):
+    from src.a_btest.FastHTML import handlers
+
+    def compute_then_newer_input(*args):
+        handlers.live_sessions.begin("ghi", 8)
+        return 1000, 7
+
+    monkeypatch.setattr(handlers, "lookup_sz_duration", compute_then_newer_input)
+    assert client.post("/live/sample-size", data={**FORM, "live_session": "ghi", "live_seq": "7"}).status_code == 204
+
+
+def test_shed_plot_render_is_retried(monkeypatch):
+    from src.a_btest.executor import Overloaded
+    from src.a_btest.FastHTML import handlers
+
+    plot_form = {"live_session": "jkl", "baseline_metric_average": "10", "minimum_effect": "20"}
+
+    async def shed(*args, **kwargs):
+        raise Overloaded("plot", retry_after=1)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(handlers, "run_compute", shed)
+        assert client.post("/live/plot", data={**plot_form, "live_seq": "1"}).status_code == 503
+    response = client.post("/live/plot", data={**plot_form, "live_seq": "2"})
+    assert response.status_code == 200 and 'id="plot-container"' in response.text
@@ -0,0 +1,34 @@
+"""
+Command-line entry point for the A/B test toolkit.
+
+Usage:
+    python -m a_btest plan scenarios.csv results.parquet --weeks 6
+    python -m a_btest cuped users.csv --pre pre_revenue --post revenue --variant variant
+    python -m a_btest ratio users.csv --numerator revenue --denominator visits --variant variant
+    python -m a_btest segments events.csv --variant variant --metric converted --segments device country
+    python -m a_btest sketch history.csv --column revenue --save revenue.tdigest
+    python -m a_btest report scenarios.csv report.pdf --weeks 6
+"""
+
+import argparse
+import sys
+
+from src.a_btest import cuped, planner, ratio, report, segments, sketch
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="a_btest", description="A/B test planning tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    planner.configure_parser(commands.add_parser("plan", help="Size a file of experiment scenarios"))
+    cuped.configure_parser(commands.add_parser("cuped", help="CUPED variance reduction from pre-period data"))
+    ratio.configure_parser(commands.add_parser("ratio", help="Delta-method ratio metric moments and analysis"))
+    segments.configure_parser(commands.add_parser("segments", help="Per-segment results with multiple-testing correction"))
+    sketch.configure_parser(commands.add_parser("sketch", help="Quantile sketch, winsorization caps and capped std"))
+    report.configure_parser(commands.add_parser("report", help="HTML or PDF report of many scenarios with tables and plots"))
+    args = parser.parse_args(argv)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
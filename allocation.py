@@ -0,0 +1,70 @@
+"""
+Traffic Allocation Optimizer
+
+Finds the traffic split that reaches the target power in the fewest days for a multi-arm test.
+
+Every variant is compared with the control, and the test lasts until the slowest comparison
+is powered, so by symmetry all variants get the same share and only the control share has to
+be chosen. Without a correlation-aware correction the optimum is the square-root rule: the
+control gets sqrt(k) times the share of each of the k variants, i.e. 1 / (1 + sqrt(k)) of the
+traffic. Dunnett's critical value depends on the split itself, so the optimizer always runs a
+vectorized search over the control share: a coarse grid, then a fine grid around the best
+point, both clipped to the constraints.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from src.a_btest.API.APIModels import AllocationResponse, DurationParameter
+from src.a_btest.function_estimation import metric_variance, sample_size_vectorized
+
+
+def square_root_allocation(number_of_variants: int) -> float:
+    """Closed-form optimal control share (%) when the critical value does not depend on the split."""
+    k = max(number_of_variants - 1, 1)
+    return 100 / (1 + np.sqrt(k))
+
+
+def _sample_sizes(duration_parameter: DurationParameter, control: np.ndarray) -> np.ndarray:
+    k = max(duration_parameter.number_of_variants - 1, 1)
+    baseline, sigma_2 = metric_variance(duration_parameter)
+    return sample_size_vectorized(
+        baseline,
+        duration_parameter.min_detectable_effect_percentage,
+        sigma_2,
+        duration_parameter.significance_level,
+        duration_parameter.beta,
+        duration_parameter.number_of_variants,
+        control,
+        (100 - control) / k,
+        two_sided=duration_parameter.hypothesis == "Two-sided Test",
+        correction=duration_parameter.correction,
+    )
+
+
+def optimize_allocation(duration_parameter: DurationParameter, min_control: float = 0.0, max_control: Optional[float] = None) -> AllocationResponse:
+    """Allocation minimizing the days to reach power, with min_control <= control share <= max_control (%)."""
+    k = max(duration_parameter.number_of_variants - 1, 1)
+    low = max(min_control, 1.0)
+    high = min(max_control if max_control is not None else 99.0, 99.0)
+    if low > high:
+        raise ValueError("min_control must not exceed max_control")
+
+    # Coarse pass on 1% steps (plus the closed-form optimum), then 0.05% steps around the best point
+    coarse = np.unique(np.clip(np.append(np.arange(np.ceil(low), high + 1e-9, 1.0), [low, high, square_root_allocation(duration_parameter.number_of_variants)]), low, high))
+    best = coarse[np.argmin(_sample_sizes(duration_parameter, coarse))]
+    fine = np.clip(np.arange(best - 1, best + 1 + 1e-9, 0.05), low, high)
+    sizes = _sample_sizes(duration_parameter, fine)
+    control = float(fine[np.argmin(sizes)])
+    sample_size = float(np.min(sizes))
+
+    equal = 100 / (k + 1)
+    equal_size = float(_sample_sizes(duration_parameter, np.array([equal]))[0])
+    daily_visitors = duration_parameter.daily_visitors
+    return AllocationResponse(
+        allocations=[round(control, 2)] + [round((100 - control) / k, 2)] * k,
+        sample_size=round(sample_size),
+        duration_days=round(sample_size / daily_visitors) + 1,
+        equal_split_duration_days=round(equal_size / daily_visitors) + 1,
+    )
@@ -0,0 +1,183 @@
+"""
+Poisson Bootstrap Confidence Intervals
+
+Bootstrap intervals for the difference between two groups of a completed test, for metrics
+where the normal approximation of `function_estimation` is poor (heavy tails, ratios).
+
+1. Poisson bootstrap: every unit gets an independent Poisson(1) weight per resample instead of
+   a multinomial draw, so a resample is a pair of weighted sums that can be accumulated block by
+   block. Aggregated data (value, count) uses Poisson(count) weights, which is the same
+   distribution.
+2. Unit weights are drawn by inverse-CDF lookup on 16-bit random integers, several times
+   faster than `Generator.poisson` (the table resolves Poisson(1) tails down to 1 / 65536).
+3. Resamples are generated in vectorized blocks of at most `MAX_CELLS` weights, so memory does
+   not grow with the number of units or of resamples (only the resampled statistics are kept).
+4. Resamples are split into fixed-size tasks seeded from one `SeedSequence`; the tasks are
+   shared out in contiguous runs, one call per worker of a process pool, so the groups are
+   pickled once per worker. The result only depends on the seed, not on the number of workers.
+5. Percentile and BCa intervals; the BCa acceleration comes from the empirical influence of
+   every unit, computed in closed form from the group sums.
+
+The pool size is set with `ABTEST_BOOTSTRAP_WORKERS` (0 runs in the calling thread). The API
+starts the pool with its lifespan (`start_pool` / `shutdown_pool`); its workers are started with
+`forkserver` (or `spawn`), never forked from the multithreaded server.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+from scipy.stats import norm, poisson
+
+from src.a_btest.API.APIModels import BootstrapRequest, BootstrapResponse, BootstrapSample
+
+MAX_CELLS = 1 << 21  # Poisson weights generated at once
+TASK_RESAMPLES = 1000
+POISSON_1_TABLE = poisson.ppf((np.arange(1 << 16) + 0.5) / (1 << 16), 1).astype(np.uint8)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _configured_workers() -> int:
+    return int(os.environ.get("ABTEST_BOOTSTRAP_WORKERS", os.cpu_count() or 1))
+
+
+def start_pool(workers: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+    """Create the process-wide pool (once) and start its workers; None when bootstrapping inline."""
+    global _pool, _pool_workers
+    workers = _configured_workers() if workers is None else workers
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Forking a server that runs threads can copy locks held by other threads
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+            _pool_workers = workers
+            for _ in range(workers):
+                _pool.submit(int)  # start the workers now rather than on the first request
+    return _pool
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    """Process-wide pool (started on first use outside the API), or None when bootstrapping inline."""
+    if _configured_workers() <= 0:
+        return None
+    return _pool or start_pool()
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _group_arrays(sample: BootstrapSample) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    values = np.asarray(sample.values, dtype=float)
+    counts = np.ones(values.size) if sample.counts is None else np.asarray(sample.counts, dtype=float)
+    denominators = np.ones(values.size) if sample.denominators is None else np.asarray(sample.denominators, dtype=float)
+    if counts.size != values.size or denominators.size != values.size:
+        raise ValueError("counts and denominators must have one entry per value")
+    return values, counts, denominators
+
+
+def _statistic(control: np.ndarray, variant: np.ndarray, statistic: str) -> np.ndarray:
+    # Group metrics are ratios of sums (plain means when every denominator is 1)
+    return variant - control if statistic == "difference" else 100 * (variant / control - 1)
+
+
+def _resampled_metric(rng: np.random.Generator, group: tuple[np.ndarray, np.ndarray, np.ndarray], resamples: int) -> np.ndarray:
+    values, counts, denominators = group
+    numerator = np.zeros(resamples)
+    denominator = np.zeros(resamples)
+    block = max(1, MAX_CELLS // resamples)
+    unit_counts = bool(np.all(counts == 1))
+    for start in range(0, values.size, block):
+        stop = min(start + block, values.size)
+        if unit_counts:
+            weights = POISSON_1_TABLE[rng.integers(0, 1 << 16, size=(resamples, stop - start), dtype=np.uint16)]
+        else:
+            weights = rng.poisson(counts[start:stop], size=(resamples, stop - start))
+        numerator += weights @ values[start:stop]
+        denominator += weights @ denominators[start:stop]
+    # An empty resample (all weights 0) has no metric
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return numerator / denominator
+
+
+def _bootstrap_task(seed: np.random.SeedSequence, resamples: int, control, variant, statistic: str) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return _statistic(_resampled_metric(rng, control, resamples), _resampled_metric(rng, variant, resamples), statistic)
+
+
+def _bootstrap_tasks(tasks: list[tuple[np.random.SeedSequence, int]], control, variant, statistic: str) -> np.ndarray:
+    # A run of consecutive tasks on one worker: the groups are sent once for all of them
+    return np.concatenate([_bootstrap_task(seed, size, control, variant, statistic) for seed, size in tasks])
+
+
+def bootstrap_distribution(control, variant, statistic: str, resamples: int, seed: int = 0) -> np.ndarray:
+    """Resampled statistics (NaN-free), reproducible for a given seed."""
+    sizes = [TASK_RESAMPLES] * (resamples // TASK_RESAMPLES) + ([resamples % TASK_RESAMPLES] if resamples % TASK_RESAMPLES else [])
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+    pool = get_pool()
+    if pool is None or len(tasks) == 1:
+        distribution = _bootstrap_tasks(tasks, control, variant, statistic)
+    else:
+        runs = [list(run) for run in np.array_split(np.arange(len(tasks)), min(_pool_workers, len(tasks)))]
+        futures = [pool.submit(_bootstrap_tasks, [tasks[i] for i in run], control, variant, statistic) for run in runs]
+        distribution = np.concatenate([future.result() for future in futures])
+    return distribution[np.isfinite(distribution)]
+
+
+def acceleration(control, variant, statistic: str) -> float:
+    """BCa acceleration sum(U^3) / (6 sum(U^2)^1.5) from the empirical influence U of each unit."""
+    influences = []
+    metrics = [values @ counts / (denominators @ counts) for values, counts, denominators in (control, variant)]
+    if statistic == "difference":
+        derivatives = [-1.0, 1.0]
+    else:
+        derivatives = [-100 * metrics[1] / metrics[0] ** 2, 100 / metrics[0]]
+    for (values, counts, denominators), metric, derivative in zip((control, variant), metrics, derivatives):
+        # Influence of one unit on a ratio of sums, chained through the statistic
+        influence = derivative * (values - metric * denominators) / (denominators @ counts)
+        influences.append((influence, counts))
+    u2 = sum(counts @ influence**2 for influence, counts in influences)
+    u3 = sum(counts @ influence**3 for influence, counts in influences)
+    return float(u3 / (6 * u2**1.5)) if u2 > 0 else 0.0
+
+
+def bootstrap_interval(request: BootstrapRequest) -> BootstrapResponse:
+    control, variant = _group_arrays(request.control), _group_arrays(request.variant)
+    estimate = float(
+        _statistic(
+            np.array(control[0] @ control[1] / (control[2] @ control[1])),
+            np.array(variant[0] @ variant[1] / (variant[2] @ variant[1])),
+            request.statistic,
+        )
+    )
+    distribution = bootstrap_distribution(control, variant, request.statistic, request.resamples, request.seed)
+    tail = (100 - request.confidence_level) / 200
+    levels = np.array([tail, 1 - tail])
+    if request.method == "bca":
+        # Bias correction from the share of resamples below the estimate (ties count half)
+        below = (np.sum(distribution < estimate) + 0.5 * np.sum(distribution == estimate)) / distribution.size
+        z0 = norm.ppf(np.clip(below, 1 / distribution.size, 1 - 1 / distribution.size))
+        a = acceleration(control, variant, request.statistic)
+        z = norm.ppf(levels)
+        levels = norm.cdf(z0 + (z0 + z) / (1 - a * (z0 + z)))
+    lower, upper = np.quantile(distribution, levels)
+    return BootstrapResponse(
+        estimate=estimate,
+        lower=float(lower),
+        upper=float(upper),
+        standard_error=float(distribution.std(ddof=1)),
+        method=request.method,
+        resamples=int(distribution.size),
+    )
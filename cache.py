@@ -0,0 +1,208 @@
+"""
+Persistent Result Cache
+
+This module provides an on-disk cache for computed tables and rendered plots, shared by
+every uvicorn worker on the same host. It includes:
+1. A small `CacheBackend` interface so the storage can be swapped out.
+2. `SQLiteCache`, a multi-process safe backend (WAL mode) with TTL and size-based eviction.
+3. `NullCache`, a no-op backend used when caching is disabled.
+4. Helpers to build canonical keys from pydantic models and to read through the cache. Keys
+   carry `CACHE_VERSION`, so bumping it when a formula or a stored format changes makes old
+   entries unreachable instead of serving them until their TTL runs out.
+
+Large entries are zlib-compressed before being written. The backend is selected with the
+`ABTEST_CACHE_PATH` environment variable ("" or "off" disables the cache).
+"""
+
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from hashlib import sha256
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "a_btest", "results.sqlite3")
+DEFAULT_TTL = 7 * 24 * 3600  # one week, in seconds
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+COMPRESS_THRESHOLD = 1024  # entries smaller than this are stored uncompressed
+EVICT_EVERY = 64  # run eviction once every N writes per process
+# Bump whenever a cached computation or the shape of a cached value changes
+CACHE_VERSION = 1
+
+
+class CacheBackend:
+    """Minimal interface every cache backend implements."""
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class NullCache(CacheBackend):
+    """Backend that stores nothing; every lookup is a miss."""
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        return None
+
+    def delete(self, key: str) -> None:
+        return None
+
+
+class SQLiteCache(CacheBackend):
+    """
+    SQLite-backed cache shared across processes.
+
+    Each process opens its own connection per thread; SQLite's WAL journal lets readers
+    proceed while one writer commits. Expired rows are ignored on read and purged during
+    eviction, which also trims the least recently used rows once the file grows past
+    `max_bytes`.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, compressed INTEGER NOT NULL, "
+                "size INTEGER NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        conn = self._connect()
+        row = conn.execute("SELECT value, compressed, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or row[2] < now:
+            self.misses += 1
+            return None
+        self.hits += 1
+        conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        data = zlib.decompress(row[0]) if row[1] else row[0]
+        return pickle.loads(data)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        compressed = len(data) >= COMPRESS_THRESHOLD
+        if compressed:
+            data = zlib.compress(data, 6)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, compressed, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, sqlite3.Binary(data), int(compressed), len(data), expires_at, now),
+        )
+        self._writes += 1
+        if self._writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def delete(self, key: str) -> None:
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def evict(self) -> None:
+        """Drop expired rows, then the least recently used ones until under `max_bytes`."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+            if total > self.max_bytes:
+                # Remove the oldest entries until we are back under 90% of the budget
+                excess = total - int(self.max_bytes * 0.9)
+                conn.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    "SELECT key FROM (SELECT key, size, SUM(size) OVER (ORDER BY accessed_at) AS running FROM cache) "
+                    "WHERE running - size < ?)",
+                    (excess,),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def make_key(namespace: str, *parts: Any) -> str:
+    """Build a canonical, versioned cache key from a namespace and models / plain values."""
+    canonical = []
+    for part in parts:
+        if isinstance(part, BaseModel):
+            part = part.model_dump(mode="json")
+        canonical.append(part)
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return f"v{CACHE_VERSION}:{namespace}:{sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def cached(cache: CacheBackend, key: str, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+    """Return the cached value for `key`, computing and storing it on a miss."""
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, ttl)
+    return value
+
+
+_cache: Optional[CacheBackend] = None
+
+
+def get_cache() -> CacheBackend:
+    """Return the process-wide cache backend configured through the environment."""
+    global _cache
+    if _cache is None:
+        path = os.environ.get("ABTEST_CACHE_PATH", DEFAULT_CACHE_PATH)
+        if path.strip().lower() in ("", "off", "none"):
+            _cache = NullCache()
+        else:
+            _cache = SQLiteCache(
+                path,
+                ttl=float(os.environ.get("ABTEST_CACHE_TTL", DEFAULT_TTL)),
+                max_bytes=int(os.environ.get("ABTEST_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            )
+    return _cache
@@ -0,0 +1,164 @@
+"""
+Multiple-Comparison Corrections
+
+Critical values and p-value adjustments for tests with several variants. It includes:
+1. `critical_z`: the per-comparison critical value used when planning sample sizes, for the
+   Bonferroni, Šidák, Holm and Dunnett (many-to-one) corrections.
+2. Dunnett critical values from the equicorrelated multivariate normal, computed exactly with
+   Gauss-Hermite quadrature, read from a precomputed on-disk table when available, and
+   memoized per process.
+3. `adjust_pvalues`: adjusted p-values for result analysis.
+
+Conventions: significance levels are in %, `number_of_variants` counts every group including
+the control (as in `Parameter`), so there are `number_of_variants - 1` comparisons against the
+control. Bonferroni keeps the historical divisor of `number_of_variants` so existing plans do
+not change. Holm is planned at its first (most stringent) step, alpha / comparisons; its gain
+over Bonferroni shows at analysis time. The allocation ratio is control / variant allocation.
+"""
+
+import os
+import sys
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+from scipy.optimize import brentq
+from scipy.stats import norm
+
+CORRECTIONS = ("bonferroni", "sidak", "holm", "dunnett")
+
+DEFAULT_DUNNETT_TABLE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "a_btest", "dunnett.npz")
+TABLE_COMPARISONS = np.arange(1, 11)
+TABLE_ALPHAS = np.array([0.5, 1.0, 2.5, 5.0, 10.0, 20.0])
+TABLE_RATIOS = np.geomspace(0.25, 4.0, 17)
+
+_nodes, _weights = np.polynomial.hermite.hermgauss(64)
+_nodes = np.sqrt(2) * _nodes
+_weights = _weights / np.sqrt(np.pi)
+
+
+def _dunnett_coverage(c: float, comparisons: int, rho: float, two_sided: bool) -> float:
+    # P(max_i Z_i <= c) (or max |Z_i|) for equicorrelated standard normals, by conditioning on
+    # the shared component: Z_i = sqrt(rho) * U + sqrt(1 - rho) * E_i
+    shift = np.sqrt(rho) * _nodes
+    scale = np.sqrt(1 - rho)
+    inner = norm.cdf((c - shift) / scale)
+    if two_sided:
+        inner = inner - norm.cdf((-c - shift) / scale)
+    return float(np.sum(_weights * inner**comparisons))
+
+
+def dunnett_exact(comparisons: int, significance_level: float, allocation_ratio: float = 1.0, two_sided: bool = False) -> float:
+    """Solve for Dunnett's many-to-one critical value."""
+    alpha = significance_level * 0.01
+    if comparisons <= 1:
+        return float(norm.ppf(1 - alpha / (2 if two_sided else 1)))
+    rho = 1 / (1 + allocation_ratio)
+    sides = 2 if two_sided else 1
+    # Dunnett lies between the uncorrected and the Bonferroni critical values
+    low = norm.ppf(1 - alpha / sides) - 1e-6
+    high = norm.ppf(1 - alpha / (sides * comparisons)) + 1e-6
+    return float(brentq(lambda c: _dunnett_coverage(c, comparisons, rho, two_sided) - (1 - alpha), low, high, xtol=1e-10))
+
+
+def build_dunnett_table(path: str = DEFAULT_DUNNETT_TABLE_PATH) -> np.ndarray:
+    """Precompute critical values over (sides, comparisons, alpha, ratio) and save them."""
+    values = np.empty((2, len(TABLE_COMPARISONS), len(TABLE_ALPHAS), len(TABLE_RATIOS)))
+    for s, two_sided in enumerate((False, True)):
+        for i, comparisons in enumerate(TABLE_COMPARISONS):
+            for j, alpha in enumerate(TABLE_ALPHAS):
+                for k, ratio in enumerate(TABLE_RATIOS):
+                    values[s, i, j, k] = dunnett_exact(int(comparisons), float(alpha), float(ratio), two_sided)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, values=values, comparisons=TABLE_COMPARISONS, alphas=TABLE_ALPHAS, ratios=TABLE_RATIOS)
+    os.replace(tmp_path, path)
+    return values
+
+
+_table: Optional[dict] = None
+
+
+def _load_table() -> Optional[dict]:
+    global _table
+    if _table is None:
+        path = os.environ.get("ABTEST_DUNNETT_TABLE_PATH", DEFAULT_DUNNETT_TABLE_PATH)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            _table = {name: data[name] for name in data.files}
+    return _table
+
+
+@lru_cache(maxsize=4096)
+def dunnett_critical_value(comparisons: int, significance_level: float, allocation_ratio: float = 1.0, two_sided: bool = False) -> float:
+    """
+    Dunnett critical value, interpolated from the on-disk table when (comparisons, alpha) is on
+    its grid and the ratio within its range, computed exactly otherwise.
+    """
+    table = _load_table()
+    if table is not None:
+        i = np.flatnonzero(table["comparisons"] == comparisons)
+        j = np.flatnonzero(np.isclose(table["alphas"], significance_level))
+        ratios = table["ratios"]
+        if len(i) and len(j) and ratios[0] <= allocation_ratio <= ratios[-1]:
+            row = table["values"][int(two_sided), i[0], j[0]]
+            # The critical value is smooth in log(ratio), so interpolate on that scale
+            return float(np.interp(np.log(allocation_ratio), np.log(ratios), row))
+    return dunnett_exact(comparisons, significance_level, allocation_ratio, two_sided)
+
+
+def critical_z(significance_level, number_of_variants, two_sided=False, correction="bonferroni", allocation_ratio=1.0) -> np.ndarray:
+    """Per-comparison critical value for planning; all arguments broadcast."""
+    alpha, variants, two_sided, correction, ratio = np.broadcast_arrays(
+        np.asarray(significance_level, dtype=float),
+        np.asarray(number_of_variants),
+        np.asarray(two_sided, dtype=bool),
+        np.asarray(correction, dtype=object),
+        np.asarray(allocation_ratio, dtype=float),
+    )
+    sides = np.where(two_sided, 2, 1)
+    comparisons = np.maximum(variants - 1, 1)
+    z = np.empty(alpha.shape)
+    for method in np.unique(correction) if correction.size else ():
+        if method not in CORRECTIONS:
+            raise ValueError(f"Unknown correction '{method}', expected one of {', '.join(CORRECTIONS)}")
+        mask = correction == method
+        a = alpha[mask] * 0.01 / sides[mask]
+        if method == "bonferroni":
+            z[mask] = norm.ppf(1 - a / variants[mask])
+        elif method == "holm":
+            z[mask] = norm.ppf(1 - a / comparisons[mask])
+        elif method == "sidak":
+            z[mask] = norm.ppf((1 - a) ** (1 / comparisons[mask]))
+        else:
+            z[mask] = [
+                dunnett_critical_value(int(k), float(s), float(r), bool(t))
+                for k, s, r, t in zip(comparisons[mask], alpha[mask], ratio[mask], two_sided[mask])
+            ]
+    return z
+
+
+def adjust_pvalues(pvalues, correction: str = "holm") -> np.ndarray:
+    """Family-wise adjusted p-values (Bonferroni, Šidák or Holm step-down)."""
+    p = np.asarray(pvalues, dtype=float)
+    m = p.size
+    if correction == "bonferroni":
+        return np.minimum(p * m, 1.0)
+    if correction == "sidak":
+        return 1 - (1 - p) ** m
+    if correction == "holm":
+        order = np.argsort(p, axis=None)
+        stepped = np.maximum.accumulate((m - np.arange(m)) * p.ravel()[order])
+        adjusted = np.empty(m)
+        adjusted[order] = np.minimum(stepped, 1.0)
+        return adjusted.reshape(p.shape)
+    raise ValueError(f"Unsupported p-value correction '{correction}'")
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("ABTEST_DUNNETT_TABLE_PATH", DEFAULT_DUNNETT_TABLE_PATH)
+    build_dunnett_table(target)
+    print(f"Wrote Dunnett critical values to {target}")
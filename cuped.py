@@ -0,0 +1,196 @@
+"""
+CUPED Variance Reduction
+
+CUPED adjusts an in-experiment metric Y with a pre-experiment covariate X of the same user:
+Y_cuped = Y - theta * (X - mean(X)), with theta = cov(X, Y) / var(X). The adjusted variance is
+var(Y) * (1 - rho^2), so a strongly correlated pre-period shrinks the required sample size.
+
+Everything here is computed in a single streaming pass with bounded memory:
+1. `MomentAccumulator` keeps counts, means and (co-)moments; each chunk is reduced with NumPy
+   and merged with Chan's parallel update, so accumulators from several files or workers can
+   also be merged.
+2. `accumulate_file` streams a CSV / Parquet file, optionally split by variant; the per-variant
+   moments of a chunk come from a handful of `np.bincount` reductions (`grouped_moments`).
+   Rows with a missing or non-finite value, or a missing variant, are ignored.
+3. `analyze` compares variants on the CUPED-adjusted means with a z-test.
+
+The resulting reduction feeds planning through `variance_reduction_percentage` of
+`DurationParameter`. From the command line:
+    python -m a_btest cuped users.parquet --pre revenue_before --post revenue --variant variant
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.a_btest.datasource import DEFAULT_CHUNK_ROWS, iter_column_chunks
+from src.a_btest.function_estimation import z_test_vectorized
+
+
+@dataclass
+class MomentAccumulator:
+    n: int = 0
+    mean_x: float = 0.0
+    mean_y: float = 0.0
+    m2_x: float = 0.0  # sum of squared deviations of x
+    m2_y: float = 0.0
+    c_xy: float = 0.0  # sum of cross deviations
+
+    def update(self, x, y) -> "MomentAccumulator":
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        # One empty cell would otherwise turn every moment into NaN
+        keep = np.isfinite(x) & np.isfinite(y)
+        x, y = x[keep], y[keep]
+        if x.size == 0:
+            return self
+        mean_x, mean_y = x.mean(), y.mean()
+        dx, dy = x - mean_x, y - mean_y
+        chunk = MomentAccumulator(x.size, float(mean_x), float(mean_y), float(dx @ dx), float(dy @ dy), float(dx @ dy))
+        return self.merge(chunk)
+
+    def merge(self, other: "MomentAccumulator") -> "MomentAccumulator":
+        """Combine with another accumulator in place (Chan et al. pairwise update)."""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(asdict(other))
+            return self
+        n = self.n + other.n
+        delta_x = other.mean_x - self.mean_x
+        delta_y = other.mean_y - self.mean_y
+        factor = self.n * other.n / n
+        self.m2_x += other.m2_x + delta_x**2 * factor
+        self.m2_y += other.m2_y + delta_y**2 * factor
+        self.c_xy += other.c_xy + delta_x * delta_y * factor
+        self.mean_x += delta_x * other.n / n
+        self.mean_y += delta_y * other.n / n
+        self.n = n
+        return self
+
+    @property
+    def var_x(self) -> float:
+        return self.m2_x / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def var_y(self) -> float:
+        return self.m2_y / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def cov(self) -> float:
+        return self.c_xy / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def theta(self) -> float:
+        return self.c_xy / self.m2_x if self.m2_x > 0 else 0.0
+
+    def adjusted_variance(self, theta: Optional[float] = None) -> float:
+        theta = self.theta if theta is None else theta
+        return self.var_y - 2 * theta * self.cov + theta**2 * self.var_x
+
+    @property
+    def variance_reduction(self) -> float:
+        """Share of var(Y) removed by CUPED (rho^2), in [0, 1]."""
+        return 1 - self.adjusted_variance() / self.var_y if self.var_y > 0 else 0.0
+
+
+def grouped_moments(groups: np.ndarray, x, y, group_count: int) -> list[MomentAccumulator]:
+    """Moments of one chunk for every group at once (groups are integer codes < group_count)."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = np.bincount(groups, minlength=group_count)
+    safe_n = np.maximum(n, 1)
+    mean_x = np.bincount(groups, x, group_count) / safe_n
+    mean_y = np.bincount(groups, y, group_count) / safe_n
+    # Deviations from the group means keep the sums of squares free of cancellation
+    dx = x - mean_x[groups]
+    dy = y - mean_y[groups]
+    m2_x = np.bincount(groups, dx * dx, group_count)
+    m2_y = np.bincount(groups, dy * dy, group_count)
+    c_xy = np.bincount(groups, dx * dy, group_count)
+    return [MomentAccumulator(int(n[g]), float(mean_x[g]), float(mean_y[g]), float(m2_x[g]), float(m2_y[g]), float(c_xy[g])) for g in range(group_count)]
+
+
+def accumulate_grouped(path: str, x_column: str, y_column: str, group_column: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict[str, MomentAccumulator]:
+    """One pass over a file; returns accumulators per group plus the pooled one under "all"."""
+    columns = [x_column, y_column] + ([group_column] if group_column else [])
+    accumulators: dict[str, MomentAccumulator] = {"all": MomentAccumulator()}
+    for chunk in iter_column_chunks(path, columns, chunk_rows):
+        x, y = np.asarray(chunk[x_column], dtype=float), np.asarray(chunk[y_column], dtype=float)
+        keep = np.isfinite(x) & np.isfinite(y)
+        if group_column:
+            keep &= pd.notna(chunk[group_column])
+        x, y = x[keep], y[keep]
+        accumulators["all"].update(x, y)
+        if group_column and x.size:
+            labels, codes = np.unique(chunk[group_column][keep].astype(str), return_inverse=True)
+            for label, moments in zip(labels, grouped_moments(codes, x, y, len(labels))):
+                accumulators.setdefault(str(label), MomentAccumulator()).merge(moments)
+    return accumulators
+
+
+def accumulate_file(path: str, pre_column: str, post_column: str, variant_column: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict[str, MomentAccumulator]:
+    """CUPED moments (x = pre-period, y = in-experiment) per variant plus the pooled ones under "all"."""
+    return accumulate_grouped(path, pre_column, post_column, variant_column, chunk_rows)
+
+
+def analyze(accumulators: dict[str, MomentAccumulator], control: str) -> list[dict]:
+    """CUPED-adjusted comparison of every variant against `control` (two-sided z-test)."""
+    pooled = accumulators["all"]
+    theta = pooled.theta
+
+    def adjusted(acc: MomentAccumulator) -> tuple[float, float]:
+        return acc.mean_y - theta * (acc.mean_x - pooled.mean_x), acc.adjusted_variance(theta) / acc.n
+
+    control_mean, control_var = adjusted(accumulators[control])
+    results = []
+    for name, acc in accumulators.items():
+        if name in ("all", control):
+            continue
+        mean, var = adjusted(acc)
+        diff, se, z, p_value = (float(v) for v in z_test_vectorized(control_mean, control_var, mean, var))
+        results.append(
+            {
+                "variant": name,
+                "n": acc.n,
+                "adjusted_mean": mean,
+                "difference": diff,
+                "relative_difference_percentage": 100 * diff / control_mean if control_mean else None,
+                "standard_error": se,
+                "z": z,
+                "p_value": p_value,
+            }
+        )
+    return results
+
+
+def configure_parser(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("input", help="Per-user data (.csv or .parquet)")
+    parser.add_argument("--pre", required=True, help="Pre-experiment covariate column")
+    parser.add_argument("--post", required=True, help="In-experiment metric column")
+    parser.add_argument("--variant", default=None, help="Variant column, to analyze the results")
+    parser.add_argument("--control", default=None, help="Control variant name (default: first in sort order)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.set_defaults(func=_run)
+
+
+def _run(args: argparse.Namespace) -> None:
+    accumulators = accumulate_file(args.input, args.pre, args.post, args.variant, args.chunk_rows)
+    pooled = accumulators["all"]
+    report = {
+        "n": pooled.n,
+        "theta": pooled.theta,
+        "std": float(np.sqrt(pooled.var_y)),
+        "cuped_std": float(np.sqrt(pooled.adjusted_variance())),
+        "variance_reduction_percentage": 100 * pooled.variance_reduction,
+    }
+    variants = sorted(name for name in accumulators if name != "all")
+    if len(variants) > 1:
+        report["results"] = analyze(accumulators, args.control or variants[0])
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
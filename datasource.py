@@ -0,0 +1,29 @@
+"""
+Chunked Column Readers
+
+Streams selected columns of large CSV or Parquet files as NumPy arrays, one bounded chunk at a
+time, for the one-pass estimators (CUPED, ratio metrics, quantile sketches, ...).
+"""
+
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+def is_parquet(path: str) -> bool:
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def iter_column_chunks(path: str, columns: list[str], chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[dict[str, np.ndarray]]:
+    """Yield {column: array} chunks of at most `chunk_rows` rows."""
+    if is_parquet(path):
+        import pyarrow.parquet as pq  # optional dependency, only needed for Parquet
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield {column: batch.column(column).to_numpy(zero_copy_only=False) for column in columns}
+        return
+    for frame in pd.read_csv(path, usecols=columns, chunksize=chunk_rows):
+        yield {column: frame[column].to_numpy() for column in columns}
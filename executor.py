@@ -0,0 +1,174 @@
+"""
+Bounded Compute Executor
+
+The route handlers of both apps are `async def` but do synchronous, CPU-bound work
+(scipy quantiles, matplotlib rendering). This module moves that work off the event loop and
+adds admission control. It includes:
+1. A shared thread pool that runs the computations.
+2. Per-route-group concurrency limits, so cheap and expensive routes cannot starve each other.
+3. Queue-time and run-time measurement for every call.
+4. Load shedding: once a call has waited `max_queue_wait` seconds for a slot (or the queue
+   is already `max_queue` deep) it fails fast with `Overloaded`, which both apps turn into a
+   503 response with a `Retry-After` header.
+
+Limits are configured per deployment with `ABTEST_ROUTE_LIMITS`, a JSON object such as
+`{"plot": {"max_concurrency": 2, "max_queue_wait": 0.5}}`, and the pool size with
+`ABTEST_EXECUTOR_WORKERS`.
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from src.a_btest.tracing import span
+
+
+@dataclass
+class RouteLimit:
+    max_concurrency: int = 4
+    max_queue_wait: float = 2.0  # seconds a call may wait for a slot before being shed
+    max_queue: Optional[int] = None  # callers allowed to wait at once (None = unbounded)
+
+
+DEFAULT_LIMITS = {
+    "sample_size": RouteLimit(max_concurrency=8, max_queue_wait=1.0),
+    "table": RouteLimit(max_concurrency=4, max_queue_wait=2.0),
+    "plot": RouteLimit(max_concurrency=2, max_queue_wait=2.0, max_queue=32),
+}
+
+
+class Overloaded(Exception):
+    """Raised when a call is shed because its route group is saturated."""
+
+    def __init__(self, route: str, retry_after: float):
+        super().__init__(f"Route group '{route}' is overloaded")
+        self.route = route
+        self.retry_after = retry_after
+
+
+@dataclass
+class RouteStats:
+    limit: RouteLimit
+    semaphore: Optional[asyncio.Semaphore] = None
+    running: int = 0
+    waiting: int = 0
+    completed: int = 0
+    shed: int = 0
+    queue_times: deque = field(default_factory=lambda: deque(maxlen=1000))
+    run_times: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def summary(self) -> dict:
+        return {
+            "max_concurrency": self.limit.max_concurrency,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "shed": self.shed,
+            "queue_time_p50": _percentile(self.queue_times, 50),
+            "queue_time_p95": _percentile(self.queue_times, 95),
+            "run_time_p50": _percentile(self.run_times, 50),
+            "run_time_p95": _percentile(self.run_times, 95),
+        }
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class ComputeExecutor:
+    def __init__(self, limits: Optional[dict[str, RouteLimit]] = None, workers: Optional[int] = None):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        workers = workers or sum(limit.max_concurrency for limit in self.limits.values())
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="abtest-compute")
+        self.routes: dict[str, RouteStats] = {}
+
+    def _stats(self, route: str) -> RouteStats:
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = RouteStats(limit=self.limits.get(route, RouteLimit()))
+        if stats.semaphore is None:
+            # Created lazily so it binds to the running event loop
+            stats.semaphore = asyncio.Semaphore(stats.limit.max_concurrency)
+        return stats
+
+    async def run(self, route: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` in the pool under the limits of `route`."""
+        stats = self._stats(route)
+        limit = stats.limit
+        if limit.max_queue is not None and stats.waiting >= limit.max_queue and stats.semaphore.locked():
+            stats.shed += 1
+            raise Overloaded(route, retry_after=limit.max_queue_wait)
+
+        enqueued = time.perf_counter()
+        stats.waiting += 1
+        try:
+            await asyncio.wait_for(stats.semaphore.acquire(), timeout=limit.max_queue_wait)
+        except asyncio.TimeoutError:
+            stats.shed += 1
+            raise Overloaded(route, retry_after=limit.max_queue_wait)
+        finally:
+            stats.waiting -= 1
+
+        started = time.perf_counter()
+        stats.queue_times.append(started - enqueued)
+        stats.running += 1
+        try:
+            # Copy the context so context variables (e.g. tracing) follow the call into the pool
+            with span("compute", route=route, queue_time=started - enqueued):
+                call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+                return await asyncio.get_running_loop().run_in_executor(self.pool, call)
+        finally:
+            stats.running -= 1
+            stats.completed += 1
+            stats.run_times.append(time.perf_counter() - started)
+            stats.semaphore.release()
+
+    def stats(self) -> dict:
+        return {route: stats.summary() for route, stats in self.routes.items()}
+
+
+def limits_from_env() -> dict[str, RouteLimit]:
+    raw = os.environ.get("ABTEST_ROUTE_LIMITS")
+    if not raw:
+        return {}
+    return {route: RouteLimit(**values) for route, values in json.loads(raw).items()}
+
+
+_executor: Optional[ComputeExecutor] = None
+
+
+def get_executor() -> ComputeExecutor:
+    """Return the process-wide executor configured through the environment."""
+    global _executor
+    if _executor is None:
+        workers = os.environ.get("ABTEST_EXECUTOR_WORKERS")
+        _executor = ComputeExecutor(limits_from_env(), int(workers) if workers else None)
+    return _executor
+
+
+async def run_compute(route: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Shortcut for `get_executor().run(...)`."""
+    return await get_executor().run(route, fn, *args, **kwargs)
+
+
+async def overloaded_handler(request: Request, exc: Overloaded) -> JSONResponse:
+    # Exception handler shared by both apps: fast 503 with a retry hint
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=503,
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
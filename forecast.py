@@ -0,0 +1,69 @@
+"""
+Traffic-Driven Duration Forecasting
+
+`get_sz_duration` assumes every day brings `daily_visitors`. This module forecasts durations
+against a realistic traffic curve instead, either:
+1. An explicit daily traffic series (e.g. last year's history used as the forecast), shared by
+   every experiment of the batch, or
+2. A day-of-week profile and a weekly growth rate applied to each experiment's own
+   `daily_visitors`.
+
+The cumulative traffic is computed once per batch and every experiment is answered with a
+binary search (`np.searchsorted`), so thousands of experiments against a multi-year series
+cost one cumulative sum plus O(n log T).
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from src.a_btest.API.APIModels import DurationParameter, ForecastRow, TrafficProfile
+from src.a_btest.function_estimation import parameter_arrays, sample_size_vectorized
+
+
+def traffic_shape(profile: TrafficProfile) -> np.ndarray:
+    """Relative traffic per day (1.0 = an average day at the start of the forecast)."""
+    days = np.arange(profile.horizon_days)
+    weekly = np.ones(7)
+    if profile.day_of_week_profile is not None:
+        weekly = np.asarray(profile.day_of_week_profile, dtype=float)
+        weekly = weekly / weekly.mean()
+    seasonal = weekly[(days + profile.start_weekday) % 7]
+    growth = (1 + profile.weekly_growth_percentage / 100) ** (days / 7)
+    return seasonal * growth
+
+
+def days_to_reach(sample_sizes: np.ndarray, cumulative: np.ndarray, start_days: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Number of days (counting the start day) until the cumulative traffic from each start day
+    reaches each sample size; -1 when it is not reached within the series.
+    """
+    sample_sizes = np.asarray(sample_sizes, dtype=float)
+    starts = np.zeros(sample_sizes.shape, dtype=int) if start_days is None else np.asarray(start_days, dtype=int)
+    # Traffic accumulated before the start day is added to the target instead of re-summing
+    before = np.where(starts > 0, cumulative[np.clip(starts - 1, 0, len(cumulative) - 1)], 0.0)
+    end = np.searchsorted(cumulative, sample_sizes + before, side="left")
+    return np.where(end < len(cumulative), end - starts + 1, -1)
+
+
+def forecast_durations(parameters: list[DurationParameter], profile: TrafficProfile, start_days: Optional[list[int]] = None) -> list[ForecastRow]:
+    """
+    Sample size and forecast duration of every experiment of the batch. Raises ValueError for
+    an experiment without a finite sample size.
+    """
+    engine, mde, daily_visitors = parameter_arrays(parameters)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sample_sizes = sample_size_vectorized(mde_percentage=mde, **engine)
+    unreachable = np.flatnonzero(~np.isfinite(sample_sizes))
+    if len(unreachable):
+        raise ValueError(f"Experiment {int(unreachable[0])} has no finite sample size (the MDE must be > 0)")
+    starts = None if start_days is None else np.asarray(start_days, dtype=int)
+
+    if profile.daily_traffic is not None:
+        # One absolute series for the whole batch
+        days = days_to_reach(sample_sizes, np.cumsum(np.asarray(profile.daily_traffic, dtype=float)), starts)
+    else:
+        # Each experiment scales the shared shape by its own traffic: search in units of its daily visitors
+        days = days_to_reach(sample_sizes / daily_visitors, np.cumsum(traffic_shape(profile)), starts)
+
+    return [ForecastRow(sample_size=round(float(size)), duration_days=int(day) if day > 0 else None) for size, day in zip(sample_sizes, days)]
@@ -3,51 +3,183 @@ A/B Testing Backend Logic
 
 This module implements the core mathematical and plotting functionalities for A/B testing. 
 It includes:
-1. Calculation of sample size and test duration.
+1. Calculation of sample size and test duration (scalar and vectorized).
 2. Estimation of Minimum Detectable Effect (MDE).
 3. Visualization of hypothesis testing through power analysis plots.
+4. PNG rendering of those plots, shared by the API and the dashboard.
 
 
 """
 
+import io
 from math import sqrt
 import numpy as np
 from scipy.stats import norm
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from src.a_btest.API.APIModels import *
+from src.a_btest.corrections import critical_z
+from src.a_btest.tracing import span, traced
 
 
-def get_sz_duration(duration_parameter: DurationParameter) -> tuple[float, int]:
+def _z_total(significance_level, beta, number_of_variants, control_allocation, variant_allocations, two_sided, correction):
+    # Critical value of the corrected test plus the power quantile
+    ratio = np.asarray(control_allocation, dtype=float) / np.asarray(variant_allocations, dtype=float)
+    z_alpha = critical_z(significance_level, number_of_variants, two_sided, correction, ratio)
+    return z_alpha + norm.ppf(1 - np.asarray(beta, dtype=float) * 0.01)
+
+
+def sample_size_vectorized(baseline, mde_percentage, sigma_2, significance_level, beta, number_of_variants, control_allocation=50, variant_allocations=50, two_sided=False, correction="bonferroni") -> np.ndarray:
+    """
+    Vectorized total sample size for any broadcastable combination of inputs.
+
+    `baseline` and `sigma_2` are in metric units (a rate in [0, 1] for binomial metrics),
+    percentages (`mde_percentage`, `significance_level`, `beta`, allocations) are in %.
+    """
+    z = _z_total(significance_level, beta, number_of_variants, control_allocation, variant_allocations, two_sided, correction)
+    c = 100 / np.asarray(control_allocation, dtype=float) + 100 / np.asarray(variant_allocations, dtype=float)
+    delta = 0.01 * np.asarray(baseline, dtype=float) * np.asarray(mde_percentage, dtype=float)
+    return c * sigma_2 * z**2 / delta**2
+
+
+def detectable_effect_vectorized(sample_size, baseline, sigma_2, significance_level, beta, number_of_variants, control_allocation=50, variant_allocations=50, two_sided=False, correction="bonferroni") -> np.ndarray:
+    """Inverse of `sample_size_vectorized`: relative MDE (%) reachable with `sample_size` visitors."""
+    z = _z_total(significance_level, beta, number_of_variants, control_allocation, variant_allocations, two_sided, correction)
+    c = 100 / np.asarray(control_allocation, dtype=float) + 100 / np.asarray(variant_allocations, dtype=float)
+    return 100 * z * np.sqrt(c * sigma_2 / np.asarray(sample_size, dtype=float)) / np.asarray(baseline, dtype=float)
+
+
+def power_vectorized(sample_size, baseline, mde_percentage, sigma_2, significance_level, number_of_variants, control_allocation=50, variant_allocations=50, two_sided=False, correction="bonferroni") -> np.ndarray:
+    """Inverse of `sample_size_vectorized` in the power: power (%) reached with `sample_size` visitors."""
+    ratio = np.asarray(control_allocation, dtype=float) / np.asarray(variant_allocations, dtype=float)
+    z_alpha = critical_z(significance_level, number_of_variants, two_sided, correction, ratio)
+    c = 100 / np.asarray(control_allocation, dtype=float) + 100 / np.asarray(variant_allocations, dtype=float)
+    delta = 0.01 * np.asarray(baseline, dtype=float) * np.asarray(mde_percentage, dtype=float)
+    return 100 * norm.cdf(np.abs(delta) * np.sqrt(np.asarray(sample_size, dtype=float) / (c * sigma_2)) - z_alpha)
+
+
+def z_test_vectorized(control_mean, control_var, variant_mean, variant_var, two_sided=True) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Z-test of variant - control for arrays of comparisons. Variances are those of the means.
+    Returns the difference, its standard error, z and the p-value.
+    """
+    difference = np.asarray(variant_mean, dtype=float) - np.asarray(control_mean, dtype=float)
+    se = np.sqrt(np.asarray(control_var, dtype=float) + np.asarray(variant_var, dtype=float))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(se > 0, difference / se, 0.0)
+    p_value = 2 * norm.sf(np.abs(z)) if two_sided else norm.sf(z)
+    return difference, se, z, p_value
+
+
+def metric_variance(duration_parameter: DurationParameter) -> tuple[float, float]:
+    # Baseline in metric units and per-visitor variance of the metric, after CUPED adjustment
+    reduction = 1 - duration_parameter.variance_reduction_percentage / 100
     if duration_parameter.metric_type == "binomial":
-        duration_parameter.baseline_metric = duration_parameter.baseline_metric / 100
-        sigma_2 = duration_parameter.baseline_metric * (1 - duration_parameter.baseline_metric)
+        baseline = duration_parameter.baseline_metric / 100
+        return baseline, baseline * (1 - baseline) * reduction
+    if duration_parameter.metric_type == "ratio":
+        return duration_parameter.baseline_metric, ratio_variance(
+            duration_parameter.baseline_metric,
+            duration_parameter.numerator_std**2,
+            duration_parameter.denominator_mean,
+            duration_parameter.denominator_std**2,
+            duration_parameter.correlation * duration_parameter.numerator_std * duration_parameter.denominator_std,
+        ) * reduction
+    return duration_parameter.baseline_metric, duration_parameter.std**2 * reduction
 
-    else:
-        sigma_2 = duration_parameter.std**2
-    c = 100 / duration_parameter.control_allocation + 100 / duration_parameter.variant_allocations
-    if duration_parameter.hypothesis == "One-sided Test":
-        # fmt: off
-        m = (c* sigma_2* ((norm.ppf(1 - duration_parameter.significance_level*0.01/ duration_parameter.number_of_variants) + norm.ppf(1 - duration_parameter.beta*0.01)) ** 2) / (0.01*duration_parameter.baseline_metric * duration_parameter.min_detectable_effect_percentage) ** 2)
-    else:
-        m = (c * sigma_2 * (norm.ppf(1 - duration_parameter.significance_level / duration_parameter.number_of_variants) + norm.ppf(1 - duration_parameter.beta * 0.01)) ** 2) / (
-            duration_parameter.baseline_metric * duration_parameter.min_detectable_effect_percentage * 0.01
-        ) ** 2
+
+def ratio_variance(ratio, numerator_variance, denominator_mean, denominator_variance, covariance):
+    """Per-unit variance of a ratio of sums by the delta method."""
+    return (numerator_variance - 2 * ratio * covariance + ratio**2 * denominator_variance) / denominator_mean**2
+
+
+def parameter_arrays(parameters: list[DurationParameter]) -> tuple[dict, np.ndarray, np.ndarray]:
+    """
+    Column arrays for a batch of parameters: the keyword arguments shared by the vectorized
+    functions, plus the MDE (%) and daily visitors of each parameter.
+    """
+    baseline, sigma_2 = (np.array(column, dtype=float) for column in zip(*(metric_variance(p) for p in parameters)))
+    engine = {
+        "baseline": baseline,
+        "sigma_2": sigma_2,
+        "significance_level": np.array([p.significance_level for p in parameters], dtype=float),
+        "beta": np.array([p.beta for p in parameters], dtype=float),
+        "number_of_variants": np.array([p.number_of_variants for p in parameters]),
+        "control_allocation": np.array([p.control_allocation for p in parameters], dtype=float),
+        "variant_allocations": np.array([p.variant_allocations for p in parameters], dtype=float),
+        "two_sided": np.array([p.hypothesis == "Two-sided Test" for p in parameters]),
+        "correction": np.array([p.correction for p in parameters], dtype=object),
+    }
+    mde = np.array([p.min_detectable_effect_percentage for p in parameters], dtype=float)
+    daily_visitors = np.array([p.daily_visitors for p in parameters], dtype=float)
+    return engine, mde, daily_visitors
+
+
+@traced()
+def get_sz_duration(duration_parameter: DurationParameter) -> tuple[float, int]:
+    baseline, sigma_2 = metric_variance(duration_parameter)
+    # An MDE of 0 divides by zero; the result is checked below
+    with np.errstate(divide="ignore"):
+        m = float(
+            sample_size_vectorized(
+                baseline,
+                duration_parameter.min_detectable_effect_percentage,
+                sigma_2,
+                duration_parameter.significance_level,
+                duration_parameter.beta,
+                duration_parameter.number_of_variants,
+                duration_parameter.control_allocation,
+                duration_parameter.variant_allocations,
+                two_sided=duration_parameter.hypothesis == "Two-sided Test",
+                correction=duration_parameter.correction,
+            )
+        )
     if duration_parameter.daily_visitors == 0:
         # raise ValueError("Daily traffic should be greater than 0")
         return 0
+    if not np.isfinite(m):
+        raise ValueError("No finite sample size: the MDE must be > 0")
     duration = round(m / duration_parameter.daily_visitors) + 1
     return (round(m), duration)
-    # fmt: on
 
 
+def mde_vectorized(weekly_visitors, weekly_conversions, significance_level, beta, number_of_variants, correction="bonferroni") -> np.ndarray:
+    # Relative MDE (as a fraction) for arrays of traffic / conversions
+    z_alpha = critical_z(significance_level, number_of_variants, correction=correction)
+    z_beta = norm.ppf(np.asarray(beta, dtype=float) * 0.01)
+    visitors = np.asarray(weekly_visitors, dtype=float)
+    baseline = np.asarray(weekly_conversions, dtype=float) / visitors
+    return 2 * (z_alpha - z_beta) * np.sqrt(number_of_variants * baseline * (1 - baseline) / (visitors * baseline**2))
+
+
+def table_mde_columns(mde_parameter: Mde_Parameter) -> dict[str, np.ndarray]:
+    """
+    Week-by-week MDE table as columns: MDE (fraction) reachable with the traffic of 1..n weeks,
+    and the sample size that MDE requires.
+    """
+    week = np.arange(1, mde_parameter.number_weeks + 1)
+    baseline = mde_parameter.weekly_conversions / mde_parameter.weekly_visitors
+    settings = dict(
+        significance_level=mde_parameter.significance_level,
+        beta=mde_parameter.beta,
+        number_of_variants=mde_parameter.number_of_variants,
+        correction=mde_parameter.correction,
+    )
+    mde = mde_vectorized(mde_parameter.weekly_visitors * week, mde_parameter.weekly_conversions * week, **settings)
+    visitors = sample_size_vectorized(baseline, mde * 100, baseline * (1 - baseline), **settings)
+    return {"week": week, "mde": np.round(mde, 3), "visitors": np.round(visitors).astype(np.int64)}
+
+
+@traced()
 def calculate_mde(mde_parameter: Mde_Parameter) -> float:
-    z_alpha = norm.ppf(1 - mde_parameter.significance_level * 0.01 / mde_parameter.number_of_variants)
+    z_alpha = float(critical_z(mde_parameter.significance_level, mde_parameter.number_of_variants, correction=mde_parameter.correction))
     z_beta = norm.ppf(mde_parameter.beta * 0.01)
     baseline = mde_parameter.weekly_conversions / mde_parameter.weekly_visitors
     mde = 2 * (z_alpha - z_beta) * sqrt((mde_parameter.number_of_variants) * baseline * (1 - baseline) / (mde_parameter.weekly_visitors * baseline**2))
     return mde
 
 
+@traced()
 def generate_plot(obj: VisualParameter) -> plt:
     # Calculate standard deviation (sigma) based on baseline conversion rate
     sigma = 0.01 * np.sqrt(obj.baseline_conversion_rate_percentage * (100 - obj.baseline_conversion_rate_percentage))
@@ -64,8 +196,9 @@ def generate_plot(obj: VisualParameter) -> plt:
     H0_distribution = norm.pdf(x, mu_H0, sigma)
     MDE_distribution = norm.pdf(x, mu_MDE, sigma)
 
-    # Create a Matplotlib figure and axis
-    fig, ax = plt.subplots(figsize=(14, 7), dpi=120)
+    # Create a Matplotlib figure and axis (not registered with pyplot, so rendering is thread-safe)
+    fig = Figure(figsize=(14, 7), dpi=120)
+    ax = fig.subplots()
 
     # Plot the distributions
     ax.plot(
@@ -158,7 +291,16 @@ def generate_plot(obj: VisualParameter) -> plt:
     ax.grid(color="gray", linestyle="--", linewidth=0.5, alpha=0.7)
 
     # Add padding around the plot
-    plt.tight_layout(pad=3)
+    fig.tight_layout(pad=3)
 
     # Return the figure object
     return fig
+
+
+def plot_png(obj: VisualParameter) -> bytes:
+    # Render the power analysis plot and return the PNG bytes
+    fig = generate_plot(obj)
+    buf = io.BytesIO()
+    with span("savefig"):
+        fig.savefig(buf, format="png")
+    return buf.getvalue()
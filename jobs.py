@@ -0,0 +1,349 @@
+"""
+Background Job Queue
+
+Large grids, bootstrap runs and portfolio plans take longer than an HTTP request should. This
+module runs them as jobs: a client submits a job, gets an id back and polls its status,
+progress and result. It includes:
+1. `JobStore`, the job table in SQLite (WAL mode), shared by every process on the host, so
+   jobs survive restarts and no broker is needed.
+2. `JobManager`, a pool of worker threads that claim queued jobs, report progress, and stop
+   cooperatively when a job is cancelled.
+3. Per-client quotas: at most `max_pending` unfinished jobs per client (further submissions
+   are refused with `QuotaExceeded`) and at most `max_running` of them running at once.
+4. Leases: a running job's heartbeat is refreshed while it runs; a job whose heartbeat is older
+   than `lease` seconds (its process died) is put back in the queue.
+5. Results expire `ttl` seconds after the job finishes.
+
+Job kinds are registered in `JOB_KINDS` with their request model. Configuration comes from
+`ABTEST_JOBS_PATH`, `ABTEST_JOB_WORKERS`, `ABTEST_JOB_TTL`, `ABTEST_JOB_MAX_PENDING` and
+`ABTEST_JOB_MAX_RUNNING`.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Optional
+
+import numpy as np
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+
+from src.a_btest.API.APIModels import BatchRequest, BatchRow, BootstrapRequest, ForecastRequest, JobStatus, ScheduleRequest
+from src.a_btest.bootstrap import bootstrap_interval
+from src.a_btest.forecast import forecast_durations
+from src.a_btest.function_estimation import parameter_arrays, sample_size_vectorized
+from src.a_btest.scheduler import schedule_portfolio
+
+DEFAULT_JOBS_PATH = os.path.join(os.path.expanduser("~"), ".cache", "a_btest", "jobs.sqlite3")
+DEFAULT_JOB_TTL = 24 * 3600
+DEFAULT_LEASE = 60.0  # seconds without heartbeat before a running job is requeued
+POLL_INTERVAL = 1.0
+BATCH_CHUNK = 10_000
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once it has been cancelled."""
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, client: str, limit: int):
+        super().__init__(f"Client '{client}' already has {limit} unfinished jobs")
+        self.client = client
+        self.limit = limit
+
+
+# Job kinds: request model and function(request, progress) -> result
+def _batch_row(size: float, visitors: float) -> BatchRow:
+    # One degenerate experiment (e.g. an MDE of 0) must not fail the rest of the batch
+    if not np.isfinite(size):
+        return BatchRow(error="MDE must be > 0 / no finite sample size")
+    return BatchRow(sample_size=round(size), duration_days=round(size / visitors) + 1)
+
+
+def _sample_sizes(batch: BatchRequest, progress: Callable[[float], None]) -> list[BatchRow]:
+    results = []
+    experiments = batch.experiments
+    for start in range(0, len(experiments), BATCH_CHUNK):
+        engine, mde, daily_visitors = parameter_arrays(experiments[start : start + BATCH_CHUNK])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sizes = sample_size_vectorized(mde_percentage=mde, **engine)
+        results += [_batch_row(size, visitors) for size, visitors in zip(sizes, daily_visitors)]
+        progress(min(start + BATCH_CHUNK, len(experiments)) / len(experiments))
+    return results
+
+
+JOB_KINDS: dict[str, tuple[type[BaseModel], Callable[[Any, Callable[[float], None]], Any]]] = {
+    "sample_sizes": (BatchRequest, _sample_sizes),
+    "forecast": (ForecastRequest, lambda request, progress: forecast_durations(request.experiments, request.traffic, request.start_days)),
+    "schedule": (ScheduleRequest, lambda request, progress: schedule_portfolio(request)),
+    "bootstrap": (BootstrapRequest, lambda request, progress: bootstrap_interval(request)),
+}
+
+
+class JobStore:
+    """SQLite job table; one connection per thread, like `SQLiteCache`."""
+
+    def __init__(self, path: str = DEFAULT_JOBS_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, client TEXT NOT NULL, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, progress REAL NOT NULL DEFAULT 0, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, heartbeat_at REAL, expires_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_client ON jobs (client, status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_expiry ON jobs (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def insert(self, client: str, kind: str, payload: str, max_pending: int) -> str:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE client = ? AND status IN ('queued', 'running')", (client,)).fetchone()[0]
+            if pending >= max_pending:
+                raise QuotaExceeded(client, max_pending)
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, client, kind, payload, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, client, kind, payload, time.time()),
+            )
+            conn.execute("COMMIT")
+            return job_id
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, max_running: int) -> Optional[sqlite3.Row]:
+        """Mark the oldest runnable job as running and return it (None if there is none)."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND client NOT IN ("
+                "SELECT client FROM jobs WHERE status = 'running' GROUP BY client HAVING COUNT(*) >= ?) "
+                "ORDER BY created_at LIMIT 1",
+                (max_running,),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ? WHERE id = ?", (now, now, row["id"]))
+            conn.execute("COMMIT")
+            return row
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or (row["expires_at"] is not None and row["expires_at"] < time.time()):
+            return None
+        return row
+
+    def heartbeat(self, job_ids: list[str], progress: Optional[dict[str, float]] = None) -> None:
+        conn = self._connect()
+        now = time.time()
+        for job_id in job_ids:
+            if progress and job_id in progress:
+                conn.execute("UPDATE jobs SET heartbeat_at = ?, progress = ? WHERE id = ? AND status = 'running'", (now, progress[job_id], job_id))
+            else:
+                conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'", (now, job_id))
+
+    def finish(self, job_id: str, status: str, ttl: float, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        now = time.time()
+        # A job cancelled while running stays cancelled
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, progress = CASE WHEN ? = 'succeeded' THEN 1 ELSE progress END, result = ?, error = ?, "
+            "finished_at = ?, expires_at = ? WHERE id = ? AND status = 'running'",
+            (status, status, result, error, now, now + ttl, job_id),
+        )
+
+    def cancel(self, job_id: str, ttl: float) -> None:
+        now = time.time()
+        self._connect().execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ?, expires_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+            (now, now + ttl, job_id),
+        )
+
+    def status(self, job_id: str) -> Optional[str]:
+        row = self._connect().execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def maintain(self, lease: float) -> None:
+        """Requeue running jobs whose worker stopped sending heartbeats; purge expired jobs."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("UPDATE jobs SET status = 'queued', progress = 0, started_at = NULL WHERE status = 'running' AND heartbeat_at < ?", (now - lease,))
+        conn.execute("DELETE FROM jobs WHERE expires_at < ?", (now,))
+
+    def stats(self) -> dict:
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+def job_status(row: sqlite3.Row) -> JobStatus:
+    return JobStatus(
+        job_id=row["id"],
+        kind=row["kind"],
+        status=row["status"],
+        progress=row["progress"],
+        error=row["error"],
+        created_at=row["created_at"],
+        started_at=row["started_at"],
+        finished_at=row["finished_at"],
+        expires_at=row["expires_at"],
+    )
+
+
+class JobManager:
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = 2,
+        ttl: float = DEFAULT_JOB_TTL,
+        max_pending: int = 10,
+        max_running: int = 2,
+        lease: float = DEFAULT_LEASE,
+    ):
+        self.store = store
+        self.workers = workers
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self.max_running = max_running
+        self.lease = lease
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._running: dict[str, float] = {}  # job id -> last reported progress
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._threads = [threading.Thread(target=self._work, name=f"abtest-job-{i}", daemon=True) for i in range(self.workers)]
+        self._threads.append(threading.Thread(target=self._beat, name="abtest-job-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, client: str, kind: str, payload: dict) -> str:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        # Validate now so a bad payload fails the request instead of the job
+        model, _ = JOB_KINDS[kind]
+        request = model.model_validate(payload)
+        job_id = self.store.insert(client, kind, request.model_dump_json(), self.max_pending)
+        self.start()
+        self._wakeup.set()
+        return job_id
+
+    def cancel(self, job_id: str) -> None:
+        self.store.cancel(job_id, self.ttl)
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            row = self.store.claim(self.max_running)
+            if row is None:
+                self._wakeup.wait(POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self._run(row)
+            # A finished job may unblock a client held back by its running quota
+            self._wakeup.set()
+
+    def _run(self, row: sqlite3.Row) -> None:
+        job_id = row["id"]
+        model, fn = JOB_KINDS[row["kind"]]
+        with self._lock:
+            self._running[job_id] = 0.0
+
+        def progress(fraction: float) -> None:
+            with self._lock:
+                self._running[job_id] = float(fraction)
+            self.store.heartbeat([job_id], {job_id: float(fraction)})
+            if self.store.status(job_id) == "cancelled":
+                raise JobCancelled(job_id)
+
+        try:
+            result = fn(model.model_validate_json(row["payload"]), progress)
+            self.store.finish(job_id, "succeeded", self.ttl, result=json.dumps(to_jsonable_python(result, fallback=_jsonable), separators=(",", ":")))
+        except JobCancelled:
+            pass
+        except Exception as exc:
+            self.store.finish(job_id, "failed", self.ttl, error=f"{type(exc).__name__}: {exc}")
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+
+    def _beat(self) -> None:
+        # Heartbeats (and progress) for the jobs of this process, plus lease recovery
+        while not self._stop.wait(min(self.lease / 3, 5.0)):
+            with self._lock:
+                running = dict(self._running)
+            self.store.heartbeat(list(running), running)
+            self.store.maintain(self.lease)
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = len(self._running)
+        return {"workers": self.workers, "running_here": running, "jobs": self.store.stats()}
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager configured through the environment."""
+    global _manager
+    if _manager is None:
+        store = JobStore(os.environ.get("ABTEST_JOBS_PATH", DEFAULT_JOBS_PATH))
+        store.maintain(DEFAULT_LEASE)
+        _manager = JobManager(
+            store,
+            workers=int(os.environ.get("ABTEST_JOB_WORKERS", 2)),
+            ttl=float(os.environ.get("ABTEST_JOB_TTL", DEFAULT_JOB_TTL)),
+            max_pending=int(os.environ.get("ABTEST_JOB_MAX_PENDING", 10)),
+            max_running=int(os.environ.get("ABTEST_JOB_MAX_RUNNING", 2)),
+        )
+        _manager.start()
+    return _manager
+
+
+def stop_job_manager() -> None:
+    """Stop the workers of the process-wide manager at shutdown; unfinished jobs are requeued by their lease."""
+    global _manager
+    if _manager is not None:
+        _manager.stop()
+        _manager = None
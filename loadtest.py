@@ -0,0 +1,268 @@
+"""
+Local Load-Testing Harness
+
+Drives the FastAPI app (`APIconfig:app`) and the FastHTML dashboard running on a local
+server with an open-loop request mix and writes a JSON latency report per scenario.
+
+Arrivals follow a Poisson process at the requested rate and are issued on schedule whether or
+not earlier requests have completed. Latency is measured from the *intended* send time, so a
+stalled server is charged for the requests that queued up behind it (coordinated-omission
+correction); the plain service time (actual send to response) is reported alongside. When
+`max_in_flight` requests are already outstanding, the next one waits for a free slot and the
+wait is charged to its latency as well, so a saturated client cannot hide a slow server.
+Each scenario also gets a latency histogram with fixed millisecond buckets.
+
+Example:
+    python -m src.a_btest.loadtest --api-url http://localhost:8000 --html-url http://localhost:5001 \\
+        --rate 50 --duration 60 --mix api_sample_size=5,api_table=2,html_form=2,api_plot=1 \\
+        --output loadtest_report.json
+"""
+
+import argparse
+import bisect
+import json
+import math
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+BASELINES = [1, 2.5, 5, 10, 12.3, 20, 35]
+MDES = [2, 5, 10, 15, 20, 30]
+ALPHAS = [1, 5, 10]
+POWERS = [80, 90]
+HYPOTHESES = ["One-sided Test", "Two-sided Test"]
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+def _api_sample_size(rng: random.Random, api: str, html: str) -> tuple[str, str, Optional[dict]]:
+    params = {
+        "baseline_metric": rng.choice(BASELINES),
+        "min_detectable_effect_percentage": rng.choice(MDES),
+        "significance_level": rng.choice(ALPHAS),
+        "beta": 100 - rng.choice(POWERS),
+        "number_of_variants": rng.randint(2, 5),
+        "daily_visitors": rng.choice([500, 1000, 5000, 20000]),
+        "hypothesis": rng.choice(HYPOTHESES),
+    }
+    return "GET", f"{api}/calculate_sample_size?{urllib.parse.urlencode(params)}", None
+
+
+def _api_table(rng: random.Random, api: str, html: str) -> tuple[str, str, Optional[dict]]:
+    params = {
+        "weekly_visitors": rng.choice([1000, 5000, 20000]),
+        "weekly_conversions": rng.choice([50, 200, 800]),
+        "number_weeks": rng.choice([5, 10, 26]),
+        "number_of_variants": rng.randint(2, 4),
+    }
+    return "GET", f"{api}/get_table_mde?{urllib.parse.urlencode(params)}", None
+
+
+def _api_plot(rng: random.Random, api: str, html: str) -> tuple[str, str, Optional[dict]]:
+    params = {
+        "alpha": rng.choice(ALPHAS),
+        "power": rng.choice(POWERS),
+        "hypothesis": rng.choice(HYPOTHESES),
+        "min_detectable_effect_percentage": rng.choice(MDES),
+        "baseline_conversion_rate_percentage": rng.choice(BASELINES),
+    }
+    return "GET", f"{api}/vizualize?{urllib.parse.urlencode(params)}", None
+
+
+def _html_form(rng: random.Random, api: str, html: str) -> tuple[str, str, Optional[dict]]:
+    form = {
+        "baseline_metric_average": rng.choice(BASELINES),
+        "mde": rng.choice(MDES),
+        "daily_visitors": rng.choice([500, 1000, 5000]),
+        "metric_type": "binomial",
+        "control_allocation": 50,
+        "variant_1_allocation": 50,
+    }
+    return "POST", f"{html}/calculate_sample_size", form
+
+
+def _html_table(rng: random.Random, api: str, html: str) -> tuple[str, str, Optional[dict]]:
+    form = {
+        "weekly_traffic": rng.choice([1000, 5000, 20000]),
+        "weekly_conversions": rng.choice([50, 200, 800]),
+        "num_variants": rng.randint(2, 4),
+    }
+    return "POST", f"{html}/calculate_data_analysis", form
+
+
+def _html_plot(rng: random.Random, api: str, html: str) -> tuple[str, str, Optional[dict]]:
+    form = {
+        "baseline_metric_average": rng.choice(BASELINES),
+        "minimum_effect": rng.choice(MDES),
+        "test_type": rng.choice(HYPOTHESES),
+    }
+    return "POST", f"{html}/generate-plot", form
+
+
+SCENARIOS: dict[str, Callable[[random.Random, str, str], tuple[str, str, Optional[dict]]]] = {
+    "api_sample_size": _api_sample_size,
+    "api_table": _api_table,
+    "api_plot": _api_plot,
+    "html_form": _html_form,
+    "html_table": _html_table,
+    "html_plot": _html_plot,
+}
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}', expected one of {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(values: list[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def histogram(values_ms: list[float], bounds: list[float] = HISTOGRAM_BOUNDS_MS) -> dict[str, int]:
+    """Counts per bucket, keyed by the bucket's upper bound ("le_<ms>", "le_inf" for the rest)."""
+    counts = dict.fromkeys([f"le_{bound:g}" for bound in bounds] + ["le_inf"], 0)
+    for value in values_ms:
+        index = bisect.bisect_left(bounds, value)
+        counts[f"le_{bounds[index]:g}" if index < len(bounds) else "le_inf"] += 1
+    return counts
+
+
+def _send(method: str, url: str, form: Optional[dict], timeout: float) -> int:
+    data = None
+    headers = {"User-Agent": "a_btest-loadtest"}
+    if form is not None:
+        data = urllib.parse.urlencode(form).encode("utf-8")
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+        headers["HX-Request"] = "true"
+    request = urllib.request.Request(url, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+
+def run(
+    api_url: str,
+    html_url: str,
+    rate: float,
+    duration: float,
+    mix: dict[str, float],
+    max_in_flight: int = 256,
+    timeout: float = 30.0,
+    seed: int = 0,
+    send: Callable[[str, str, Optional[dict], float], int] = _send,
+) -> dict:
+    """Run one open-loop load test and return the report as a dict (`send` issues one request and returns its status)."""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples: dict[str, list[tuple[float, float, int]]] = defaultdict(list)
+    lock = threading.Lock()
+    saturated = 0
+
+    def issue(name: str, intended: float, request: tuple[str, str, Optional[dict]]) -> None:
+        sent = time.perf_counter()
+        try:
+            status = send(*request, timeout=timeout)
+        except Exception:
+            status = 0  # connection error / timeout
+        done = time.perf_counter()
+        with lock:
+            samples[name].append((done - intended, done - sent, status))
+
+    start = time.perf_counter()
+    intended = start
+    in_flight = threading.BoundedSemaphore(max_in_flight)
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        while True:
+            intended += rng.expovariate(rate)
+            if intended - start > duration:
+                break
+            name = rng.choices(names, weights)[0]
+            request = SCENARIOS[name](rng, api_url, html_url)
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if not in_flight.acquire(blocking=False):
+                # The client itself is saturated: wait for a slot; the wait counts towards the
+                # latency of this request (measured from `intended`) and of the ones behind it
+                saturated += 1
+                in_flight.acquire()
+
+            def task(name=name, intended=intended, request=request):
+                try:
+                    issue(name, intended, request)
+                finally:
+                    in_flight.release()
+
+            pool.submit(task)
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "config": {"api_url": api_url, "html_url": html_url, "rate": rate, "duration": duration, "mix": mix, "seed": seed},
+        "elapsed_s": elapsed,
+        "client_saturated": saturated,
+        "scenarios": {},
+    }
+    for name, rows in samples.items():
+        latency = [row[0] for row in rows]
+        service = [row[1] for row in rows]
+        statuses = defaultdict(int)
+        for row in rows:
+            statuses[str(row[2])] += 1
+        report["scenarios"][name] = {
+            "requests": len(rows),
+            "throughput_rps": len(rows) / elapsed,
+            "errors": sum(1 for row in rows if not 200 <= row[2] < 400),
+            "status_codes": dict(statuses),
+            "latency_ms": {f"p{q}": 1000 * percentile(latency, q) for q in (50, 95, 99)},
+            "service_time_ms": {f"p{q}": 1000 * percentile(service, q) for q in (50, 95, 99)},
+            "max_latency_ms": 1000 * max(latency),
+            "latency_histogram_ms": histogram([1000 * value for value in latency]),
+        }
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Open-loop load test for the A/B test API and dashboard.")
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument("--html-url", default="http://localhost:5001")
+    parser.add_argument("--rate", type=float, default=20, help="Mean arrival rate (requests per second)")
+    parser.add_argument("--duration", type=float, default=30, help="Test length in seconds")
+    parser.add_argument("--mix", default="api_sample_size=5,api_table=2,html_form=2,api_plot=1", help="Comma-separated scenario=weight list")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="loadtest_report.json")
+    args = parser.parse_args(argv)
+
+    report = run(args.api_url.rstrip("/"), args.html_url.rstrip("/"), args.rate, args.duration, parse_mix(args.mix), args.max_in_flight, args.timeout, args.seed)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    for name, result in report["scenarios"].items():
+        latency = result["latency_ms"]
+        print(f"{name:16s} n={result['requests']:6d} err={result['errors']:4d} p50={latency['p50']:8.1f}ms p95={latency['p95']:8.1f}ms p99={latency['p99']:8.1f}ms")
+    print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
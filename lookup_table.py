@@ -0,0 +1,175 @@
+"""
+Precomputed Sample-Size Lookup Table
+
+Most sample-size requests fall inside a small parameter range. This module builds a dense
+table of `get_sz_duration` results over that range and answers on-grid requests from a
+memory-mapped `.npy` file, so the operating system shares one copy of the table between
+all worker processes.
+
+Grid (binomial metrics, Bonferroni correction only):
+- baseline: 0.5% to 50% in steps of 0.5
+- MDE: 1% to 50% in steps of 1
+- significance level: 1, 5, 10 (%)
+- power: 80, 90 (%)
+- number of variants: 2 to 5
+- hypothesis: one-sided, two-sided
+
+The table stores the sample size for an allocation factor of 1 (`c = 100 / control +
+100 / variant` is linear in the result) so any allocation split can be answered by scaling.
+Duration is derived from `daily_visitors` at lookup time.
+
+Build the table with `python -m src.a_btest.lookup_table [path]`; its location is read
+from `ABTEST_SZ_TABLE_PATH`.
+"""
+
+import os
+import sys
+from typing import Any, Mapping, Optional
+
+import numpy as np
+
+from src.a_btest.function_estimation import sample_size_vectorized
+
+HYPOTHESES = ("One-sided Test", "Two-sided Test")
+VARIANTS = np.arange(2, 6)
+ALPHAS = np.array([1.0, 5.0, 10.0])
+POWERS = np.array([80.0, 90.0])
+BASELINE_STEP = 0.5
+BASELINES = np.arange(1, 101) * BASELINE_STEP  # 0.5 .. 50 (%)
+MDES = np.arange(1, 51, dtype=float)  # 1 .. 50 (%)
+TABLE_SHAPE = (len(HYPOTHESES), len(VARIANTS), len(ALPHAS), len(POWERS), len(BASELINES), len(MDES))
+
+# Request fields the grid is indexed or scaled by, and fields it only covers at their default
+GRID_FIELDS = frozenset({
+    "baseline_metric",
+    "min_detectable_effect_percentage",
+    "significance_level",
+    "beta",
+    "number_of_variants",
+    "control_allocation",
+    "variant_allocations",
+    "daily_visitors",
+    "hypothesis",
+})
+FIXED_FIELDS = {"metric_type": "binomial", "correction": "bonferroni", "variance_reduction_percentage": 0.0}
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "a_btest", "sample_size_table.npy")
+
+
+def build_table(path: str = DEFAULT_TABLE_PATH) -> np.ndarray:
+    """Compute the whole grid in one vectorized pass and write it to `path`."""
+    two_sided = np.array([h == "Two-sided Test" for h in HYPOTHESES])
+    # Broadcast every axis against the others: (hyp, variants, alpha, power, baseline, mde)
+    hyp = two_sided.reshape(-1, 1, 1, 1, 1, 1)
+    variants = VARIANTS.reshape(1, -1, 1, 1, 1, 1)
+    alpha = ALPHAS.reshape(1, 1, -1, 1, 1, 1)
+    beta = (100 - POWERS).reshape(1, 1, 1, -1, 1, 1)
+    baseline = (BASELINES / 100).reshape(1, 1, 1, 1, -1, 1)
+    mde = MDES.reshape(1, 1, 1, 1, 1, -1)
+
+    # control_allocation = variant_allocations = 200 gives c = 1
+    table = sample_size_vectorized(baseline, mde, baseline * (1 - baseline), alpha, beta, variants, 200, 200, two_sided=hyp)
+    table = np.ascontiguousarray(np.broadcast_to(table, TABLE_SHAPE), dtype=np.float64)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file first so running workers never map a half-written table
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        np.save(file, table)
+    os.replace(tmp_path, path)
+    return table
+
+
+_table: Optional[np.ndarray] = None
+
+
+def load_table(path: Optional[str] = None) -> Optional[np.ndarray]:
+    """Memory-map the table once per process; returns None when it has not been built."""
+    global _table
+    if _table is None:
+        path = path or os.environ.get("ABTEST_SZ_TABLE_PATH", DEFAULT_TABLE_PATH)
+        if not os.path.exists(path):
+            return None
+        table = np.load(path, mmap_mode="r")
+        if table.shape != TABLE_SHAPE:
+            return None
+        _table = table
+    return _table
+
+
+def _grid_index(value: float, axis: np.ndarray) -> Optional[int]:
+    index = int(np.searchsorted(axis, value))
+    if index < len(axis) and abs(axis[index] - value) < 1e-9:
+        return index
+    return None
+
+
+def _is_default(value: Any, default: Any) -> bool:
+    if value is None or value == default:
+        return True
+    if isinstance(default, float):
+        try:
+            return float(value) == default
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _on_grid_fields(values: Mapping[str, Any]) -> bool:
+    """Whether every field the grid does not cover is absent or at its default."""
+    for name in values.keys():
+        if name in GRID_FIELDS:
+            continue
+        if name not in FIXED_FIELDS or not _is_default(values.get(name), FIXED_FIELDS[name]):
+            return False
+    return True
+
+
+def lookup_sz_duration(values: Mapping[str, Any]) -> Optional[tuple[int, int]]:
+    """
+    Answer a sample-size request from the table.
+
+    `values` holds raw (unvalidated) request fields with the names used by
+    `DurationParameter`. Returns None whenever the request is off the grid, the inputs are
+    not valid, or the table is not available, in which case callers compute normally. Any
+    field outside `GRID_FIELDS` must be absent or at its `FIXED_FIELDS` default, so a field
+    added to the model later is never answered from a grid that ignores it.
+    """
+    table = load_table()
+    if table is None or not _on_grid_fields(values):
+        return None
+    try:
+        baseline = float(values.get("baseline_metric", 0))
+        mde = float(values.get("min_detectable_effect_percentage", 20))
+        alpha = float(values.get("significance_level", 5))
+        power = 100 - float(values.get("beta", 20))
+        variants = int(values.get("number_of_variants", 2))
+        control = float(values.get("control_allocation", 50))
+        variant = float(values.get("variant_allocations", 50))
+        daily_visitors = int(values.get("daily_visitors", 1000))
+        hypothesis = values.get("hypothesis", "One-sided Test")
+    except (TypeError, ValueError):
+        return None
+    if not (0 < control <= 100 and 0 < variant <= 100 and daily_visitors > 0) or hypothesis not in HYPOTHESES:
+        return None
+
+    index = (
+        HYPOTHESES.index(hypothesis),
+        _grid_index(variants, VARIANTS),
+        _grid_index(alpha, ALPHAS),
+        _grid_index(power, POWERS),
+        _grid_index(baseline, BASELINES),
+        _grid_index(mde, MDES),
+    )
+    if None in index:
+        return None
+    m = float(table[index]) * (100 / control + 100 / variant)
+    return (round(m), round(m / daily_visitors) + 1)
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("ABTEST_SZ_TABLE_PATH", DEFAULT_TABLE_PATH)
+    build_table(target)
+    print(f"Wrote {np.prod(TABLE_SHAPE):,} sample sizes to {target}")
@@ -0,0 +1,167 @@
+"""
+Scenario Planner
+
+Offline sizing of many experiments at once (`python -m a_btest plan`). The planner:
+1. Streams a CSV or Parquet scenario file in fixed-size chunks.
+2. Validates each chunk in bulk against the `DurationParameter` schemas.
+3. Computes sample size, duration and a week-by-week MDE table with the vectorized engine,
+   spreading chunks over a process pool.
+4. Writes results incrementally (CSV or Parquet), keeping only a bounded number of chunks
+   in memory, and reports progress and throughput on stderr.
+
+Each scenario row uses the `DurationParameter` field names as columns; rows that fail
+validation, or have no finite sample size (an MDE of 0), are written out with an `error`
+column instead of results.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
+
+from src.a_btest.API.APIModels import DurationParameter
+from src.a_btest.datasource import is_parquet
+from src.a_btest.function_estimation import detectable_effect_vectorized, parameter_arrays, sample_size_vectorized
+
+DEFAULT_CHUNK_SIZE = 10_000
+scenarios_adapter = TypeAdapter(list[DurationParameter])
+
+
+def read_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[list[dict]]:
+    """Yield lists of raw row dicts without loading the whole file."""
+    if is_parquet(path):
+        import pyarrow.parquet as pq  # optional dependency, only needed for Parquet
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+        return
+    with open(path, newline="") as file:
+        chunk = []
+        for row in csv.DictReader(file):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def plan_chunk(rows: list[dict], weeks: int = 0) -> list[dict]:
+    """Validate and size one chunk of scenarios; runs inside the worker processes."""
+    # Empty cells (e.g. `std` on binomial rows) mean "use the default"
+    cleaned = [{key: value for key, value in row.items() if value not in ("", None)} for row in rows]
+    errors: dict[int, str] = {}
+    try:
+        parameters = scenarios_adapter.validate_python(cleaned)
+        valid = list(range(len(rows)))
+    except ValidationError as exc:
+        for error in exc.errors():
+            index = error["loc"][0]
+            errors.setdefault(index, f"{'.'.join(str(part) for part in error['loc'][1:])}: {error['msg']}")
+        valid = [index for index in range(len(rows)) if index not in errors]
+        parameters = scenarios_adapter.validate_python([cleaned[index] for index in valid])
+
+    empty = {"sample_size": None, "duration_days": None, **{f"mde_week_{week}": None for week in range(1, weeks + 1)}}
+    results = [dict(row, **empty, error=errors.get(index, "")) for index, row in enumerate(rows)]
+    if not parameters:
+        return results
+
+    engine, mde, daily_visitors = parameter_arrays(parameters)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sample_size = sample_size_vectorized(mde_percentage=mde, **engine)
+        duration = np.round(sample_size / daily_visitors) + 1
+        mde_by_week = [detectable_effect_vectorized(daily_visitors * 7 * week, **engine) for week in range(1, weeks + 1)]
+
+    for position, index in enumerate(valid):
+        result = results[index]
+        if not np.isfinite(sample_size[position]):
+            # Recorded like a validation error so one degenerate row does not abort the run
+            result["error"] = "MDE must be > 0 / no finite sample size"
+            continue
+        result["sample_size"] = round(float(sample_size[position]))
+        result["duration_days"] = int(duration[position])
+        for week, values in enumerate(mde_by_week, start=1):
+            result[f"mde_week_{week}"] = round(float(values[position]), 4)
+    return results
+
+
+class ResultWriter:
+    """Incremental CSV / Parquet writer; the schema is fixed by the first chunk."""
+
+    def __init__(self, path: str, columns: list[str]):
+        self.path = path
+        self.columns = columns
+        self._file = None
+        self._parquet = None
+        if is_parquet(path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self._pa = pa
+            self._parquet = pq.ParquetWriter(path, pa.schema([(column, pa.string()) for column in columns]))
+        else:
+            self._file = open(path, "w", newline="")
+            self._csv = csv.DictWriter(self._file, fieldnames=columns, extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, rows: list[dict]) -> None:
+        if self._parquet is not None:
+            # Values are written as strings so mixed-type scenario columns keep one schema
+            table = {column: [None if row.get(column) is None else str(row.get(column)) for row in rows] for column in self.columns}
+            self._parquet.write_table(self._pa.table(table))
+        else:
+            self._csv.writerows(rows)
+
+    def close(self) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def plan(input_path: str, output_path: str, weeks: int = 4, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: Optional[int] = None, progress=sys.stderr) -> int:
+    """Plan every scenario of `input_path` into `output_path`; returns the number of rows."""
+    workers = workers or os.cpu_count() or 1
+    writer = None
+    total = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        chunks = read_chunks(input_path, chunk_size)
+
+        def drain(limit: int) -> None:
+            nonlocal writer, total
+            while len(pending) > limit:
+                rows = pending.popleft().result()
+                if writer is None:
+                    writer = ResultWriter(output_path, list(rows[0]))
+                writer.write(rows)
+                total += len(rows)
+                if progress is not None:
+                    elapsed = time.perf_counter() - started
+                    print(f"planned {total:,} scenarios ({total / elapsed:,.0f} rows/s)", file=progress, flush=True)
+
+        # Keep at most two chunks per worker in flight so memory stays bounded
+        for chunk in chunks:
+            pending.append(pool.submit(plan_chunk, chunk, weeks))
+            drain(2 * workers)
+        drain(0)
+    if writer is not None:
+        writer.close()
+    return total
+
+
+def configure_parser(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("input", help="Scenario file (.csv or .parquet)")
+    parser.add_argument("output", help="Result file (.csv or .parquet)")
+    parser.add_argument("--weeks", type=int, default=4, help="Number of weeks in the MDE table")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.set_defaults(func=lambda args: plan(args.input, args.output, args.weeks, args.chunk_size, args.workers))
@@ -0,0 +1,54 @@
+"""
+Power Curves
+
+Achieved power (at the planned MDE) and detectable effect (at the planned power) for every day
+of a test, i.e. as functions of both the duration and the sample size collected so far. All days
+come from one call to the vectorized functions of `function_estimation`.
+
+The curves are returned as float32 columns, base64-encoded, for the browser to plot itself: a
+year of daily points is about 6 KB of payload and no image is rendered on the server.
+"""
+
+import base64
+from typing import Optional
+
+import numpy as np
+
+from src.a_btest.API.APIModels import DurationParameter, PowerCurveResponse
+from src.a_btest.function_estimation import detectable_effect_vectorized, get_sz_duration, metric_variance, power_vectorized
+
+MAX_CURVE_DAYS = 3650
+
+
+def encode_columns(columns: dict[str, np.ndarray]) -> dict[str, str]:
+    return {name: base64.b64encode(np.asarray(values, dtype="<f4").tobytes()).decode("ascii") for name, values in columns.items()}
+
+
+def decode_column(payload: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(payload), dtype="<f4")
+
+
+def power_curve(duration_parameter: DurationParameter, days: Optional[int] = None) -> PowerCurveResponse:
+    # Raises ValueError when the planned test has no finite sample size (an MDE of 0)
+    sample_size, duration = get_sz_duration(duration_parameter)
+    # Default horizon: twice the planned duration, at least four weeks
+    days = min(days or max(2 * duration, 28), MAX_CURVE_DAYS)
+    day = np.arange(1, days + 1, dtype=float)
+    visitors = day * duration_parameter.daily_visitors
+    baseline, sigma_2 = metric_variance(duration_parameter)
+    settings = dict(
+        significance_level=duration_parameter.significance_level,
+        number_of_variants=duration_parameter.number_of_variants,
+        control_allocation=duration_parameter.control_allocation,
+        variant_allocations=duration_parameter.variant_allocations,
+        two_sided=duration_parameter.hypothesis == "Two-sided Test",
+        correction=duration_parameter.correction,
+    )
+    power = power_vectorized(visitors, baseline, duration_parameter.min_detectable_effect_percentage, sigma_2, **settings)
+    mde = detectable_effect_vectorized(visitors, baseline, sigma_2, beta=duration_parameter.beta, **settings)
+    return PowerCurveResponse(
+        length=days,
+        columns=encode_columns({"day": day, "sample_size": visitors, "power": power, "mde": mde}),
+        sample_size=sample_size,
+        duration_days=duration,
+    )
@@ -0,0 +1,267 @@
+"""
+Rate Limiting
+
+Load shedding in the compute executor protects a worker once it is saturated, but a single
+client can still take every slot of a route group. This module limits each client before its
+requests reach the handlers. It includes:
+1. Token buckets per client and per budget. A client is identified by its API key
+   (`X-API-Key`, stored hashed) when the key is one of `ABTEST_API_KEYS` (comma-separated), or
+   else by its IP address, so sending made-up keys does not buy fresh buckets.
+2. Cost-weighted budgets: cheap routes (sample size, registry, forms) draw one token from the
+   `default` budget, while plot rendering, simulations and grids draw several tokens from a
+   separate `expensive` budget. Heavy use of the plots therefore never blocks the sample size
+   calculator.
+3. `RateLimitMiddleware` (both apps): a request without enough tokens gets a 429 response with a
+   `Retry-After` header saying when the bucket will hold enough tokens again.
+4. Optional shared state: with `ABTEST_RATE_LIMIT_SHARED=1` the buckets live in a table of the
+   on-disk result cache (`ABTEST_CACHE_PATH`), so every worker process on the host applies the
+   same limits. Otherwise they are kept in memory per process. Shared buckets are updated off
+   the event loop, and a request whose bucket stays locked for longer than `BUSY_TIMEOUT` is let
+   through rather than stalling the worker.
+
+Budgets are configured with `ABTEST_RATE_LIMITS`, a JSON object such as
+`{"expensive": {"capacity": 40, "refill_rate": 1.0}}` (tokens, tokens per second), or `off`.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from starlette.responses import JSONResponse
+
+from src.a_btest.cache import DEFAULT_CACHE_PATH
+
+
+@dataclass
+class Budget:
+    capacity: float = 60.0  # burst size, in tokens
+    refill_rate: float = 5.0  # tokens added per second
+
+
+DEFAULT_BUDGETS = {
+    "default": Budget(capacity=60, refill_rate=5.0),
+    "expensive": Budget(capacity=40, refill_rate=1.0),
+}
+
+# Paths of both apps drawing from the expensive budget, with their cost in tokens
+EXPENSIVE_ROUTES = {
+    # plot rendering
+    "/vizualize": 4,
+    "/generate-plot": 4,
+    # /live/plot is left at the default cost: it fires on every keystroke and most of those
+    # requests are superseded (204) or served from the cache without rendering
+    # simulations
+    "/bootstrap_interval": 8,
+    "/forecast_duration": 8,
+    "/jobs": 8,
+    # grids
+    "/get_table_mde": 2,
+    "/power_curve": 2,
+    "/power-curve": 2,
+    "/calculate_data_analysis": 2,
+    "/schedule": 2,
+}
+EXEMPT_ROUTES = {"/health", "/ready", "/metrics"}
+MAX_CLIENTS = 10_000  # buckets kept in memory; the least recently seen are dropped first
+
+
+def route_cost(method: str, path: str) -> Optional[tuple[str, float]]:
+    """(budget, cost) of a request, or None for requests that are never limited."""
+    if path in EXEMPT_ROUTES:
+        return None
+    cost = EXPENSIVE_ROUTES.get(path)
+    if cost is None or (path == "/jobs" and method != "POST"):
+        return "default", 1.0
+    return "expensive", cost
+
+
+def _hash_key(api_key: bytes) -> str:
+    return hashlib.blake2b(api_key, digest_size=16).hexdigest()
+
+
+def client_id(scope, api_keys: frozenset = frozenset()) -> str:
+    """Bucket name of a request: its API key if it is a configured one (`api_keys` holds the
+    hashed keys), else its IP address."""
+    headers = dict(scope.get("headers") or [])
+    api_key = headers.get(b"x-api-key")
+    if api_key:
+        digest = _hash_key(api_key)
+        if digest in api_keys:
+            return "key:" + digest
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+def _refill(tokens: float, updated: float, budget: Budget, now: float) -> float:
+    return min(budget.capacity, tokens + (now - updated) * budget.refill_rate)
+
+
+def _take(tokens: float, budget: Budget, cost: float) -> tuple[float, float]:
+    """Tokens left and seconds to wait (0 when the request is allowed)."""
+    # A cost above the capacity could never be paid, so it takes the whole bucket instead
+    cost = min(cost, budget.capacity)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / budget.refill_rate
+
+
+class MemoryBuckets:
+    blocking = False  # cheap enough to update on the event loop
+    failed_open = 0
+
+    def __init__(self, max_clients: int = MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, budget: Budget, cost: float, now: float) -> float:
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (budget.capacity, now))
+            tokens, wait = _take(_refill(tokens, updated, budget, now), budget, cost)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBuckets:
+    """Buckets in a table of the result cache database, shared by the worker processes."""
+
+    PURGE_EVERY = 1024
+    BUSY_TIMEOUT = 0.5  # seconds to wait for the write lock before letting the request through
+    blocking = True
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self.failed_open = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().execute("CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, budget: Budget, cost: float, now: float) -> float:
+        conn = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            # Another process holds the lock past the busy timeout; fail open rather than queue up
+            self.failed_open += 1
+            return 0.0
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row is not None else (budget.capacity, now)
+            tokens, wait = _take(_refill(tokens, updated, budget, now), budget, cost)
+            conn.execute("INSERT OR REPLACE INTO rate_limits (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now))
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                # A bucket idle for an hour is full again, so its row carries no information
+                conn.execute("DELETE FROM rate_limits WHERE updated < ?", (now - 3600,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+class RateLimiter:
+    def __init__(self, budgets: Optional[dict[str, Budget]] = None, buckets=None, enabled: bool = True, api_keys: Iterable[str] = ()):
+        self.enabled = enabled
+        self.api_keys = frozenset(_hash_key(key.encode("utf-8")) for key in api_keys)
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.buckets = buckets if buckets is not None else MemoryBuckets()
+        self.allowed = {name: 0 for name in self.budgets}
+        self.limited = {name: 0 for name in self.budgets}
+
+    def check(self, client: str, budget_name: str, cost: float, now: Optional[float] = None) -> float:
+        """Draw `cost` tokens from the client's bucket; returns 0, or the seconds to wait."""
+        budget = self.budgets[budget_name]
+        wait = self.buckets.take(f"{budget_name}:{client}", budget, cost, time.time() if now is None else now)
+        if wait:
+            self.limited[budget_name] += 1
+        else:
+            self.allowed[budget_name] += 1
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "clients": len(self.buckets),
+            "failed_open": self.buckets.failed_open,
+            **{name: {"allowed": self.allowed[name], "limited": self.limited[name]} for name in self.budgets},
+        }
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 once a client has used up the budget of a route."""
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limiter = self.limiter or get_rate_limiter()
+        cost = route_cost(scope["method"], scope["path"]) if limiter.enabled else None
+        if cost is None:
+            return await self.app(scope, receive, send)
+        budget, tokens = cost
+        client = client_id(scope, limiter.api_keys)
+        if limiter.buckets.blocking:
+            wait = await asyncio.to_thread(limiter.check, client, budget, tokens)
+        else:
+            wait = limiter.check(client, budget, tokens)
+        if not wait:
+            return await self.app(scope, receive, send)
+        response = JSONResponse(
+            {"detail": f"Rate limit exceeded for {budget} routes"},
+            status_code=429,
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+        await response(scope, receive, send)
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter configured through the environment."""
+    global _limiter
+    if _limiter is None:
+        raw = os.environ.get("ABTEST_RATE_LIMITS", "").strip()
+        if raw.lower() == "off":
+            _limiter = RateLimiter(enabled=False)
+        else:
+            budgets = {name: Budget(**values) for name, values in json.loads(raw).items()} if raw else {}
+            shared = os.environ.get("ABTEST_RATE_LIMIT_SHARED", "").lower() in ("1", "true", "yes")
+            path = os.environ.get("ABTEST_CACHE_PATH", DEFAULT_CACHE_PATH)
+            buckets = SQLiteBuckets(path) if shared and path.strip().lower() not in ("", "off", "none") else MemoryBuckets()
+            api_keys = [key.strip() for key in os.environ.get("ABTEST_API_KEYS", "").split(",") if key.strip()]
+            _limiter = RateLimiter(budgets, buckets, api_keys=api_keys)
+    return _limiter
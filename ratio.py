@@ -0,0 +1,97 @@
+"""
+Ratio Metrics (Delta Method)
+
+Ratio metrics such as revenue per visit or clicks per session divide two per-unit sums:
+R = sum(numerator) / sum(denominator), with the user (the randomization unit) as the unit.
+Units are not independent visits, so the variance comes from the delta method on the per-unit
+moments: var(R) ~ (var(N) - 2 R cov(N, D) + R^2 var(D)) / (n mean(D)^2).
+
+1. `accumulate_file` reads unit-level data once, chunk by chunk, and reduces each chunk to
+   per-variant means, sums of squares and cross-products with `np.bincount` (see
+   `cuped.grouped_moments`). Units with a missing numerator, denominator or variant are
+   ignored (`cuped.accumulate_grouped` drops them from each chunk).
+2. `planning_parameters` turns the moments into the fields of `RatioParameters`.
+3. `analyze` compares every variant with the control on the ratio.
+
+From the command line:
+    python -m a_btest ratio sessions.csv --numerator revenue --denominator visits --variant variant
+"""
+
+import argparse
+import json
+import sys
+from typing import Optional
+
+import numpy as np
+
+from src.a_btest.cuped import MomentAccumulator, accumulate_grouped
+from src.a_btest.datasource import DEFAULT_CHUNK_ROWS
+from src.a_btest.function_estimation import ratio_variance, z_test_vectorized
+
+
+def accumulate_file(path: str, numerator_column: str, denominator_column: str, variant_column: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict[str, MomentAccumulator]:
+    """Moments (x = denominator, y = numerator) per variant plus the pooled ones under "all"."""
+    return accumulate_grouped(path, denominator_column, numerator_column, variant_column, chunk_rows)
+
+
+def ratio_estimate(moments: MomentAccumulator) -> tuple[float, float]:
+    """Ratio and the variance of its estimate."""
+    ratio = moments.mean_y / moments.mean_x
+    return ratio, ratio_variance(ratio, moments.var_y, moments.mean_x, moments.var_x, moments.cov) / moments.n
+
+
+def planning_parameters(moments: MomentAccumulator) -> dict:
+    """`RatioParameters` fields (besides traffic and test settings) estimated from historical data."""
+    numerator_std, denominator_std = np.sqrt(moments.var_y), np.sqrt(moments.var_x)
+    return {
+        "metric_type": "ratio",
+        "baseline_metric": moments.mean_y / moments.mean_x,
+        "numerator_std": float(numerator_std),
+        "denominator_mean": moments.mean_x,
+        "denominator_std": float(denominator_std),
+        "correlation": float(moments.cov / (numerator_std * denominator_std)) if numerator_std * denominator_std > 0 else 0.0,
+    }
+
+
+def analyze(accumulators: dict[str, MomentAccumulator], control: str) -> list[dict]:
+    """Comparison of every variant's ratio against `control` (two-sided z-test)."""
+    control_ratio, control_var = ratio_estimate(accumulators[control])
+    results = []
+    for name, moments in accumulators.items():
+        if name in ("all", control):
+            continue
+        ratio, var = ratio_estimate(moments)
+        diff, se, z, p_value = (float(v) for v in z_test_vectorized(control_ratio, control_var, ratio, var))
+        results.append(
+            {
+                "variant": name,
+                "n": moments.n,
+                "ratio": ratio,
+                "difference": diff,
+                "relative_difference_percentage": 100 * diff / control_ratio if control_ratio else None,
+                "standard_error": se,
+                "z": z,
+                "p_value": p_value,
+            }
+        )
+    return results
+
+
+def configure_parser(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("input", help="Unit-level data (.csv or .parquet), one row per unit")
+    parser.add_argument("--numerator", required=True, help="Numerator column (e.g. revenue)")
+    parser.add_argument("--denominator", required=True, help="Denominator column (e.g. visits)")
+    parser.add_argument("--variant", default=None, help="Variant column, to analyze the results")
+    parser.add_argument("--control", default=None, help="Control variant name (default: first in sort order)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.set_defaults(func=_run)
+
+
+def _run(args: argparse.Namespace) -> None:
+    accumulators = accumulate_file(args.input, args.numerator, args.denominator, args.variant, args.chunk_rows)
+    report = {"n": accumulators["all"].n, "parameters": planning_parameters(accumulators["all"])}
+    variants = sorted(name for name in accumulators if name != "all")
+    if len(variants) > 1:
+        report["results"] = analyze(accumulators, args.control or variants[0])
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
@@ -0,0 +1,161 @@
+"""
+Experiment Registry
+
+Keeps the experiments users plan, with their parameters and computed sample size, so they can
+be listed and compared later. It includes:
+1. `ExperimentRegistry`, an `experiments` table in SQLite (WAL mode) shared by every process on
+   the host. Every experiment belongs to a tenant (the `X-Tenant-Id` header of the request).
+2. Composite indexes on (tenant, created_at, id) and (tenant, status, created_at, id), so the
+   listing of any tenant, filtered by status and date range or not, reads only the rows it
+   returns.
+3. Keyset pagination: a page ends with an opaque cursor holding the (created_at, id) of its last
+   row, and the next page starts strictly after it. Unlike OFFSET, the cost of a page does not grow
+   with its depth, and rows inserted meanwhile do not shift the pages.
+
+The database path comes from `ABTEST_REGISTRY_PATH`.
+"""
+
+import base64
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from pydantic import TypeAdapter
+
+from src.a_btest.API.APIModels import DurationParameter, Experiment
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.expanduser("~"), ".cache", "a_btest", "registry.sqlite3")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+DEFAULT_TENANT = "default"
+
+parameter_adapter = TypeAdapter(DurationParameter)
+
+
+def tenant_id(headers) -> str:
+    return headers.get("X-Tenant-Id") or DEFAULT_TENANT
+
+
+def encode_cursor(created_at: float, experiment_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at!r}:{experiment_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        created_at, experiment_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split(":")
+        return float(created_at), int(experiment_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+class ExperimentRegistry:
+    """SQLite experiment table; one connection per thread, like `SQLiteCache`."""
+
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS experiments ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, tenant TEXT NOT NULL, name TEXT NOT NULL, status TEXT NOT NULL, "
+            "metric_type TEXT NOT NULL, parameters TEXT NOT NULL, sample_size INTEGER NOT NULL, duration_days INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS experiments_tenant_date ON experiments (tenant, created_at, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS experiments_tenant_status_date ON experiments (tenant, status, created_at, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def create(self, tenant: str, name: str, parameters: DurationParameter, sample_size: float, duration_days: int, status: str = "planned") -> int:
+        if not math.isfinite(sample_size):
+            raise ValueError("No finite sample size: the MDE must be > 0")
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO experiments (tenant, name, status, metric_type, parameters, sample_size, duration_days, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (tenant, name, status, parameters.metric_type, parameters.model_dump_json(), round(sample_size), int(duration_days), now, now),
+        )
+        return cursor.lastrowid
+
+    def get(self, tenant: str, experiment_id: int) -> Optional[sqlite3.Row]:
+        return self._connect().execute("SELECT * FROM experiments WHERE tenant = ? AND id = ?", (tenant, experiment_id)).fetchone()
+
+    def set_status(self, tenant: str, experiment_id: int, status: str) -> bool:
+        cursor = self._connect().execute(
+            "UPDATE experiments SET status = ?, updated_at = ? WHERE tenant = ? AND id = ?",
+            (status, time.time(), tenant, experiment_id),
+        )
+        return cursor.rowcount > 0
+
+    def page(
+        self,
+        tenant: str,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> tuple[list[sqlite3.Row], Optional[str]]:
+        """Newest experiments first; returns the rows and the cursor of the next page (None at the end)."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        clauses, values = ["tenant = ?"], [tenant]
+        if status is not None:
+            clauses.append("status = ?")
+            values.append(status)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            values.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            values.append(until)
+        if cursor is not None:
+            clauses.append("(created_at, id) < (?, ?)")
+            values.extend(decode_cursor(cursor))
+        # One extra row tells whether there is a next page
+        rows = self._connect().execute(
+            f"SELECT * FROM experiments WHERE {' AND '.join(clauses)} ORDER BY created_at DESC, id DESC LIMIT ?",
+            (*values, limit + 1),
+        ).fetchall()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+
+def experiment(row: sqlite3.Row) -> Experiment:
+    return Experiment(
+        id=row["id"],
+        tenant=row["tenant"],
+        name=row["name"],
+        status=row["status"],
+        parameters=parameter_adapter.validate_json(row["parameters"]),
+        sample_size=row["sample_size"],
+        duration_days=row["duration_days"],
+        created_at=row["created_at"],
+        updated_at=row["updated_at"],
+    )
+
+
+_registry: Optional[ExperimentRegistry] = None
+
+
+def get_registry() -> ExperimentRegistry:
+    """Return the process-wide registry configured through the environment."""
+    global _registry
+    if _registry is None:
+        _registry = ExperimentRegistry(os.environ.get("ABTEST_REGISTRY_PATH", DEFAULT_REGISTRY_PATH))
+    return _registry
@@ -0,0 +1,205 @@
+"""
+Scenario Reports
+
+Renders a client-ready report for a list of experiment scenarios (`python -m a_btest report`),
+instead of copying results out of the sample size, MDE table and power analysis tabs by hand.
+The report generator:
+1. Reads the same scenario files as the planner (`DurationParameter` columns, plus an optional
+   `name` column) in small chunks.
+2. Sizes each chunk and renders its power plots in a process pool; plots go through the shared
+   result cache, so any plot already rendered by the dashboard, the API or a previous report is
+   reused rather than drawn again.
+3. Assembles one HTML file (plots embedded) or one PDF (one page per scenario, via `PdfPages`)
+   as the chunks complete, in scenario order. Only the chunks in flight are held in memory.
+
+Plots are drawn for binomial scenarios only, like the power analysis tab.
+"""
+
+import argparse
+import base64
+import html
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union
+
+import numpy as np
+from pydantic import ValidationError
+
+from src.a_btest.API.APIModels import DurationParameter, VisualParameter
+from src.a_btest.cache import cached, get_cache, make_key
+from src.a_btest.function_estimation import plot_png
+from src.a_btest.planner import plan_chunk, read_chunks, scenarios_adapter
+
+DEFAULT_CHUNK_SIZE = 4
+PDF_IMAGE_SIZE = (1140, 570)  # plot size on the PDF page at 150 dpi
+SUMMARY_FIELDS = ["metric_type", "baseline_metric", "min_detectable_effect_percentage", "daily_visitors", "number_of_variants", "significance_level", "beta", "hypothesis"]
+
+HTML_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em auto; max-width: 60em; color: #1a1a40; }}
+section {{ page-break-after: always; border-top: 1px solid #ccc; padding-top: 1em; }}
+table {{ border-collapse: collapse; margin: 0.5em 0 1em; }}
+td, th {{ border: 1px solid #ccc; padding: 0.25em 0.75em; text-align: right; }}
+img {{ width: 100%; }}
+.error {{ color: #b00020; }}
+</style></head><body>
+<h1>{title}</h1>
+"""
+
+
+def visual_parameter(parameter: DurationParameter) -> Optional[VisualParameter]:
+    """Power plot parameters of a scenario (binomial scenarios only)."""
+    if parameter.metric_type != "binomial":
+        return None
+    return VisualParameter(
+        alpha=parameter.significance_level,
+        power=100 - parameter.beta,
+        hypothesis=parameter.hypothesis,
+        min_detectable_effect_percentage=parameter.min_detectable_effect_percentage,
+        baseline_conversion_rate_percentage=min(parameter.baseline_metric, 100),
+    )
+
+
+def pdf_image(png: bytes) -> np.ndarray:
+    """RGB pixels of a plot at its printed size, so the PDF embeds them without resampling."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(png)) as image:
+        return np.asarray(image.convert("RGB").resize(PDF_IMAGE_SIZE, Image.LANCZOS))
+
+
+def render_chunk(rows: list[dict], weeks: int, for_pdf: bool = False) -> list[tuple[dict, Union[bytes, np.ndarray, None]]]:
+    """
+    Size a chunk of scenarios and render their plots; runs inside the worker processes. For a PDF
+    the plots are returned as decoded pixels, which keeps that work off the assembling process.
+    """
+    results = plan_chunk(rows, weeks)
+    rendered = []
+    for result in results:
+        plot = None
+        if not result["error"]:
+            cleaned = {key: value for key, value in result.items() if value not in ("", None)}
+            try:
+                visual = visual_parameter(scenarios_adapter.validate_python([cleaned])[0])
+            except ValidationError:
+                visual = None
+            if visual is not None:
+                png = cached(get_cache(), make_key("plot_png", visual), lambda: plot_png(visual))
+                plot = pdf_image(png) if for_pdf else png
+        rendered.append((result, plot))
+    return rendered
+
+
+class HtmlReport:
+    def __init__(self, path: str, title: str, weeks: int):
+        self.weeks = weeks
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write(HTML_HEAD.format(title=html.escape(title)))
+
+    def add(self, index: int, result: dict, png: Optional[bytes]) -> None:
+        name = html.escape(str(result.get("name") or f"Scenario {index}"))
+        parts = [f"<section><h2>{name}</h2>"]
+        if result["error"]:
+            parts.append(f'<p class="error">{html.escape(result["error"])}</p></section>\n')
+            self._file.write("".join(parts))
+            return
+        settings = "".join(f"<tr><th>{field}</th><td>{html.escape(str(result[field]))}</td></tr>" for field in SUMMARY_FIELDS if result.get(field) not in ("", None))
+        parts.append(f"<table>{settings}<tr><th>sample size</th><td>{result['sample_size']:,}</td></tr><tr><th>duration (days)</th><td>{result['duration_days']}</td></tr></table>")
+        if self.weeks:
+            header = "".join(f"<th>week {week}</th>" for week in range(1, self.weeks + 1))
+            values = "".join(f"<td>{result[f'mde_week_{week}']:.2f}%</td>" for week in range(1, self.weeks + 1))
+            parts.append(f"<table><tr><th></th>{header}</tr><tr><th>MDE</th>{values}</tr></table>")
+        if png is not None:
+            parts.append(f'<img alt="power analysis" src="data:image/png;base64,{base64.b64encode(png).decode("ascii")}">')
+        parts.append("</section>\n")
+        self._file.write("".join(parts))
+
+    def close(self) -> None:
+        self._file.write("</body></html>\n")
+        self._file.close()
+
+
+class PdfReport:
+    """One page per scenario; each page is written to the file as soon as it is added."""
+
+    def __init__(self, path: str, title: str, weeks: int):
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        self.weeks = weeks
+        self._pdf = PdfPages(path, metadata={"Title": title})
+
+    def add(self, index: int, result: dict, pixels: Optional[np.ndarray]) -> None:
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(8.27, 11.69))  # A4 portrait
+        fig.text(0.08, 0.95, str(result.get("name") or f"Scenario {index}"), fontsize=16, fontweight="bold")
+        if result["error"]:
+            fig.text(0.08, 0.9, result["error"], color="#b00020", wrap=True)
+        else:
+            # Plain text rather than matplotlib tables: pages are assembled in a single process
+            lines = [f"{field:<36}{result[field]}" for field in SUMMARY_FIELDS if result.get(field) not in ("", None)]
+            lines += ["", f"{'sample size':<36}{result['sample_size']:,}", f"{'duration (days)':<36}{result['duration_days']}"]
+            if self.weeks:
+                lines += ["", "MDE by week", "   ".join(f"week {week}: {result[f'mde_week_{week}']:.2f}%" for week in range(1, self.weeks + 1))]
+            fig.text(0.08, 0.9, "\n".join(lines), family="monospace", fontsize=9, va="top")
+            if pixels is not None:
+                image = fig.add_axes([0.04, 0.05, 0.92, 0.45])
+                image.axis("off")
+                image.imshow(pixels, interpolation="none")
+        self._pdf.savefig(fig)
+
+    def close(self) -> None:
+        self._pdf.close()
+
+
+def generate_report(
+    input_path: str,
+    output_path: str,
+    weeks: int = 4,
+    title: str = "A/B Test Plan",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: Optional[int] = None,
+    progress=sys.stderr,
+) -> int:
+    """Write the report of every scenario of `input_path`; returns the number of scenarios."""
+    workers = workers or os.cpu_count() or 1
+    for_pdf = output_path.lower().endswith(".pdf")
+    report = (PdfReport if for_pdf else HtmlReport)(output_path, title, weeks)
+    total = 0
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+
+            def drain(limit: int) -> None:
+                nonlocal total
+                while len(pending) > limit:
+                    for result, plot in pending.popleft().result():
+                        total += 1
+                        report.add(total, result, plot)
+                    if progress is not None:
+                        print(f"rendered {total:,} scenarios ({total / (time.perf_counter() - started):,.1f}/s)", file=progress, flush=True)
+
+            # Keep at most two chunks per worker in flight so memory stays bounded
+            for chunk in read_chunks(input_path, chunk_size):
+                pending.append(pool.submit(render_chunk, chunk, weeks, for_pdf))
+                drain(2 * workers)
+            drain(0)
+    finally:
+        report.close()
+    return total
+
+
+def configure_parser(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("input", help="Scenario file (.csv or .parquet)")
+    parser.add_argument("output", help="Report file (.html or .pdf)")
+    parser.add_argument("--weeks", type=int, default=4, help="Number of weeks in the MDE table")
+    parser.add_argument("--title", default="A/B Test Plan")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.set_defaults(func=lambda args: generate_report(args.input, args.output, args.weeks, args.title, args.chunk_size, args.workers))
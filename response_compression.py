@@ -0,0 +1,180 @@
+"""
+Response Compression
+
+HTMX fragments repeat the same tooltip and form markup, and plot fragments carry base64 PNGs;
+neither app compressed them. This module provides an ASGI middleware shared by both apps:
+1. Negotiation of `Accept-Encoding` (with q-values) between gzip (always available), brotli
+   (`br`, if the `brotli` package is installed) and zstd (if `zstandard` is installed).
+2. Only compressible content is encoded: HTML, JSON, NDJSON, CSS, JavaScript, SVG and other
+   text. PNG and other already-compressed formats, small bodies, streamed bodies and responses
+   that already have a `Content-Encoding` are passed through untouched.
+3. A bounded in-memory cache of compressed variants keyed by a hash of the body and the
+   encoding, so a fragment or plot that is served repeatedly (most of them come from the result
+   cache) is compressed once.
+
+Configured with `ABTEST_COMPRESSION_MIN_SIZE` (bytes, default 500) and
+`ABTEST_COMPRESSION_CACHE_BYTES` (default 32 MB, 0 disables the cache).
+"""
+
+import asyncio
+import functools
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+DEFAULT_MIN_SIZE = 500
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+THREAD_THRESHOLD = 256 * 1024
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def _compressors() -> dict[str, Callable[[bytes], bytes]]:
+    # Server preference order, used to break ties between equal q-values
+    compressors = {}
+    try:
+        import zstandard  # optional dependency
+
+        compressors["zstd"] = zstandard.ZstdCompressor(level=6).compress
+    except ImportError:
+        pass
+    try:
+        import brotli  # optional dependency
+
+        compressors["br"] = lambda body: brotli.compress(body, quality=6)
+    except ImportError:
+        pass
+    compressors["gzip"] = lambda body: gzip.compress(body, compresslevel=6, mtime=0)
+    return compressors
+
+
+def choose_encoding(accept_encoding: str, available) -> Optional[str]:
+    """Best encoding of `available` (in server preference order) accepted by the client."""
+    quality = {}
+    for part in accept_encoding.split(","):
+        coding, *params = (item.strip().lower() for item in part.split(";"))
+        value = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    value = float(param[2:])
+                except ValueError:
+                    value = 0.0
+        if coding:
+            quality[coding] = value
+    best, best_quality = None, 0.0
+    for coding in available:
+        value = quality.get(coding, quality.get("*", 0.0))
+        if value > best_quality:
+            best, best_quality = coding, value
+    return best
+
+
+class CompressedCache:
+    """LRU of compressed bodies, bounded by their total size."""
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[bytes, str], bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compress(self, body: bytes, encoding: str, compress: Callable[[bytes], bytes]) -> bytes:
+        if self.max_bytes <= 0:
+            return compress(body)
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compressed
+            self.misses += 1
+        compressed = compress(body)
+        if len(compressed) <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = compressed
+                    self.bytes += len(compressed)
+                while self.bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.bytes -= len(evicted)
+        return compressed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses}
+
+
+class CompressionMiddleware:
+    def __init__(self, app, min_size: Optional[int] = None, cache: Optional[CompressedCache] = None):
+        self.app = app
+        self.min_size = int(os.environ.get("ABTEST_COMPRESSION_MIN_SIZE", DEFAULT_MIN_SIZE)) if min_size is None else min_size
+        self.cache = cache or get_compressed_cache()
+        self.compressors = _compressors()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"), self.compressors)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the body shows whether it is worth compressing
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough or start is None:
+                return await send(message)
+            body = message.get("body", b"")
+            response_headers = {key.lower(): value for key, value in start.get("headers", [])}
+            content_type = response_headers.get(b"content-type", b"").decode("latin-1").lower()
+            if (
+                message.get("more_body", False)
+                or len(body) < self.min_size
+                or b"content-encoding" in response_headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                passthrough = True
+                await send(start)
+                return await send(message)
+            compress = functools.partial(self.cache.get_or_compress, body, encoding, self.compressors[encoding])
+            # Large bodies (plot fragments, long tables) are compressed off the event loop
+            compressed = await asyncio.get_running_loop().run_in_executor(None, compress) if len(body) > THREAD_THRESHOLD else compress()
+            kept = [(key, value) for key, value in start.get("headers", []) if key.lower() not in (b"content-length", b"vary")]
+            vary = response_headers.get(b"vary", b"")
+            if b"accept-encoding" not in vary.lower():
+                vary = vary + b", Accept-Encoding" if vary else b"Accept-Encoding"
+            kept += [(b"content-encoding", encoding.encode()), (b"content-length", str(len(compressed)).encode()), (b"vary", vary)]
+            await send({**start, "headers": kept})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+
+_cache: Optional[CompressedCache] = None
+
+
+def get_compressed_cache() -> CompressedCache:
+    """Return the process-wide cache of compressed variants, shared by both apps."""
+    global _cache
+    if _cache is None:
+        _cache = CompressedCache(int(os.environ.get("ABTEST_COMPRESSION_CACHE_BYTES", DEFAULT_CACHE_BYTES)))
+    return _cache
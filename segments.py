@@ -0,0 +1,154 @@
+"""
+Segment Breakdown
+
+Answers "did it win on mobile / in France / for new users?" for a completed test. Rows are
+observations (one per unit, with the metric value: 0/1 for conversions, an amount for
+continuous metrics) carrying the variant and any number of categorical segment columns.
+
+1. Every segment column and the variant column are factorized once into integer codes
+   (`pd.factorize`).
+2. A cell is a segment value (or, with `cross=True`, a combination of values of all segment
+   columns); cell and variant codes are merged into one group index and the counts, means and
+   sums of squared deviations of every (cell, variant) come from `np.bincount` reductions.
+3. Every variant is compared with the control inside every cell with the z-test of
+   `function_estimation`, and the p-values of the whole family are adjusted with the
+   selected multiple-testing correction.
+
+From the command line:
+    python -m a_btest segments events.parquet --variant variant --metric converted --segments device country
+"""
+
+import argparse
+import sys
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.a_btest.corrections import adjust_pvalues
+from src.a_btest.datasource import is_parquet
+from src.a_btest.function_estimation import z_test_vectorized
+
+SEGMENT_CORRECTIONS = ("holm", "bonferroni", "sidak", "none")
+MAX_DENSE_CELLS = 1 << 24  # above this many possible crossed cells, compact them by sorting
+
+
+def _cell_moments(groups: np.ndarray, values: np.ndarray, group_count: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n = np.bincount(groups, minlength=group_count)
+    mean = np.bincount(groups, values, group_count) / np.maximum(n, 1)
+    deviation = values - mean[groups]
+    m2 = np.bincount(groups, deviation * deviation, group_count)
+    return n, mean, m2
+
+
+def _breakdown(dimension: str, cell_codes: np.ndarray, cell_labels: np.ndarray, variant_codes: np.ndarray, variant_labels: np.ndarray, control: int, values: np.ndarray, min_size: int) -> pd.DataFrame:
+    variant_count = len(variant_labels)
+    n, mean, m2 = _cell_moments(cell_codes * variant_count + variant_codes, values, len(cell_labels) * variant_count)
+    n, mean, m2 = (a.reshape(len(cell_labels), variant_count) for a in (n, mean, m2))
+    var_of_mean = np.where(n > 1, m2 / np.maximum(n - 1, 1), 0.0) / np.maximum(n, 1)
+
+    # One row per (cell, non-control variant)
+    variants = np.array([v for v in range(variant_count) if v != control], dtype=int)
+    cells = np.repeat(np.arange(len(cell_labels)), len(variants))
+    treated = np.tile(variants, len(cell_labels))
+    difference, se, z, p_value = z_test_vectorized(mean[cells, control], var_of_mean[cells, control], mean[cells, treated], var_of_mean[cells, treated])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        relative = np.where(mean[cells, control] != 0, 100 * difference / mean[cells, control], np.nan)
+    frame = pd.DataFrame(
+        {
+            "dimension": dimension,
+            "segment": cell_labels[cells],
+            "variant": variant_labels[treated],
+            "control_n": n[cells, control],
+            "variant_n": n[cells, treated],
+            "control_mean": mean[cells, control],
+            "variant_mean": mean[cells, treated],
+            "difference": difference,
+            "relative_difference_percentage": relative,
+            "standard_error": se,
+            "z": z,
+            "p_value": p_value,
+        }
+    )
+    return frame[(frame["control_n"] >= min_size) & (frame["variant_n"] >= min_size)]
+
+
+def segment_breakdown(
+    data: pd.DataFrame,
+    variant_column: str,
+    metric_column: str,
+    segment_columns: list[str],
+    control: Optional[str] = None,
+    correction: str = "holm",
+    cross: bool = False,
+    significance_level: float = 5,
+    min_size: int = 2,
+) -> pd.DataFrame:
+    """
+    Per-segment comparison of every variant with the control (default: first variant in sort
+    order). Cells with fewer than `min_size` observations in either group are skipped, and rows
+    with a missing variant or metric value are ignored.
+    """
+    if correction not in SEGMENT_CORRECTIONS:
+        raise ValueError(f"Unsupported correction '{correction}'")
+    # Rows without a variant or a metric value belong to no group (missing segments are kept as a value)
+    data = data[data[variant_column].notna() & data[metric_column].notna()]
+    values = data[metric_column].to_numpy(dtype=float)
+    variant_codes, variant_labels = pd.factorize(data[variant_column], sort=True)
+    variant_labels = np.asarray(variant_labels).astype(str)
+    if control is None:
+        control_code = 0
+    else:
+        matches = np.flatnonzero(variant_labels == str(control))
+        if not len(matches):
+            raise ValueError(f"Unknown control variant '{control}', expected one of {', '.join(variant_labels)}")
+        control_code = int(matches[0])
+    segment_codes = {column: pd.factorize(data[column], sort=True, use_na_sentinel=False) for column in segment_columns}
+
+    frames = []
+    if cross and segment_columns:
+        # Mixed-radix combination of the segment codes, compacted to the cells that occur
+        sizes = [len(segment_codes[column][1]) for column in segment_columns]
+        combined = np.ravel_multi_index([segment_codes[column][0] for column in segment_columns], sizes)
+        if np.prod(sizes) <= MAX_DENSE_CELLS:
+            present = np.bincount(combined, minlength=int(np.prod(sizes))) > 0
+            occurring = np.flatnonzero(present)
+            cell_codes = (np.cumsum(present) - 1)[combined]
+        else:
+            occurring, cell_codes = np.unique(combined, return_inverse=True)
+        parts = np.unravel_index(occurring, sizes)
+        labels = np.array([" / ".join(str(segment_codes[column][1][part[i]]) for column, part in zip(segment_columns, parts)) for i in range(len(occurring))], dtype=object)
+        frames.append(_breakdown(" x ".join(segment_columns), cell_codes, labels, variant_codes, variant_labels, control_code, values, min_size))
+    else:
+        for column in segment_columns:
+            codes, labels = segment_codes[column]
+            frames.append(_breakdown(column, codes, np.asarray(labels).astype(str), variant_codes, variant_labels, control_code, values, min_size))
+    # Whole population first, as a reference row
+    frames.insert(0, _breakdown("all", np.zeros(len(values), dtype=int), np.array(["all"], dtype=object), variant_codes, variant_labels, control_code, values, min_size))
+
+    result = pd.concat(frames, ignore_index=True)
+    segment_rows = result["dimension"] != "all"
+    result["adjusted_p_value"] = result["p_value"]
+    if correction != "none" and segment_rows.any():
+        result.loc[segment_rows, "adjusted_p_value"] = adjust_pvalues(result.loc[segment_rows, "p_value"].to_numpy(), correction)
+    result["significant"] = result["adjusted_p_value"] < significance_level / 100
+    return result
+
+
+def configure_parser(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("input", help="Observations (.csv or .parquet)")
+    parser.add_argument("--variant", required=True, help="Variant column")
+    parser.add_argument("--metric", required=True, help="Metric column (0/1 or continuous)")
+    parser.add_argument("--segments", nargs="+", required=True, help="Categorical segment columns")
+    parser.add_argument("--control", default=None, help="Control variant name (default: first in sort order)")
+    parser.add_argument("--correction", choices=SEGMENT_CORRECTIONS, default="holm")
+    parser.add_argument("--cross", action="store_true", help="Combine all segment columns into cells")
+    parser.add_argument("--output", default=None, help="Result CSV (default: stdout)")
+    parser.set_defaults(func=_run)
+
+
+def _run(args: argparse.Namespace) -> None:
+    columns = [args.variant, args.metric] + args.segments
+    data = pd.read_parquet(args.input, columns=columns) if is_parquet(args.input) else pd.read_csv(args.input, usecols=columns)
+    result = segment_breakdown(data, args.variant, args.metric, args.segments, args.control, args.correction, args.cross)
+    result.to_csv(args.output or sys.stdout, index=False)
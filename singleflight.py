@@ -0,0 +1,75 @@
+"""
+Request Coalescing (Single-Flight)
+
+When a shared dashboard link is opened by many browsers at once, identical requests arrive
+together and each would run the same computation before the first one reaches the cache. The
+single-flight layer keys every in-flight computation on its canonical cache key: the first
+request runs it, identical requests that arrive meanwhile wait for the same result. It
+includes:
+1. `SingleFlight.do`, which runs one coroutine per key and shares its result (or exception).
+   The computation runs in its own task, so a waiter that disconnects does not cancel it for
+   the others.
+2. Counters of executed and collapsed calls, reported by the `/metrics` route of both apps.
+3. `run_cached`, the read-through path used by the routes: single-flight, then the bounded
+   executor, then the persistent cache.
+
+Coalescing is per process; across uvicorn workers the shared cache takes over once the first
+result is stored.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+from src.a_btest.cache import cached, get_cache
+from src.a_btest.executor import run_compute
+from src.a_btest.tracing import span
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[str, asyncio.Future] = {}
+        self.executed = 0
+        self.collapsed = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is not None and not call.done():
+            self.collapsed += 1
+            with span("singleflight.wait"):
+                return await asyncio.shield(call)
+        self.executed += 1
+        call = asyncio.ensure_future(fn())
+        self._calls[key] = call
+        call.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(call)
+
+    def _forget(self, key: str, call: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved when every waiter went away
+        if not call.cancelled():
+            call.exception()
+
+    def stats(self) -> dict:
+        total = self.executed + self.collapsed
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "collapsed": self.collapsed,
+            "collapse_rate": self.collapsed / total if total else 0.0,
+        }
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
+
+
+async def run_cached(route: str, key: str, compute: Callable[[], Any]) -> Any:
+    """Cached result of `compute()`, computed at most once at a time per key in this process."""
+    return await get_single_flight().do(key, lambda: run_compute(route, cached, get_cache(), key, compute))
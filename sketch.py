@@ -0,0 +1,174 @@
+"""
+Streaming Quantile Sketch for Continuous Metrics
+
+Planning a continuous-metric test needs the metric's `std`, and a few extreme values (bots,
+bulk orders) inflate it. This module summarizes historical data with a merging t-digest, in one
+streaming pass, and derives winsorization caps and the capped mean / standard deviation that
+`get_sz_duration` expects in `ContinuousParameters`.
+
+1. Each centroid keeps its weight, sum and sum of squares, so the mean and variance of the data
+   (and of any winsorized version of it) come from the sketch without a second pass.
+2. Compression is vectorized: the centroids and the new chunk are sorted together, cut into
+   clusters with the k2 scale function (logit, single-value clusters in both tails) and reduced with
+   `np.bincount`.
+3. Sketches merge (files, workers, days of history) and serialize to a compact `.npz` payload.
+
+From the command line:
+    python -m a_btest sketch history.parquet --column revenue --save revenue.tdigest --upper-quantile 99
+"""
+
+import argparse
+import io
+import json
+import sys
+
+import numpy as np
+
+from src.a_btest.API.APIModels import ContinuousParameters
+from src.a_btest.datasource import DEFAULT_CHUNK_ROWS, iter_column_chunks
+
+DEFAULT_COMPRESSION = 200
+
+
+class TDigest:
+    def __init__(self, compression: float = DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.weights = np.zeros(0)
+        self.sums = np.zeros(0)
+        self.squares = np.zeros(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    @property
+    def means(self) -> np.ndarray:
+        return self.sums / self.weights
+
+    def update(self, values) -> "TDigest":
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if values.size:
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self._compress(np.ones(values.size), values, values * values)
+        return self
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        if other.weights.size:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(other.weights, other.sums, other.squares)
+        return self
+
+    def _compress(self, weights: np.ndarray, sums: np.ndarray, squares: np.ndarray) -> None:
+        weights = np.concatenate([self.weights, weights])
+        sums = np.concatenate([self.sums, sums])
+        squares = np.concatenate([self.squares, squares])
+        order = np.argsort(sums / weights, kind="stable")
+        weights, sums, squares = weights[order], sums[order], squares[order]
+        # k2 scale (logit of the quantile at each item's center): one cluster per unit of k,
+        # so clusters shrink to single values in both tails
+        total = weights.sum()
+        q = np.clip((np.cumsum(weights) - weights / 2) / total, 0.5 / total, 1 - 0.5 / total)
+        normalizer = 4 * np.log(max(total / self.compression, 1.0)) + 24
+        k = self.compression / normalizer * np.log(q / (1 - q))
+        boundaries = np.floor(k - k[0])
+        clusters = np.concatenate([[0], np.cumsum(np.diff(boundaries) != 0)])
+        count = clusters[-1] + 1
+        self.weights = np.bincount(clusters, weights, count)
+        self.sums = np.bincount(clusters, sums, count)
+        self.squares = np.bincount(clusters, squares, count)
+
+    def quantile(self, q) -> np.ndarray:
+        """Values at quantiles `q` in [0, 1] (interpolated between centroid centers)."""
+        cumulative = np.cumsum(self.weights) - self.weights / 2
+        total = self.count
+        positions = np.concatenate([[0.0], cumulative, [total]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(np.asarray(q, dtype=float) * total, positions, values)
+
+    def moments(self, lower: float = -np.inf, upper: float = np.inf) -> tuple[float, float]:
+        """Mean and standard deviation of the data winsorized to [lower, upper]."""
+        means = self.means
+        inside = (means >= lower) & (means <= upper)
+        clipped = np.clip(means, lower, upper)
+        total = self.count
+        # Centroids outside the caps collapse onto the cap; the others keep their exact moments
+        first = np.where(inside, self.sums, self.weights * clipped).sum()
+        second = np.where(inside, self.squares, self.weights * clipped**2).sum()
+        mean = first / total
+        variance = max(second / total - mean**2, 0.0) * total / max(total - 1, 1)
+        return float(mean), float(np.sqrt(variance))
+
+    def winsorization_caps(self, lower_quantile: float = 0, upper_quantile: float = 99) -> tuple[float, float]:
+        """Caps at the given quantiles (%); 0 and 100 leave that side uncapped."""
+        lower = self.quantile(lower_quantile / 100) if lower_quantile > 0 else -np.inf
+        upper = self.quantile(upper_quantile / 100) if upper_quantile < 100 else np.inf
+        return float(lower), float(upper)
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, weights=self.weights, sums=self.sums, squares=self.squares, meta=np.array([self.compression, self.min, self.max]))
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "TDigest":
+        with np.load(io.BytesIO(payload)) as data:
+            compression, minimum, maximum = data["meta"]
+            digest = cls(float(compression))
+            digest.weights, digest.sums, digest.squares = data["weights"], data["sums"], data["squares"]
+        digest.min, digest.max = float(minimum), float(maximum)
+        return digest
+
+
+def sketch_file(path: str, column: str, compression: float = DEFAULT_COMPRESSION, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> TDigest:
+    digest = TDigest(compression)
+    for chunk in iter_column_chunks(path, [column], chunk_rows):
+        digest.update(chunk[column])
+    return digest
+
+
+def continuous_parameters(digest: TDigest, lower_quantile: float = 0, upper_quantile: float = 99, **fields) -> ContinuousParameters:
+    """`ContinuousParameters` with the winsorized mean and std of the sketched history."""
+    mean, std = digest.moments(*digest.winsorization_caps(lower_quantile, upper_quantile))
+    return ContinuousParameters(baseline_metric=mean, std=std, **fields)
+
+
+def configure_parser(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("inputs", nargs="*", help="Historical data files (.csv or .parquet)")
+    parser.add_argument("--column", help="Metric column")
+    parser.add_argument("--merge", nargs="*", default=[], help="Saved sketches to merge in")
+    parser.add_argument("--save", default=None, help="Write the resulting sketch to this file")
+    parser.add_argument("--lower-quantile", type=float, default=0, help="Lower cap quantile (%%)")
+    parser.add_argument("--upper-quantile", type=float, default=99, help="Upper cap quantile (%%)")
+    parser.add_argument("--compression", type=float, default=DEFAULT_COMPRESSION)
+    parser.set_defaults(func=_run)
+
+
+def _run(args: argparse.Namespace) -> None:
+    digest = TDigest(args.compression)
+    for path in args.merge:
+        with open(path, "rb") as handle:
+            digest.merge(TDigest.from_bytes(handle.read()))
+    for path in args.inputs:
+        digest.merge(sketch_file(path, args.column, args.compression))
+    if args.save:
+        with open(args.save, "wb") as handle:
+            handle.write(digest.to_bytes())
+    lower, upper = digest.winsorization_caps(args.lower_quantile, args.upper_quantile)
+    mean, std = digest.moments()
+    capped_mean, capped_std = digest.moments(lower, upper)
+    report = {
+        "count": digest.count,
+        "centroids": int(digest.weights.size),
+        "mean": mean,
+        "std": std,
+        "caps": [lower if np.isfinite(lower) else None, upper if np.isfinite(upper) else None],
+        "capped_mean": capped_mean,
+        "capped_std": capped_std,
+    }
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
@@ -0,0 +1,19 @@
+import pytest
+from src.a_btest.allocation import optimize_allocation, square_root_allocation
+from src.a_btest.API.APIModels import BinomialParameters
+
+
+@pytest.mark.parametrize("number_of_variants", [2, 3, 5])
+def test_search_recovers_square_root_rule(number_of_variants):
+    parameter = BinomialParameters(baseline_metric=10, number_of_variants=number_of_variants, correction="sidak")
+    result = optimize_allocation(parameter)
+    assert result.allocations[0] == pytest.approx(square_root_allocation(number_of_variants), abs=0.05)
+    assert sum(result.allocations) == pytest.approx(100, abs=0.05)
+    assert result.duration_days <= result.equal_split_duration_days
+
+
+def test_control_constraint_is_respected():
+    parameter = BinomialParameters(baseline_metric=10, number_of_variants=5, correction="dunnett")
+    result = optimize_allocation(parameter, min_control=45)
+    assert result.allocations[0] == pytest.approx(45)
+    assert len(result.allocations) == 5
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from src.a_btest import bootstrap
+from src.a_btest.API.APIModels import BootstrapRequest, BootstrapSample
+
+
+@pytest.fixture(autouse=True)
+def inline(monkeypatch):
+    monkeypatch.setenv("ABTEST_BOOTSTRAP_WORKERS", "0")
+
+
+def heavy_tailed_request(**kwargs):
+    rng = np.random.default_rng(0)
+    control = rng.lognormal(0, 1.5, 3_000)
+    variant = rng.lognormal(0.1, 1.5, 3_000)
+    return BootstrapRequest(control=BootstrapSample(values=control.tolist()), variant=BootstrapSample(values=variant.tolist()), **kwargs)
+
+
+def test_interval_is_reproducible_and_covers_estimate():
+    request = heavy_tailed_request(resamples=2_500, seed=7)
+    first = bootstrap.bootstrap_interval(request)
+    assert first == bootstrap.bootstrap_interval(request)
+    assert first.lower < first.estimate < first.upper
+    assert first.resamples == 2_500
+
+
+def test_bca_shifts_skewed_interval():
+    percentile = bootstrap.bootstrap_interval(heavy_tailed_request(method="percentile", statistic="difference"))
+    bca = bootstrap.bootstrap_interval(heavy_tailed_request(method="bca", statistic="difference"))
+    assert percentile.estimate == bca.estimate
+    assert bca.upper > percentile.upper
+
+
+def test_aggregated_counts_match_expanded_data():
+    values, counts = [0.0, 1.0, 5.0], [500, 300, 50]
+    aggregated = bootstrap.bootstrap_interval(
+        BootstrapRequest(control=BootstrapSample(values=values, counts=counts), variant=BootstrapSample(values=values, counts=[480, 320, 50]), statistic="difference")
+    )
+    expanded = bootstrap.bootstrap_interval(
+        BootstrapRequest(control=BootstrapSample(values=list(np.repeat(values, counts))), variant=BootstrapSample(values=list(np.repeat(values, [480, 320, 50]))), statistic="difference")
+    )
+    assert np.isclose(aggregated.estimate, expanded.estimate)
+    assert np.isclose(aggregated.standard_error, expanded.standard_error, rtol=0.1)
+
+
+def test_acceleration_matches_jackknife():
+    rng = np.random.default_rng(3)
+    control = (rng.exponential(1, 200), np.ones(200), np.ones(200))
+    variant = (rng.exponential(1.2, 150), np.ones(150), np.ones(150))
+    jack = [variant[0].mean() / np.delete(control[0], i).mean() for i in range(200)] + [np.delete(variant[0], i).mean() / control[0].mean() for i in range(150)]
+    u = np.mean(jack) - np.array(jack)
+    expected = np.sum(u**3) / (6 * np.sum(u**2) ** 1.5)
+    assert np.isclose(bootstrap.acceleration(control, variant, "relative_difference"), expected, rtol=0.1)
+
+
+def test_process_pool_matches_inline(monkeypatch):
+    request = heavy_tailed_request(resamples=3_500, seed=11)
+    inline = bootstrap.bootstrap_interval(request)
+    monkeypatch.setenv("ABTEST_BOOTSTRAP_WORKERS", "2")
+    pool = bootstrap.start_pool()
+    try:
+        assert pool._mp_context.get_start_method() != "fork"
+        assert bootstrap.bootstrap_interval(request) == inline
+    finally:
+        bootstrap.shutdown_pool()
+    assert bootstrap._pool is None
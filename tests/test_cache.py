@@ -0,0 +1,52 @@
+from src.a_btest import cache as cache_module
+from src.a_btest.cache import SQLiteCache, NullCache, make_key, cached
+from src.a_btest.API.APIModels import VisualParameter
+
+
+def test_sqlite_cache_roundtrip(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("table", [{"week": 1, "mde": 0.1}] * 500)
+    assert cache.get("table") == [{"week": 1, "mde": 0.1}] * 500
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_sqlite_cache_ttl_expires(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("plot", b"png", ttl=-1)
+    assert cache.get("plot") is None
+
+
+def test_sqlite_cache_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    SQLiteCache(path).set("sample_size", (1234, 5))
+    assert SQLiteCache(path).get("sample_size") == (1234, 5)
+
+
+def test_sqlite_cache_size_eviction(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_bytes=10_000)
+    for i in range(20):
+        cache.set(f"entry-{i}", b"x" * 900)
+    cache.evict()
+    assert cache.stats()["bytes"] <= 10_000
+    assert cache.get("entry-19") == b"x" * 900
+
+
+def test_make_key_is_canonical():
+    assert make_key("plot_png", VisualParameter()) == make_key("plot_png", VisualParameter(alpha=5))
+    assert make_key("plot_png", VisualParameter()) != make_key("plot_png", VisualParameter(alpha=1))
+
+
+def test_make_key_changes_with_cache_version(monkeypatch):
+    key = make_key("plot_png", VisualParameter())
+    monkeypatch.setattr(cache_module, "CACHE_VERSION", cache_module.CACHE_VERSION + 1)
+    assert make_key("plot_png", VisualParameter()) != key
+
+
+def test_cached_computes_once(tmp_path):
+    calls = []
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    for _ in range(3):
+        assert cached(cache, "k", lambda: calls.append(1) or 42) == 42
+    assert len(calls) == 1
+    assert cached(NullCache(), "k", lambda: 7) == 7
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from src.a_btest.corrections import adjust_pvalues, critical_z, dunnett_critical_value, dunnett_exact
+from src.a_btest.function_estimation import get_sz_duration
+from src.a_btest.API.APIModels import BinomialParameters
+
+
+@pytest.mark.parametrize(
+    "comparisons, two_sided, expected",
+    [(2, False, 1.916), (2, True, 2.212), (4, True, 2.442)],  # published Dunnett values, df = inf
+)
+def test_dunnett_matches_published_values(comparisons, two_sided, expected):
+    assert dunnett_exact(comparisons, 5, 1.0, two_sided) == pytest.approx(expected, abs=1e-3)
+
+
+def test_corrections_are_ordered():
+    # Dunnett <= Sidak <= Holm (first step) for positively correlated comparisons
+    z = critical_z(5, 5, correction=["dunnett", "sidak", "holm"])
+    assert z[0] < z[1] < z[2]
+    assert dunnett_critical_value(4, 5.0) == pytest.approx(z[0])
+
+
+def test_bonferroni_keeps_historical_divisor():
+    assert critical_z(5, 4) == pytest.approx(critical_z(5 / 4, 1))
+
+
+def test_dunnett_shortens_multi_arm_tests():
+    bonferroni = get_sz_duration(BinomialParameters(baseline_metric=10, number_of_variants=5))
+    dunnett = get_sz_duration(BinomialParameters(baseline_metric=10, number_of_variants=5, correction="dunnett"))
+    assert dunnett[0] < bonferroni[0]
+
+
+def test_holm_adjusted_pvalues():
+    np.testing.assert_allclose(adjust_pvalues([0.01, 0.04, 0.03, 0.5], "holm"), [0.04, 0.09, 0.09, 0.5])
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from src.a_btest.cuped import MomentAccumulator, accumulate_file, analyze
+from src.a_btest.function_estimation import metric_variance
+from src.a_btest.API.APIModels import ContinuousParameters
+
+
+def test_chunked_moments_match_numpy():
+    rng = np.random.default_rng(0)
+    x = rng.normal(10, 2, 10_000)
+    y = 0.8 * x + rng.normal(0, 1, 10_000)
+    accumulator = MomentAccumulator()
+    for chunk in np.array_split(np.arange(x.size), 7):
+        accumulator.update(x[chunk], y[chunk])
+    covariance = np.cov(x, y)
+    assert accumulator.n == x.size
+    assert np.isclose(accumulator.var_x, covariance[0, 0])
+    assert np.isclose(accumulator.var_y, covariance[1, 1])
+    assert np.isclose(accumulator.cov, covariance[0, 1])
+    assert np.isclose(accumulator.variance_reduction, np.corrcoef(x, y)[0, 1] ** 2)
+
+
+def test_file_analysis_detects_effect(tmp_path):
+    rng = np.random.default_rng(1)
+    n = 20_000
+    pre = rng.gamma(2, 5, n)
+    variant = np.where(rng.random(n) < 0.5, "A", "B")
+    post = pre + rng.normal(0, 2, n) + np.where(variant == "B", 0.3, 0.0)
+    path = tmp_path / "users.csv"
+    pd.DataFrame({"pre": pre, "post": post, "variant": variant}).to_csv(path, index=False)
+
+    accumulators = accumulate_file(str(path), "pre", "post", "variant", chunk_rows=3_000)
+    assert accumulators["A"].n + accumulators["B"].n == n
+    assert accumulators["all"].variance_reduction > 0.8
+    result = analyze(accumulators, "A")[0]
+    assert result["variant"] == "B"
+    assert abs(result["difference"] - 0.3) < 0.1
+    assert result["p_value"] < 0.01
+
+
+def test_reduction_shrinks_planning_variance():
+    raw = ContinuousParameters(baseline_metric=10, std=4)
+    reduced = ContinuousParameters(baseline_metric=10, std=4, variance_reduction_percentage=75)
+    assert metric_variance(reduced)[1] == metric_variance(raw)[1] / 4
+
+
+def test_missing_cells_are_ignored(tmp_path):
+    frame = pd.DataFrame({"pre": [1.0, 2.0, None, 4.0, 5.0, 6.0], "post": [1.5, 2.5, 3.5, None, 5.5, 6.0], "variant": ["A", "B", "A", "B", None, "A"]})
+    path = tmp_path / "users.csv"
+    frame.to_csv(path, index=False)
+    accumulators = accumulate_file(str(path), "pre", "post", "variant", chunk_rows=4)
+    complete = frame.dropna()
+    assert accumulators["all"].n == len(complete) == 3
+    assert np.isclose(accumulators["all"].mean_x, complete["pre"].mean())
+    assert np.isclose(accumulators["A"].theta, MomentAccumulator().update(complete.pre[complete.variant == "A"], complete.post[complete.variant == "A"]).theta)
+    assert np.isfinite(accumulators["all"].theta) and accumulators["B"].n == 1
+    assert MomentAccumulator().update([1.0, np.nan, 3.0], [2.0, 2.0, np.inf]).n == 1
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+from src.a_btest.executor import ComputeExecutor, Overloaded, RouteLimit
+
+
+def test_run_returns_result_and_records_stats():
+    executor = ComputeExecutor()
+    assert asyncio.run(executor.run("sample_size", pow, 2, 10)) == 1024
+    stats = executor.stats()["sample_size"]
+    assert stats["completed"] == 1
+    assert stats["shed"] == 0
+
+
+def test_saturated_route_is_shed():
+    executor = ComputeExecutor({"plot": RouteLimit(max_concurrency=1, max_queue_wait=0.05)})
+
+    async def burst():
+        return await asyncio.gather(*(executor.run("plot", time.sleep, 0.3) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert sum(isinstance(result, Overloaded) for result in results) == 2
+    assert executor.stats()["plot"]["shed"] == 2
+
+
+def test_routes_do_not_share_slots():
+    executor = ComputeExecutor(
+        {
+            "plot": RouteLimit(max_concurrency=1, max_queue_wait=5),
+            "sample_size": RouteLimit(max_concurrency=1, max_queue_wait=0.1),
+        }
+    )
+
+    async def mixed():
+        slow = asyncio.ensure_future(executor.run("plot", time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+        fast = await executor.run("sample_size", abs, -1)
+        await slow
+        return fast
+
+    assert asyncio.run(mixed()) == 1
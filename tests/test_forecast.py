@@ -0,0 +1,42 @@
+import math
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from src.a_btest.forecast import days_to_reach, forecast_durations
+from src.a_btest.API.APIModels import BatchRequest, BinomialParameters, ForecastRequest, TrafficProfile
+
+
+def test_flat_traffic_matches_constant_rate():
+    parameter = BinomialParameters(baseline_metric=10, daily_visitors=700)
+    row = forecast_durations([parameter], TrafficProfile())[0]
+    assert row.duration_days == math.ceil(row.sample_size / 700)
+
+
+def test_weekend_dip_lengthens_short_tests():
+    parameter = BinomialParameters(baseline_metric=10, min_detectable_effect_percentage=40, daily_visitors=1000)
+    flat = forecast_durations([parameter], TrafficProfile())[0]
+    # Test starts on Saturday with very little weekend traffic
+    dip = forecast_durations([parameter], TrafficProfile(day_of_week_profile=[1, 1, 1, 1, 1, 0.1, 0.1], start_weekday=5))[0]
+    assert dip.duration_days > flat.duration_days
+
+
+def test_days_to_reach_with_start_offsets():
+    cumulative = np.cumsum([100, 100, 500, 500, 100])
+    np.testing.assert_array_equal(days_to_reach([150, 150, 5000], cumulative, [0, 2, 0]), [2, 1, -1])
+
+
+def test_experiment_without_finite_sample_size_is_rejected():
+    parameters = [BinomialParameters(baseline_metric=10), BinomialParameters(baseline_metric=10, min_detectable_effect_percentage=0)]
+    with pytest.raises(ValueError, match="Experiment 1"):
+        forecast_durations(parameters, TrafficProfile())
+
+
+def test_request_rejects_empty_batches_and_bad_start_days():
+    experiment = {"baseline_metric": 10}
+    for body in ({"experiments": []}, {"experiments": [experiment], "start_days": [-5]}, {"experiments": [experiment], "start_days": [0, 1]}):
+        with pytest.raises(ValidationError):
+            ForecastRequest.model_validate(body)
+    with pytest.raises(ValidationError):
+        BatchRequest.model_validate({"experiments": []})
+    assert ForecastRequest.model_validate({"experiments": [experiment], "start_days": [3]}).start_days == [3]
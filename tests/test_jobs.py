@@ -0,0 +1,79 @@
+import json
+import time
+
+import pytest
+from src.a_btest import jobs
+from src.a_btest.jobs import JobManager, JobStore, QuotaExceeded
+
+
+def wait_for(store, job_id, statuses=jobs.FINISHED, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        row = store.get(job_id)
+        if row["status"] in statuses:
+            return row
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} stuck in {row['status']}")
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = JobManager(JobStore(str(tmp_path / "jobs.sqlite3")), workers=2, max_pending=3, max_running=1)
+    yield manager
+    manager.stop()
+
+
+def test_job_runs_to_completion(manager):
+    experiments = [{"baseline_metric": 10, "daily_visitors": 1000}] * 25_000
+    job_id = manager.submit("alice", "sample_sizes", {"experiments": experiments})
+    row = wait_for(manager.store, job_id)
+    assert row["status"] == "succeeded" and row["progress"] == 1
+    assert row["expires_at"] > time.time()
+    assert '"sample_size":7064' in row["result"]
+
+
+def test_experiments_without_finite_sample_size_get_their_own_error(manager):
+    experiments = [{"baseline_metric": 10}, {"baseline_metric": 10, "min_detectable_effect_percentage": 0}]
+    row = wait_for(manager.store, manager.submit("erin", "sample_sizes", {"experiments": experiments}))
+    assert row["status"] == "succeeded"
+    valid, flat = json.loads(row["result"])
+    assert valid["sample_size"] > 0 and valid["error"] is None
+    assert flat == {"sample_size": None, "duration_days": None, "error": "MDE must be > 0 / no finite sample size"}
+
+
+def test_quota_and_cancellation(manager, monkeypatch):
+    started = []
+
+    def slow(request, progress):
+        started.append(True)
+        while True:
+            time.sleep(0.01)
+            progress(0.5)
+
+    monkeypatch.setitem(jobs.JOB_KINDS, "sample_sizes", (jobs.BatchRequest, slow))
+    ids = [manager.submit("bob", "sample_sizes", {"experiments": [{"baseline_metric": 10}]}) for _ in range(3)]
+    with pytest.raises(QuotaExceeded):
+        manager.submit("bob", "sample_sizes", {"experiments": [{"baseline_metric": 10}]})
+    wait_for(manager.store, ids[0], ("running",))
+    # max_running=1: the second job of the same client waits for the first
+    time.sleep(0.2)
+    assert manager.store.get(ids[1])["status"] == "queued"
+    for job_id in ids:
+        manager.cancel(job_id)
+    assert all(wait_for(manager.store, job_id)["status"] == "cancelled" for job_id in ids)
+    assert len(started) == 1
+
+
+def test_stale_running_jobs_are_requeued(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.insert("carol", "sample_sizes", '{"experiments": [{"baseline_metric": 10}]}', max_pending=5)
+    assert store.claim(max_running=1)["id"] == job_id
+    # The process running it "dies": no heartbeat, lease expires
+    store.maintain(lease=-1)
+    assert store.get(job_id)["status"] == "queued"
+    manager = JobManager(store, workers=1)
+    manager.start()
+    try:
+        assert wait_for(store, job_id)["status"] == "succeeded"
+    finally:
+        manager.stop()
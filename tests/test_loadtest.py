@@ -0,0 +1,57 @@
+import time
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.a_btest.loadtest import histogram, parse_mix, percentile, run
+
+
+def test_parse_mix():
+    assert parse_mix("api_sample_size=5, api_plot") == {"api_sample_size": 5.0, "api_plot": 1.0}
+    with pytest.raises(ValueError, match="Unknown scenario 'api_nope'"):
+        parse_mix("api_nope=1")
+
+
+def test_percentile_and_histogram():
+    values = list(range(1, 101))
+    assert (percentile(values, 50), percentile(values, 99), percentile(values, 100)) == (50, 99, 100)
+    assert percentile([], 50) is None
+    counts = histogram([0.5, 1, 1.5, 40, 20000], bounds=[1, 2, 50])
+    assert counts == {"le_1": 2, "le_2": 1, "le_50": 1, "le_inf": 1}
+
+
+def stub_send():
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    async def missing(request):
+        return PlainTextResponse("no", status_code=404)
+
+    app = Starlette(routes=[Route("/calculate_sample_size", ok, methods=["GET", "POST"]), Route("/get_table_mde", missing)])
+    client = TestClient(app)
+    return lambda method, url, form, timeout: client.request(method, url, data=form).status_code
+
+
+def test_report_shape_against_stub_app():
+    report = run("http://testserver", "http://testserver", rate=200, duration=0.3, mix=parse_mix("api_sample_size=2,api_table=1,html_form=1"), send=stub_send())
+    assert set(report) == {"config", "elapsed_s", "client_saturated", "scenarios"}
+    table = report["scenarios"]["api_table"]
+    assert table["errors"] == table["requests"] and table["status_codes"] == {"404": table["requests"]}
+    for result in report["scenarios"].values():
+        assert set(result["latency_ms"]) == {"p50", "p95", "p99"}
+        assert sum(result["latency_histogram_ms"].values()) == result["requests"]
+
+
+def test_saturated_client_charges_the_wait_to_latency():
+    def slow(method, url, form, timeout):
+        time.sleep(0.2)
+        return 200
+
+    report = run("http://api", "http://html", rate=50, duration=0.3, mix={"api_sample_size": 1}, max_in_flight=1, send=slow)
+    result = report["scenarios"]["api_sample_size"]
+    assert report["client_saturated"] == result["requests"] - 1 > 0
+    # Requests ran one after the other; the last one, scheduled before 0.3 s, is charged the whole queue
+    assert result["max_latency_ms"] > 1000 * (0.2 * result["requests"] - 0.3)
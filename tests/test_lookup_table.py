@@ -0,0 +1,45 @@
+import pytest
+from src.a_btest import lookup_table
+from src.a_btest.function_estimation import get_sz_duration
+from src.a_btest.API.APIModels import BinomialParameters
+
+
+@pytest.fixture
+def table(tmp_path, monkeypatch):
+    path = str(tmp_path / "sample_size_table.npy")
+    lookup_table.build_table(path)
+    monkeypatch.setattr(lookup_table, "_table", None)
+    monkeypatch.setenv("ABTEST_SZ_TABLE_PATH", path)
+    yield lookup_table.load_table()
+    monkeypatch.setattr(lookup_table, "_table", None)
+
+
+@pytest.mark.parametrize("hypothesis", ["One-sided Test", "Two-sided Test"])
+def test_lookup_matches_computation(table, hypothesis):
+    parameter = BinomialParameters(
+        baseline_metric=12.5,
+        min_detectable_effect_percentage=7,
+        significance_level=10,
+        beta=10,
+        number_of_variants=3,
+        control_allocation=40,
+        variant_allocations=30,
+        daily_visitors=2500,
+        hypothesis=hypothesis,
+    )
+    assert lookup_table.lookup_sz_duration(parameter.model_dump()) == get_sz_duration(parameter)
+
+
+def test_lookup_off_grid_falls_back(table):
+    assert lookup_table.lookup_sz_duration({"baseline_metric": "12.3"}) is None
+    assert lookup_table.lookup_sz_duration({"baseline_metric": "10", "metric_type": "continuous"}) is None
+    assert lookup_table.lookup_sz_duration({"baseline_metric": "10", "daily_visitors": "0"}) is None
+
+
+def test_lookup_only_answers_fields_the_grid_covers(table):
+    on_grid = {"baseline_metric": "10", "correction": "bonferroni", "variance_reduction_percentage": "0"}
+    assert lookup_table.lookup_sz_duration(on_grid) is not None
+    assert lookup_table.lookup_sz_duration({**on_grid, "variance_reduction_percentage": "30"}) is None
+    assert lookup_table.lookup_sz_duration({**on_grid, "correction": "holm"}) is None
+    # A field the grid knows nothing about must never be silently ignored
+    assert lookup_table.lookup_sz_duration({**on_grid, "std": "2.5"}) is None
@@ -0,0 +1,49 @@
+import csv
+
+from src.a_btest.planner import plan, plan_chunk
+from src.a_btest.function_estimation import get_sz_duration
+from src.a_btest.API.APIModels import BinomialParameters, ContinuousParameters
+
+
+def test_plan_chunk_matches_scalar_engine():
+    rows = [
+        {"metric_type": "binomial", "baseline_metric": "10", "min_detectable_effect_percentage": "5", "daily_visitors": "2000", "std": ""},
+        {"metric_type": "continuous", "baseline_metric": "40", "std": "12", "hypothesis": "Two-sided Test"},
+    ]
+    results = plan_chunk(rows, weeks=2)
+    expected = [
+        get_sz_duration(BinomialParameters(baseline_metric=10, min_detectable_effect_percentage=5, daily_visitors=2000)),
+        get_sz_duration(ContinuousParameters(baseline_metric=40, std=12, hypothesis="Two-sided Test")),
+    ]
+    assert [(row["sample_size"], row["duration_days"]) for row in results] == expected
+    assert all(row["mde_week_2"] < row["mde_week_1"] for row in results)
+    assert all(row["error"] == "" for row in results)
+
+
+def test_plan_chunk_reports_invalid_rows():
+    results = plan_chunk([{"baseline_metric": "-1"}, {"baseline_metric": "5"}])
+    assert "baseline_metric" in results[0]["error"]
+    assert results[0]["sample_size"] is None
+    assert results[1]["sample_size"] > 0
+
+
+def test_plan_writes_csv(tmp_path):
+    source = tmp_path / "scenarios.csv"
+    with open(source, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["name", "baseline_metric", "daily_visitors"])
+        writer.writerows([[f"exp-{i}", 1 + i % 20, 1000] for i in range(25)])
+    target = tmp_path / "results.csv"
+    assert plan(str(source), str(target), weeks=1, chunk_size=10, workers=1, progress=None) == 25
+    with open(target, newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert [row["name"] for row in rows] == [f"exp-{i}" for i in range(25)]
+    assert all(int(row["sample_size"]) > 0 for row in rows)
+
+
+def test_plan_chunk_reports_rows_without_finite_sample_size():
+    results = plan_chunk([{"baseline_metric": "5"}, {"baseline_metric": "5", "min_detectable_effect_percentage": "0"}, {"baseline_metric": "8"}], weeks=1)
+    assert results[1]["error"] == "MDE must be > 0 / no finite sample size"
+    assert results[1]["sample_size"] is None and results[1]["duration_days"] is None
+    assert [results[0]["error"], results[2]["error"]] == ["", ""]
+    assert results[0]["sample_size"] > 0 and results[2]["sample_size"] > 0
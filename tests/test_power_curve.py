@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from src.a_btest.power_curve import decode_column, power_curve
+from src.a_btest.API.APIModels import BinomialParameters, ContinuousParameters
+
+
+def test_curve_crosses_target_at_planned_duration():
+    parameter = BinomialParameters(baseline_metric=10, daily_visitors=500, correction="sidak", number_of_variants=3)
+    curve = power_curve(parameter)
+    columns = {name: decode_column(payload) for name, payload in curve.columns.items()}
+    assert all(values.size == curve.length for values in columns.values())
+    assert curve.length == 2 * curve.duration_days
+    np.testing.assert_allclose(columns["sample_size"], columns["day"] * 500)
+    # Power reaches 80% and the MDE falls to the planned 20% when the planned sample is collected
+    at_sample = np.interp(curve.sample_size, columns["sample_size"], columns["power"])
+    assert abs(at_sample - 80) < 0.1
+    assert abs(np.interp(curve.sample_size, columns["sample_size"], columns["mde"]) - 20) < 0.05
+    assert np.all(np.diff(columns["power"]) > 0) and np.all(np.diff(columns["mde"]) < 0)
+
+
+def test_explicit_horizon():
+    curve = power_curve(ContinuousParameters(baseline_metric=50, std=20, daily_visitors=100), days=10)
+    assert curve.length == 10
+    assert len(decode_column(curve.columns["power"])) == 10
+
+
+def test_zero_mde_has_no_curve():
+    with pytest.raises(ValueError, match="MDE must be > 0"):
+        power_curve(BinomialParameters(baseline_metric=10, min_detectable_effect_percentage=0))
@@ -0,0 +1,80 @@
+import sqlite3
+import time
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.a_btest.rate_limit import Budget, MemoryBuckets, RateLimiter, RateLimitMiddleware, SQLiteBuckets, route_cost
+
+
+def limited_app(limiter):
+    ok = lambda request: PlainTextResponse("ok")
+    app = Starlette(routes=[Route("/vizualize", ok), Route("/calculate_sample_size", ok), Route("/metrics", ok)])
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return app
+
+
+def test_expensive_budget_is_separate_and_sets_retry_after():
+    limiter = RateLimiter({"expensive": Budget(capacity=8, refill_rate=0.5)}, api_keys=["other"])
+    client = TestClient(limited_app(limiter))
+    assert [client.get("/vizualize").status_code for _ in range(3)] == [200, 200, 429]
+    response = client.get("/vizualize")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "8"
+    # Cheap routes and other clients keep their own buckets
+    assert client.get("/calculate_sample_size").status_code == 200
+    assert client.get("/vizualize", headers={"X-API-Key": "other"}).status_code == 200
+    assert client.get("/metrics").status_code == 200
+    assert limiter.stats()["expensive"] == {"allowed": 3, "limited": 2}
+
+
+def test_unknown_api_keys_share_the_ip_bucket():
+    limiter = RateLimiter({"expensive": Budget(capacity=8, refill_rate=0.5)}, api_keys=["known"])
+    client = TestClient(limited_app(limiter))
+    # Rotating made-up keys from one address must not reset the bucket
+    assert [client.get("/vizualize", headers={"X-API-Key": f"random-{i}"}).status_code for i in range(3)] == [200, 200, 429]
+    assert client.get("/vizualize", headers={"X-API-Key": "known"}).status_code == 200
+
+
+def test_buckets_refill_over_time():
+    limiter = RateLimiter({"default": Budget(capacity=2, refill_rate=1.0)})
+    assert [limiter.check("a", "default", 1, now=0.0) for _ in range(3)] == [0, 0, 1.0]
+    assert limiter.check("a", "default", 1, now=1.0) == 0
+    assert limiter.check("a", "default", 5, now=100.0) == 0  # a cost above the capacity empties the bucket
+
+
+def test_shared_buckets_are_seen_by_every_limiter(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    budgets = {"expensive": Budget(capacity=4, refill_rate=1.0)}
+    first, second = RateLimiter(budgets, SQLiteBuckets(path)), RateLimiter(budgets, SQLiteBuckets(path))
+    assert first.check("ip:1.2.3.4", "expensive", 4, now=10.0) == 0
+    assert second.check("ip:1.2.3.4", "expensive", 4, now=11.0) == 3.0
+    assert RateLimiter(budgets, MemoryBuckets()).check("ip:1.2.3.4", "expensive", 4, now=11.0) == 0
+
+
+def test_locked_shared_buckets_fail_open(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    limiter = RateLimiter({"expensive": Budget(capacity=4, refill_rate=1.0)}, SQLiteBuckets(path))
+    client = TestClient(limited_app(limiter))
+    assert [client.get("/vizualize").status_code for _ in range(2)] == [200, 429]
+    # Another worker holding the write lock must not stall or reject requests
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.perf_counter()
+        assert client.get("/vizualize").status_code == 200
+        assert time.perf_counter() - started < 5
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+    assert limiter.stats()["failed_open"] == 1
+    assert client.get("/vizualize").status_code == 429
+
+
+def test_route_costs():
+    assert route_cost("GET", "/vizualize") == ("expensive", 4)
+    assert route_cost("POST", "/live/plot") == ("default", 1.0)
+    assert route_cost("GET", "/jobs") == ("default", 1.0)
+    assert route_cost("GET", "/ready") is None
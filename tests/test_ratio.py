@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from src.a_btest.ratio import accumulate_file, analyze, planning_parameters, ratio_estimate
+from src.a_btest.function_estimation import metric_variance, sample_size_vectorized
+from src.a_btest.API.APIModels import RatioParameters
+
+
+def make_units(path, n=30_000, lift=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    variant = np.where(rng.random(n) < 0.5, "A", "B")
+    visits = rng.poisson(3, n) + 1
+    revenue = visits * rng.gamma(2, 1.5, n) * np.where(variant == "B", 1 + lift, 1)
+    pd.DataFrame({"revenue": revenue, "visits": visits, "variant": variant}).to_csv(path, index=False)
+    return revenue, visits, variant
+
+
+def test_delta_variance_matches_bootstrap(tmp_path):
+    revenue, visits, _ = make_units(tmp_path / "units.csv", n=2_000)
+    accumulators = accumulate_file(str(tmp_path / "units.csv"), "revenue", "visits", chunk_rows=300)
+    ratio, variance = ratio_estimate(accumulators["all"])
+    assert np.isclose(ratio, revenue.sum() / visits.sum())
+    rng = np.random.default_rng(1)
+    samples = rng.integers(0, revenue.size, (2_000, revenue.size))
+    boot = revenue[samples].sum(axis=1) / visits[samples].sum(axis=1)
+    assert abs(np.sqrt(variance) / boot.std() - 1) < 0.1
+
+
+def test_analysis_detects_lift(tmp_path):
+    make_units(tmp_path / "units.csv", lift=0.05)
+    accumulators = accumulate_file(str(tmp_path / "units.csv"), "revenue", "visits", "variant", chunk_rows=7_000)
+    result = analyze(accumulators, "A")[0]
+    assert result["variant"] == "B"
+    assert 2 < result["relative_difference_percentage"] < 8
+    assert result["p_value"] < 0.05
+
+
+def test_planning_uses_delta_variance(tmp_path):
+    make_units(tmp_path / "units.csv")
+    moments = accumulate_file(str(tmp_path / "units.csv"), "revenue", "visits")["all"]
+    parameters = RatioParameters(daily_visitors=1000, **planning_parameters(moments))
+    baseline, sigma_2 = metric_variance(parameters)
+    assert np.isclose(sigma_2 / moments.n, ratio_estimate(moments)[1])
+    assert sample_size_vectorized(baseline, 20, sigma_2, 5, 20, 2) > 0
+
+
+def test_units_with_missing_cells_are_ignored(tmp_path):
+    revenue, visits, variant = make_units(tmp_path / "units.csv", n=1_000)
+    frame = pd.read_csv(tmp_path / "units.csv")
+    frame.loc[[3, 10], "revenue"] = np.nan
+    frame.loc[[5], "visits"] = np.nan
+    frame.loc[[7], "variant"] = None
+    frame.to_csv(tmp_path / "gaps.csv", index=False)
+    accumulators = accumulate_file(str(tmp_path / "gaps.csv"), "revenue", "visits", "variant", chunk_rows=300)
+    complete = frame.dropna()
+    assert accumulators["all"].n == len(complete) == 996
+    ratio, variance = ratio_estimate(accumulators["all"])
+    assert np.isclose(ratio, complete["revenue"].sum() / complete["visits"].sum()) and np.isfinite(variance)
+    assert all(np.isfinite(row["p_value"]) for row in analyze(accumulators, "A"))
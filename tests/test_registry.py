@@ -0,0 +1,45 @@
+import pytest
+from src.a_btest.registry import ExperimentRegistry, experiment
+from src.a_btest.API.APIModels import BinomialParameters, ContinuousParameters
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ExperimentRegistry(str(tmp_path / "registry.sqlite3"))
+
+
+def test_keyset_pages_cover_every_row_once(registry):
+    parameters = BinomialParameters(baseline_metric=10)
+    ids = [registry.create("acme", f"exp-{i}", parameters, 1000 + i, 7, status="running" if i % 3 == 0 else "planned") for i in range(23)]
+    registry.create("other", "hidden", parameters, 1, 1)
+    seen, cursor = [], None
+    while True:
+        rows, cursor = registry.page("acme", cursor=cursor, limit=5)
+        seen += [row["id"] for row in rows]
+        if cursor is None:
+            break
+    assert seen == ids[::-1]
+    running, cursor = registry.page("acme", status="running", limit=100)
+    assert [row["id"] for row in running] == ids[::3][::-1] and cursor is None
+
+
+def test_rows_round_trip_and_tenants_are_isolated(registry):
+    parameters = ContinuousParameters(baseline_metric=40, std=12, daily_visitors=500)
+    experiment_id = registry.create("acme", "basket", parameters, 1234.4, 9)
+    assert registry.get("other", experiment_id) is None
+    assert not registry.set_status("other", experiment_id, "running")
+    assert registry.set_status("acme", experiment_id, "running")
+    model = experiment(registry.get("acme", experiment_id))
+    assert model.parameters == parameters
+    assert (model.status, model.sample_size, model.duration_days) == ("running", 1234, 9)
+
+
+def test_invalid_cursor(registry):
+    with pytest.raises(ValueError):
+        registry.page("acme", cursor="not-a-cursor")
+
+
+def test_infinite_sample_sizes_are_not_stored(registry):
+    with pytest.raises(ValueError, match="MDE must be > 0"):
+        registry.create("acme", "flat", BinomialParameters(baseline_metric=10), float("inf"), 1)
+    assert registry.page("acme") == ([], None)
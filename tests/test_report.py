@@ -0,0 +1,44 @@
+import csv
+import re
+
+from src.a_btest.report import generate_report, render_chunk
+
+
+def write_scenarios(path):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["name", "metric_type", "baseline_metric", "daily_visitors", "std"])
+        writer.writerows([["checkout", "binomial", 10, 2000, ""], ["basket", "continuous", 40, 1000, 12], ["broken", "binomial", -1, 1000, ""]])
+
+
+def test_render_chunk_plots_binomial_scenarios_only(monkeypatch):
+    monkeypatch.setenv("ABTEST_CACHE_PATH", "off")
+    rows = [{"metric_type": "binomial", "baseline_metric": "10"}, {"metric_type": "continuous", "baseline_metric": "40", "std": "12"}]
+    (binomial, png), (continuous, none) = render_chunk(rows, weeks=2)
+    assert png.startswith(b"\x89PNG") and none is None
+    assert binomial["sample_size"] > 0 and continuous["mde_week_2"] < continuous["mde_week_1"]
+    (_, pixels), _ = render_chunk(rows, weeks=0, for_pdf=True)
+    assert pixels.ndim == 3 and pixels.dtype.name == "uint8"
+
+
+def test_html_report_keeps_scenario_order(tmp_path, monkeypatch):
+    monkeypatch.setenv("ABTEST_CACHE_PATH", "off")
+    source = tmp_path / "scenarios.csv"
+    write_scenarios(source)
+    target = tmp_path / "report.html"
+    assert generate_report(str(source), str(target), weeks=2, chunk_size=1, workers=2, progress=None) == 3
+    text = target.read_text()
+    assert text.index("checkout") < text.index("basket") < text.index("broken")
+    assert text.count("data:image/png;base64,") == 1
+    assert 'class="error"' in text and text.rstrip().endswith("</html>")
+
+
+def test_pdf_report(tmp_path, monkeypatch):
+    monkeypatch.setenv("ABTEST_CACHE_PATH", "off")
+    source = tmp_path / "scenarios.csv"
+    write_scenarios(source)
+    target = tmp_path / "report.pdf"
+    assert generate_report(str(source), str(target), workers=1, progress=None) == 3
+    payload = target.read_bytes()
+    assert payload.startswith(b"%PDF")
+    assert len(re.findall(rb"/Type /Page\b(?!s)", payload)) == 3
@@ -0,0 +1,48 @@
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.a_btest.response_compression import CompressedCache, CompressionMiddleware, choose_encoding
+
+FRAGMENT = "<div class='tooltip-container'><label>?</label></div>" * 200
+
+
+def compressed_app(cache):
+    routes = [
+        Route("/fragment", lambda request: HTMLResponse(FRAGMENT)),
+        Route("/plot.png", lambda request: Response(b"\x89PNG" + b"\x00" * 5000, media_type="image/png")),
+        Route("/small", lambda request: HTMLResponse("<p>ok</p>")),
+    ]
+    app = Starlette(routes=routes)
+    app.add_middleware(CompressionMiddleware, cache=cache)
+    return app
+
+
+def test_html_is_compressed_once_and_png_untouched():
+    cache = CompressedCache()
+    client = TestClient(compressed_app(cache))
+    for _ in range(3):
+        response = client.get("/fragment", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.text == FRAGMENT
+    assert (cache.stats()["misses"], cache.stats()["hits"]) == (1, 2)
+    assert int(response.headers["content-length"]) < len(FRAGMENT) / 10
+    for path in ("/plot.png", "/small"):
+        assert "content-encoding" not in client.get(path, headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_identity_when_client_does_not_accept_an_encoding():
+    client = TestClient(compressed_app(CompressedCache()))
+    response = client.get("/fragment", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.text == FRAGMENT
+
+
+def test_choose_encoding_follows_q_values():
+    available = ["zstd", "br", "gzip"]
+    assert choose_encoding("gzip, br", available) == "br"
+    assert choose_encoding("br;q=0.5, gzip", available) == "gzip"
+    assert choose_encoding("*;q=0.1, zstd;q=0", available) == "br"
+    assert choose_encoding("deflate", available) is None
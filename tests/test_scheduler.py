@@ -0,0 +1,45 @@
+import pytest
+
+from src.a_btest.scheduler import _schedule_segment, schedule_portfolio
+from src.a_btest.API.APIModels import ScheduleRequest
+
+
+def test_single_lane_follows_smiths_rule():
+    # (index, weight, days): ratio order is 1 (1.0), 2 (2.0), 0 (5.0)
+    placements = _schedule_segment([(0, 1.0, 5), (1, 3.0, 3), (2, 2.0, 4)], lanes=1)
+    assert placements == {1: (0, 0, 3), 2: (0, 3, 7), 0: (0, 7, 12)}
+
+
+def test_lanes_never_overlap():
+    jobs = [(index, 1.0, days) for index, days in enumerate([9, 1, 1, 1, 7, 3, 2, 8])]
+    placements = _schedule_segment(jobs, lanes=3)
+    by_lane = {}
+    for lane, start, end in placements.values():
+        by_lane.setdefault(lane, []).append((start, end))
+    for intervals in by_lane.values():
+        intervals.sort()
+        assert all(previous[1] <= current[0] for previous, current in zip(intervals, intervals[1:]))
+    assert len(placements) == len(jobs)
+
+
+def test_portfolio_timeline():
+    experiments = [
+        {"experiment_id": f"exp-{i}", "parameters": {"baseline_metric": 5 + i, "daily_visitors": 5000}, "segment_id": "mobile" if i % 2 else "desktop", "priority": 1 + i % 3}
+        for i in range(12)
+    ]
+    response = schedule_portfolio(ScheduleRequest(experiments=experiments, lanes_per_segment=2))
+    assert len(response.timeline) == 12
+    assert {item.traffic_share for item in response.timeline} == {50.0}
+    assert response.makespan_days == max(item.end_day for item in response.timeline)
+    assert all(item.end_day > item.start_day for item in response.timeline)
+
+
+def test_experiment_without_finite_sample_size_is_named():
+    request = ScheduleRequest(
+        experiments=[
+            {"experiment_id": "ok", "parameters": {"baseline_metric": 10}},
+            {"experiment_id": "flat", "parameters": {"baseline_metric": 10, "min_detectable_effect_percentage": 0}},
+        ]
+    )
+    with pytest.raises(ValueError, match="'flat'"):
+        schedule_portfolio(request)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.a_btest.segments import segment_breakdown
+
+
+def make_events(n=40_000, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(
+        {
+            "variant": rng.choice(["A", "B"], n),
+            "device": rng.choice(["mobile", "desktop"], n),
+            "country": rng.choice(["FR", "DE", "US"], n),
+        }
+    )
+    # B only wins on mobile
+    rate = 0.10 + 0.04 * ((frame["variant"] == "B") & (frame["device"] == "mobile"))
+    frame["converted"] = (rng.random(n) < rate).astype(int)
+    return frame
+
+
+def test_marginal_cells_match_groupby():
+    events = make_events()
+    result = segment_breakdown(events, "variant", "converted", ["device", "country"])
+    assert set(result["dimension"]) == {"all", "device", "country"}
+    mobile = result[(result["dimension"] == "device") & (result["segment"] == "mobile")].iloc[0]
+    means = events[events["device"] == "mobile"].groupby("variant")["converted"].mean()
+    assert np.isclose(mobile["control_mean"], means["A"])
+    assert np.isclose(mobile["variant_mean"], means["B"])
+    assert mobile["significant"]
+    desktop = result[(result["dimension"] == "device") & (result["segment"] == "desktop")].iloc[0]
+    assert not desktop["significant"]
+
+
+def test_crossed_cells_and_correction():
+    events = make_events()
+    crossed = segment_breakdown(events, "variant", "converted", ["device", "country"], cross=True, correction="bonferroni")
+    cells = crossed[crossed["dimension"] != "all"]
+    assert len(cells) == 6
+    assert "mobile / FR" in set(cells["segment"])
+    assert np.allclose(cells["adjusted_p_value"], np.minimum(cells["p_value"] * 6, 1))
+    counts = events.groupby(["device", "country", "variant"]).size()
+    row = cells[cells["segment"] == "desktop / US"].iloc[0]
+    assert row["control_n"] == counts[("desktop", "US", "A")]
+
+
+def test_missing_values_and_unknown_control():
+    events = make_events(2_000).astype({"variant": object, "converted": float})
+    events.loc[:9, "variant"] = None
+    events.loc[10:19, "converted"] = np.nan
+    result = segment_breakdown(events, "variant", "converted", ["device"])
+    overall = result[result["dimension"] == "all"].iloc[0]
+    assert overall["control_n"] + overall["variant_n"] == len(events) - 20
+    with pytest.raises(ValueError, match="expected one of A, B"):
+        segment_breakdown(events, "variant", "converted", ["device"], control="C")
@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from src.a_btest.singleflight import SingleFlight
+
+
+def test_identical_concurrent_calls_run_once():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value * 2
+
+    async def main():
+        same = [flight.do("a", lambda: compute(1)) for _ in range(5)]
+        return await asyncio.gather(*same, flight.do("b", lambda: compute(2)))
+
+    assert asyncio.run(main()) == [2, 2, 2, 2, 2, 4]
+    assert calls == [1, 2]
+    stats = flight.stats()
+    assert (stats["executed"], stats["collapsed"], stats["in_flight"]) == (2, 4, 0)
+
+
+def test_error_is_shared_and_not_cached():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad input")
+
+    async def ok():
+        return 1
+
+    async def main():
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        return results, await flight.do("k", ok)
+
+    results, retry = asyncio.run(main())
+    assert all(isinstance(error, ValueError) for error in results)
+    assert retry == 1
+
+
+def test_cancelled_waiter_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("k", slow))
+        second = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
@@ -0,0 +1,47 @@
+import numpy as np
+from src.a_btest.sketch import TDigest, continuous_parameters
+from src.a_btest.function_estimation import get_sz_duration
+
+
+def heavy_tailed(n=200_000, seed=0):
+    return np.random.default_rng(seed).lognormal(3, 1.2, n)
+
+
+def test_quantiles_and_exact_moments():
+    values = heavy_tailed()
+    digest = TDigest()
+    for chunk in np.array_split(values, 13):
+        digest.update(chunk)
+    assert digest.weights.size < 400
+    for q in (0.01, 0.5, 0.9, 0.99, 0.999):
+        exact = np.quantile(values, q)
+        assert abs(digest.quantile(q) - exact) / exact < 0.02
+    mean, std = digest.moments()
+    assert np.isclose(mean, values.mean())
+    assert np.isclose(std, values.std(ddof=1))
+
+
+def test_capped_std_matches_winsorized_data():
+    values = heavy_tailed()
+    digest = TDigest().update(values)
+    lower, upper = digest.winsorization_caps(0, 99)
+    capped = np.clip(values, lower, upper)
+    mean, std = digest.moments(lower, upper)
+    assert abs(mean / capped.mean() - 1) < 0.01
+    assert abs(std / capped.std(ddof=1) - 1) < 0.02
+    assert std < values.std()
+
+
+def test_merge_and_serialization_round_trip():
+    values = heavy_tailed()
+    left, right = TDigest().update(values[:120_000]), TDigest().update(values[120_000:])
+    merged = TDigest.from_bytes(left.to_bytes()).merge(TDigest.from_bytes(right.to_bytes()))
+    assert merged.count == values.size
+    assert abs(merged.quantile(0.99) / np.quantile(values, 0.99) - 1) < 0.02
+
+
+def test_capped_parameters_shrink_sample_size():
+    digest = TDigest().update(heavy_tailed())
+    raw = continuous_parameters(digest, upper_quantile=100)
+    capped = continuous_parameters(digest, upper_quantile=99)
+    assert get_sz_duration(capped)[0] < get_sz_duration(raw)[0]
@@ -0,0 +1,74 @@
+import json
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.a_btest.tracing import Tracer, TracingMiddleware, parse_traceparent, span, traced
+
+
+@traced()
+def compute(value):
+    with span("inner", value=value):
+        return value * 2
+
+
+def traced_app(tracer):
+    async def endpoint(request):
+        return PlainTextResponse(str(compute(21)))
+
+    app = Starlette(routes=[Route("/compute", endpoint)])
+    app.add_middleware(TracingMiddleware, service="test", tracer=tracer)
+    return app
+
+
+def read_spans(path):
+    lines = path.read_text().splitlines()
+    return [line["resourceSpans"][0]["scopeSpans"][0]["spans"] for line in map(json.loads, lines)]
+
+
+def test_sampled_request_exports_nested_spans(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    client = TestClient(traced_app(Tracer(str(path), sample_rate=1.0)))
+    parent = "00-" + "ab" * 16 + "-" + "cd" * 8 + "-01"
+    response = client.get("/compute", headers={"traceparent": parent})
+    assert response.text == "42"
+    assert response.headers["traceparent"].startswith("00-" + "ab" * 16)
+    (spans,) = read_spans(path)
+    by_name = {item["name"]: item for item in spans}
+    assert set(by_name) == {"GET /compute", "compute", "inner"}
+    assert {item["traceId"] for item in spans} == {"ab" * 16}
+    assert by_name["GET /compute"]["parentSpanId"] == "cd" * 8
+    assert by_name["inner"]["parentSpanId"] == by_name["compute"]["spanId"]
+    assert by_name["compute"]["parentSpanId"] == by_name["GET /compute"]["spanId"]
+    assert {"key": "value", "value": {"intValue": "21"}} in by_name["inner"]["attributes"]
+
+
+def test_unsampled_requests_are_not_recorded(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    client = TestClient(traced_app(Tracer(str(path), sample_rate=0.0)))
+    assert client.get("/compute").text == "42"
+    # An incoming unsampled traceparent is followed as well
+    assert "traceparent" not in client.get("/compute", headers={"traceparent": "00-" + "ab" * 16 + "-" + "cd" * 8 + "-00"}).headers
+    assert not path.exists() or path.read_text() == ""
+
+
+def test_slow_requests_are_exported_without_sampling(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    client = TestClient(traced_app(Tracer(str(path), sample_rate=0.0, slow_threshold=0.0)))
+    client.get("/compute")
+    assert len(read_spans(path)) == 1
+
+
+def test_invalid_traceparent_is_ignored():
+    assert parse_traceparent("00-" + "0" * 32 + "-" + "cd" * 8 + "-01") is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+    assert parse_traceparent("00-" + "ab" * 16 + "-" + "cd" * 8 + "-01") == ("ab" * 16, "cd" * 8, True)
+
+
+def test_span_outside_request_is_a_no_op():
+    with span("orphan") as current:
+        assert current is None
+    assert compute(1) == 2
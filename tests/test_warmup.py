@@ -0,0 +1,41 @@
+import json
+
+from src.a_btest import cache
+from src.a_btest.cache import SQLiteCache, make_key
+from src.a_btest.API.APIModels import VisualParameter
+from src.a_btest.warmup import Warmup, default_plots, read_top_requests
+
+
+def test_default_plots_cover_common_settings_once():
+    plots = default_plots()
+    assert plots[0] == VisualParameter()
+    assert len(plots) == len(set(plot.model_dump_json() for plot in plots)) == 8
+
+
+def test_warmup_reports_ready_and_keeps_going_after_bad_requests(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "_cache", SQLiteCache(str(tmp_path / "cache.sqlite3")))
+    path = tmp_path / "top.jsonl"
+    lines = [
+        {"route": "sample_size", "params": {"metric_type": "binomial", "baseline_metric": 12, "daily_visitors": 4321}},
+        {"route": "unknown"},
+        {"route": "plot", "params": {"alpha": 1, "power": 95}},
+    ]
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\n")
+    assert [route for route, _ in read_top_requests(str(path))] == ["sample_size", "unknown", "plot"]
+
+    warmup = Warmup(str(path))
+    assert warmup.report()["status"] == "pending" and not warmup.ready()
+    warmup.run()
+    assert warmup.ready()
+    steps = warmup.report()["steps"]
+    assert list(steps) == ["imports", "kernels", "plots", "top_requests"]
+    assert (steps["top_requests"]["items"], steps["top_requests"]["errors"]) == (2, 1)
+    assert steps["plots"]["errors"] == 0
+    # Stored under the key of the plot routes
+    assert cache.get_cache().get(make_key("plot_png", VisualParameter(alpha=1, power=95))) is not None
+
+
+def test_disabled_warmup_is_ready_at_once():
+    warmup = Warmup(enabled=False)
+    warmup.start()
+    assert warmup.ready()
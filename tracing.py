@@ -0,0 +1,272 @@
+"""
+Request Tracing
+
+Aggregate `/metrics` say that requests are slow, not why a given one was. This module records
+lightweight spans per request and exports them locally. It includes:
+1. `TracingMiddleware` (both apps): opens the root span of each request, continues the trace of an
+   incoming W3C `traceparent` header and returns the `traceparent` of the request.
+2. `span(name)` / `@traced(name)`: child spans around the stages of a request (model validation,
+   `get_sz_duration` / `calculate_mde`, `generate_plot`, `savefig`, base64 encoding). The current
+   span lives in a context variable, which the compute executor copies into its worker threads.
+3. Sampling: `ABTEST_TRACE_SAMPLE_RATE` (fraction of new traces recorded, default 0.01; a sampled
+   `traceparent` is always followed) and `ABTEST_TRACE_SLOW_THRESHOLD` (seconds; when set, every
+   request is recorded and the ones slower than this are exported even if not sampled).
+   Unsampled requests create no span objects at all.
+4. Export: one OTLP/JSON `ExportTraceServiceRequest` per trace and per line, appended to a
+   rotating file (`ABTEST_TRACE_PATH`, `ABTEST_TRACE_MAX_BYTES`, `ABTEST_TRACE_BACKUPS`) that the
+   OpenTelemetry collector's `otlpjsonfile` receiver can read.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+DEFAULT_TRACE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "a_btest", "traces.jsonl")
+DEFAULT_SAMPLE_RATE = 0.01
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+@dataclass
+class Span:
+    trace: "Trace"
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    kind: int = SPAN_KIND_INTERNAL
+    start: int = field(default_factory=time.time_ns)
+    end: Optional[int] = None
+    attributes: dict = field(default_factory=dict)
+    status: int = STATUS_UNSET
+    message: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self) -> None:
+        self.end = time.time_ns()
+        self.trace.add(self)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status, **({"message": self.message} if self.message else {})},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Trace:
+    """Spans of one request, collected from the event loop and the compute threads."""
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def to_otlp(self, service: str) -> dict:
+        with self._lock:
+            spans = [span.to_otlp() for span in self.spans]
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+                    "scopeSpans": [{"scope": {"name": "a_btest"}, "spans": spans}],
+                }
+            ]
+        }
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("abtest_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """Child span of the current one; a no-op (yields None) outside a recorded request."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, _new_id(8), parent.span_id, kind, attributes=attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.status, child.message = STATUS_ERROR, f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator form of `span`, named after the function by default."""
+
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple[str, str, bool]]:
+    """(trace id, parent span id, sampled) of a valid W3C `traceparent`, else None."""
+    match = TRACEPARENT.match((header or "").strip().lower())
+    if match is None or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+class Tracer:
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_TRACE_PATH,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        slow_threshold: Optional[float] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backups: int = DEFAULT_BACKUPS,
+    ):
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.exported = 0
+        self._logger = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            # A private logger (not attached to the logging tree) owns the rotating file
+            self._logger = logging.Logger(f"a_btest.tracing.{id(self)}")
+            self._logger.addHandler(handler)
+
+    def start(self, name: str, traceparent: Optional[str] = None, **attributes) -> Optional[Span]:
+        """Root span of a request, or None when the request is not recorded."""
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id, sampled = None, None, random.random() < self.sample_rate
+        if not sampled and self.slow_threshold is None:
+            return None
+        trace = Trace(trace_id or _new_id(16), sampled)
+        return Span(trace, name, _new_id(8), parent_id, SPAN_KIND_SERVER, attributes=attributes)
+
+    def end(self, root: Span, service: str) -> None:
+        root.finish()
+        trace = root.trace
+        slow = self.slow_threshold is not None and (root.end - root.start) / 1e9 >= self.slow_threshold
+        if (trace.sampled or slow) and self._logger is not None:
+            self._logger.info(json.dumps(trace.to_otlp(service), separators=(",", ":")))
+            self.exported += 1
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer configured through the environment."""
+    global _tracer
+    if _tracer is None:
+        path = os.environ.get("ABTEST_TRACE_PATH", DEFAULT_TRACE_PATH)
+        slow = os.environ.get("ABTEST_TRACE_SLOW_THRESHOLD")
+        _tracer = Tracer(
+            None if path in ("", "off") else path,
+            sample_rate=float(os.environ.get("ABTEST_TRACE_SAMPLE_RATE", DEFAULT_SAMPLE_RATE)),
+            slow_threshold=float(slow) if slow else None,
+            max_bytes=int(os.environ.get("ABTEST_TRACE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            backups=int(os.environ.get("ABTEST_TRACE_BACKUPS", DEFAULT_BACKUPS)),
+        )
+    return _tracer
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of every HTTP request."""
+
+    def __init__(self, app, service: str = "a_btest", tracer: Optional[Tracer] = None):
+        self.app = app
+        self.service = service
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        tracer = self.tracer or get_tracer()
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1")
+        root = tracer.start(f"{scope['method']} {scope['path']}", traceparent, **{"http.method": scope["method"], "http.target": scope["path"]})
+        if root is None:
+            return await self.app(scope, receive, send)
+
+        async def send_traced(message):
+            if message["type"] == "http.response.start":
+                root.set(**{"http.status_code": message["status"]})
+                if message["status"] >= 500:
+                    root.status = STATUS_ERROR
+                flags = "01" if root.trace.sampled else "00"
+                header = f"00-{root.trace.trace_id}-{root.span_id}-{flags}".encode()
+                message = {**message, "headers": [*message.get("headers", []), (b"traceparent", header)]}
+            await send(message)
+
+        token = _current.set(root)
+        try:
+            await self.app(scope, receive, send_traced)
+        except BaseException as exc:
+            root.status, root.message = STATUS_ERROR, f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            _current.reset(token)
+            tracer.end(root, self.service)
@@ -0,0 +1,201 @@
+"""
+Startup Warm-Up
+
+After a deploy the first users pay for everything that is done lazily: importing matplotlib and
+building its font cache, the first calls into the SciPy quantile functions, the memoized Dunnett
+critical values and rendering the default power plot. This module does that work in a background
+thread once the app has started. It includes:
+1. Ordered warm-up steps: heavy imports (matplotlib, fonts, PIL), the vectorized sample size,
+   MDE and power kernels with every correction, the lookup tables, the default `VisualParameter`
+   plots for common alpha / power settings, then the scenarios of a top-requests file.
+2. Results stored in the shared result cache under the keys the routes use, so workers started
+   after the first one read them back instead of rendering them again.
+3. `warmup_lifespan` (`warmup_lifespan_context` for FastAPI), which starts the warm-up when the
+   app starts, and the `/ready` route of both apps. `/ready` answers 503 until the warm-up is
+   done, while `/health` only reports that the process is alive. A failed step is recorded and
+   does not block readiness.
+
+The top-requests file (`ABTEST_WARMUP_FILE`) holds one JSON object per line, such as
+`{"route": "plot", "params": {"alpha": 5, "power": 90}}`, where `route` is one of
+`sample_size`, `plot`, `power_curve` or `table_mde`. Set `ABTEST_WARMUP=off` to skip the
+warm-up, in which case the apps are ready at once.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from pydantic import TypeAdapter
+
+from src.a_btest.API.APIModels import DurationParameter, Mde_Parameter, VisualParameter
+from src.a_btest.cache import cached, get_cache, make_key
+
+COMMON_ALPHAS = (5.0, 10.0)
+COMMON_POWERS = (80.0, 90.0)
+HYPOTHESES = ("One-sided Test", "Two-sided Test")
+
+duration_adapter = TypeAdapter(DurationParameter)
+logger = logging.getLogger(__name__)
+
+
+def warm_imports() -> int:
+    import matplotlib.pyplot as plt
+    from matplotlib import font_manager
+    from PIL import Image  # noqa: F401 (used by the reports)
+
+    # Building the font list and resolving the default font are the slow parts of the first plot
+    font_manager.findfont(font_manager.FontProperties(family=plt.rcParams["font.family"]))
+    return 1
+
+
+def warm_kernels() -> int:
+    import numpy as np
+
+    from src.a_btest.corrections import CORRECTIONS, _load_table
+    from src.a_btest.function_estimation import mde_vectorized, power_vectorized, sample_size_vectorized
+    from src.a_btest.lookup_table import load_table
+
+    load_table()
+    _load_table()
+    baselines = np.linspace(0.01, 0.5, 64)  # binomial rates
+    calls = 0
+    for correction in CORRECTIONS:
+        for two_sided in (False, True):
+            for variants in range(2, 6):
+                # Each call memoizes the critical values of its correction, sides and alpha
+                for alpha in COMMON_ALPHAS:
+                    sample_size_vectorized(baselines, 20, baselines * (1 - baselines), alpha, 20, variants, two_sided=two_sided, correction=correction)
+                    calls += 1
+    power_vectorized(np.full(64, 1000.0), baselines, 20, baselines * (1 - baselines), 5, 2)
+    mde_vectorized(np.arange(1, 6) * 1000, np.arange(1, 6) * 200, 5, 20, 2)
+    return calls
+
+
+def default_plots() -> list[VisualParameter]:
+    plots = [VisualParameter()]
+    for alpha in COMMON_ALPHAS:
+        for power in COMMON_POWERS:
+            for hypothesis in HYPOTHESES:
+                plot = VisualParameter(alpha=alpha, power=power, hypothesis=hypothesis)
+                if plot != plots[0]:
+                    plots.append(plot)
+    return plots
+
+
+def warm_request(route: str, params: dict) -> None:
+    """Compute one request into the result cache, under the key its route uses."""
+    from src.a_btest.function_estimation import get_sz_duration, plot_png, table_mde_columns
+    from src.a_btest.power_curve import power_curve
+
+    if route == "plot":
+        visual = VisualParameter(**params)
+        cached(get_cache(), make_key("plot_png", visual), lambda: plot_png(visual))
+    elif route == "sample_size":
+        parameter = duration_adapter.validate_python(params)
+        cached(get_cache(), make_key("sample_size", parameter), lambda: get_sz_duration(parameter))
+    elif route == "power_curve":
+        parameter = duration_adapter.validate_python(params)
+        # Both apps request the default horizon
+        cached(get_cache(), make_key("power_curve", parameter, None), lambda: power_curve(parameter))
+    elif route == "table_mde":
+        mde_parameter = Mde_Parameter(**params)
+        cached(get_cache(), make_key("table_mde_columns", mde_parameter), lambda: table_mde_columns(mde_parameter))
+    else:
+        raise ValueError(f"Unknown warm-up route '{route}'")
+
+
+def read_top_requests(path: str) -> list[tuple[str, dict]]:
+    requests = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                request = json.loads(line)
+                requests.append((request["route"], request.get("params", {})))
+    return requests
+
+
+class Warmup:
+    def __init__(self, top_requests_path: Optional[str] = None, enabled: bool = True):
+        self.top_requests_path = top_requests_path
+        self.enabled = enabled
+        self.status = "pending" if enabled else "ready"
+        self.steps: dict[str, dict] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def _step(self, name: str, work: Callable[[], int]) -> None:
+        started = time.perf_counter()
+        step = self.steps[name] = {"items": 0, "errors": 0}
+        try:
+            step["items"] = work()
+        except Exception as exc:
+            step["errors"] += 1
+            step["error"] = f"{type(exc).__name__}: {exc}"
+        step["seconds"] = round(time.perf_counter() - started, 3)
+
+    def _requests(self, requests: list[tuple[str, dict]], name: str) -> int:
+        done = 0
+        for route, params in requests:
+            try:
+                warm_request(route, params)
+                done += 1
+            except Exception as exc:
+                # One bad line of the top-requests file must not stop the others
+                self.steps[name]["errors"] += 1
+                self.steps[name]["error"] = f"{type(exc).__name__}: {exc}"
+        return done
+
+    def run(self) -> None:
+        self.status = "warming"
+        self._step("imports", warm_imports)
+        self._step("kernels", warm_kernels)
+        self._step("plots", lambda: self._requests([("plot", plot.model_dump()) for plot in default_plots()], "plots"))
+        if self.top_requests_path:
+            self._step("top_requests", lambda: self._requests(read_top_requests(self.top_requests_path), "top_requests"))
+        self.status = "ready"
+        logger.info("warm-up done in %.1fs", sum(step["seconds"] for step in self.steps.values()))
+
+    def start(self) -> None:
+        """Run the warm-up in a background thread (once); requests are served meanwhile."""
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="abtest-warmup", daemon=True)
+            self._thread.start()
+
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def report(self) -> dict:
+        return {"status": self.status, "steps": self.steps}
+
+
+_warmup: Optional[Warmup] = None
+
+
+def get_warmup() -> Warmup:
+    """Return the process-wide warm-up configured through the environment."""
+    global _warmup
+    if _warmup is None:
+        _warmup = Warmup(
+            os.environ.get("ABTEST_WARMUP_FILE") or None,
+            enabled=os.environ.get("ABTEST_WARMUP", "on").strip().lower() not in ("off", "0", "false"),
+        )
+    return _warmup
+
+
+async def warmup_lifespan(app):
+    # Lifespan of both apps: start warming up without delaying startup
+    get_warmup().start()
+    yield
+
+
+# fast_app takes the async generator itself, FastAPI an async context manager
+warmup_lifespan_context = contextlib.asynccontextmanager(warmup_lifespan)
+
+
+def readiness() -> tuple[dict, int]:
+    """Body and status code of the `/ready` route of both apps."""
+    warmup = get_warmup()
+    return warmup.report(), 200 if warmup.ready() else 503